@@ -4,12 +4,28 @@ import tempfile
 import numpy as np
 import pandas as pd
 
-def load_data(file):
+from asteroid_io import (cache_writable, date_window_mask, is_supported_file, read_cache, read_column_store,
+                         read_csv, read_csv_kwargs, write_cache)
+
+def load_data(file, columns=None, cache=True, date_window=None):
     """
     Load CSV data file into a pandas DataFrame.
 
+    The file may also be a .zip, .gz, .bz2, .xz or .zst archive of the CSV,
+    which is decompressed while it is parsed, or a directory written by
+    asteroid_io.write_column_store, which is memory-mapped. Columns of the
+    NASA file are parsed with the dtypes declared in asteroid_io.NASA_SCHEMA
+    (categorical, float32, bool and datetime64). The parsed file is kept in a
+    columnar cache next to the CSV, which later loads read instead of parsing
+    the text again until the CSV changes. Where the cache cannot be written,
+    only the requested columns are parsed.
+
     Parameters:
-    file (str): Path to the CSV file
+    file (str): Path to the CSV file, archive or column store
+    columns (list): Columns to load, or None to load all of them
+    cache (bool): Read and write the columnar cache
+    date_window (tuple): (start, end) close approach window as in mask_data;
+        rows outside it are dropped while loading
 
     Returns:
     pandas.DataFrame: DataFrame containing the loaded data
@@ -26,18 +42,44 @@ def load_data(file):
     if not os.path.exists(file):
         raise FileNotFoundError(f"File does not exist: {file}")
 
-    # if file not of csv
-    if not file.lower().endswith('.csv'):
-        raise ValueError(f"File must have .csv extension, got: {file}")
+    # if file is a column store, map it instead of parsing
+    if os.path.isdir(file):
+        return read_column_store(file, columns, date_window)
 
-    # If all checks pass, load the CSV
+    # if file not of csv or a compressed csv
+    if not is_supported_file(file):
+        raise ValueError(f"File must have .csv, .zip, .gz, .bz2, .xz or .zst extension, got: {file}")
+
+    # If all checks pass, load the CSV with the declared schema
     try:
-        df = pd.read_csv(file, sep=',')
+        # Without the cache, parse only the requested columns
+        if not cache:
+            df = read_csv(file, columns, date_window)
+            return df
+
+        # Use the columnar cache while it matches the source
+        df = read_cache(file, columns, date_window)
+        if df is not None:
+            return df
+
+        # A cache that cannot be written would not repay parsing every column
+        if not cache_writable(file):
+            return read_csv(file, columns, date_window)
+
+        # Parse every column once so the cache serves any later selection
+        df = read_csv(file)
+        write_cache(file, df)
+        if date_window is not None:
+            df = df[date_window_mask(df, *date_window)]
+        if columns is not None:
+            df = df[read_csv_kwargs(list(df.columns), columns)['usecols']]
         return df
     except pd.errors.EmptyDataError:
         raise ValueError("The file is empty")
     except pd.errors.ParserError:
         raise ValueError("Unable to parse CSV file. Check file format.")
+    except ValueError:
+        raise
     except Exception as e:
         raise Exception(f"Error reading CSV file: {str(e)}")
 
@@ -105,6 +147,121 @@ def test_load_data():
         except ValueError as e:
             print(f"✓ Success! Correctly raised: {e}")
 
+        # Test case 7: NASA columns get the declared dtypes
+        nasa_file_path = os.path.join(temp_dir, "nasa_sample.csv")
+        with open(nasa_file_path, 'w') as f:
+            f.write("Name,Absolute Magnitude,Close Approach Date,Orbiting Body,Hazardous\n"
+                    "1001,21.6,1995-01-01,Earth,True\n"
+                    "1002,19.3,2005-07-04,Earth,False\n")
+
+        print("\nTesting declared schema...")
+        df = load_data(nasa_file_path)
+        assert df['Absolute Magnitude'].dtype == np.float64
+        assert pd.api.types.is_datetime64_any_dtype(df['Close Approach Date'])
+        assert df['Orbiting Body'].dtype == 'category'
+        assert df['Hazardous'].dtype == bool
+        print("✓ Success! dtypes:", dict(df.dtypes.astype(str)))
+
+        # Test case 8: column pruning
+        print("\nTesting columns parameter...")
+        df = load_data(nasa_file_path, columns=['Name', 'Hazardous'])
+        assert list(df.columns) == ['Name', 'Hazardous']
+        print("✓ Success! Loaded columns:", list(df.columns))
+
+        # Test case 9: unknown column
+        print("\nTesting unknown column...")
+        try:
+            load_data(nasa_file_path, columns=['Name', 'Not A Column'])
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+        # Test case 10: cached and uncached loads return the same DataFrame
+        print("\nTesting columnar cache...")
+        parsed = load_data(nasa_file_path, cache=False)
+        load_data(nasa_file_path)
+        assert os.path.exists(nasa_file_path + '.npz')
+        pd.testing.assert_frame_equal(load_data(nasa_file_path), parsed)
+        print("✓ Success! Cache file:", nasa_file_path + '.npz')
+
+        # Test case 11: compressed archives load like the plain CSV
+        print("\nTesting compressed archives...")
+        import bz2
+        import gzip
+        import lzma
+        import zipfile
+        with open(nasa_file_path, 'rb') as f:
+            content = f.read()
+        archives = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+        for extension, opener in archives.items():
+            with opener(nasa_file_path + extension, 'wb') as f:
+                f.write(content)
+        zip_path = os.path.join(temp_dir, "nasa_sample.zip")
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("README.txt", "NASA sample")
+            archive.writestr("nasa_sample.csv", content)
+        for path in [nasa_file_path + extension for extension in archives] + [zip_path]:
+            pd.testing.assert_frame_equal(load_data(path, cache=False), parsed)
+            pd.testing.assert_frame_equal(load_data(path, columns=['Name']), parsed[['Name']])
+        print("✓ Success! Loaded .gz, .bz2, .xz and .zip")
+
+        # Test case 12: a column store directory is memory-mapped
+        print("\nTesting column store...")
+        from asteroid_io import write_column_store
+        store_dir = os.path.join(temp_dir, "nasa_sample.store")
+        write_column_store(nasa_file_path, store_dir)
+        pd.testing.assert_frame_equal(load_data(store_dir), parsed)
+        try:
+            load_data(temp_dir)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Loaded the store; plain directory raised: {e}")
+
+        # Test case 13: a date window is applied while loading
+        print("\nTesting date window pushdown...")
+        from nasa_asteroid_ds import mask_data
+        window = ('2000-01-01', None)
+        expected = mask_data(parsed, *window)
+        pd.testing.assert_frame_equal(load_data(nasa_file_path, cache=False, date_window=window), expected)
+        pd.testing.assert_frame_equal(load_data(nasa_file_path, date_window=window), expected)
+        pd.testing.assert_frame_equal(load_data(store_dir, date_window=window), expected)
+        pruned = load_data(nasa_file_path, columns=['Name'], cache=False, date_window=window)
+        pd.testing.assert_frame_equal(pruned, expected[['Name']])
+        print("✓ Success! Rows kept:", len(expected))
+
+        # Test case 14: without a writable cache only the requested columns are parsed
+        print("\nTesting unwritable cache...")
+        import shutil
+        blocked_path = os.path.join(temp_dir, "blocked.csv")
+        shutil.copyfile(nasa_file_path, blocked_path)
+        os.mkdir(blocked_path + '.npz')  # the cache cannot replace a directory
+        parses = []
+        original_read_csv = read_csv
+
+        def counting_read_csv(file, columns=None, date_window=None):
+            parses.append(columns)
+            return original_read_csv(file, columns, date_window)
+
+        globals()['read_csv'] = counting_read_csv
+        try:
+            pd.testing.assert_frame_equal(load_data(blocked_path), parsed)
+            pd.testing.assert_frame_equal(load_data(blocked_path, columns=['Name']), parsed[['Name']])
+        finally:
+            globals()['read_csv'] = original_read_csv
+        assert parses == [None, ['Name']], parses
+        print("✓ Success! Parsed columns:", parses)
+
+        # Test case 15: unsupported extension
+        print("\nTesting unsupported extension...")
+        txt_path = os.path.join(temp_dir, "data.txt")
+        with open(txt_path, 'w') as f:
+            f.write("col1\n1")
+        try:
+            load_data(txt_path)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
     finally:
         # Clean up the temporary files
         import shutil
@@ -3,16 +3,30 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
-def mask_data(df):
-    # Check if the required column exists
-    if 'Close Approach Date' not in df.columns:
+from asteroid_io import date_window_mask
+
+def mask_data(df, start='2000-01-01', end=None):
+    """
+    Filter DataFrame to include only asteroids with close approach dates in [start, end).
+
+    By default this keeps close approaches from year 2000 onwards. The window is
+    tested on the integer 'Epoch Date Close Approach' column when present, else
+    on 'Close Approach Date' as datetime64 or 'YYYY-MM-DD' strings.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    start: First close approach date to keep (str, datetime or Timestamp), or None
+    end: First close approach date after the window, or None
+
+    Returns:
+    pandas.DataFrame: Filtered DataFrame
+    """
+    # Check if a close approach column exists
+    if 'Close Approach Date' not in df.columns and 'Epoch Date Close Approach' not in df.columns:
         raise ValueError("DataFrame must contain 'Close Approach Date' column")
 
-    # Make a copy of the dataframe
-    filtered_df = df.copy()
-
-    # Filter for dates from year 2000 onwards
-    filtered_df = filtered_df[filtered_df['Close Approach Date'].str.split('-').str[0].astype(int) >= 2000]
+    # Select the rows inside the date window; this allocates the kept rows once
+    filtered_df = df[date_window_mask(df, start, end)]
 
     return filtered_df
 
@@ -70,6 +84,51 @@ def test_mask_data():
     except ValueError as e:
         print(f"\nCorrectly raised error for missing column: {e}")
 
+    # Test 4: String dates and a [start, end) window
+    string_df = pd.DataFrame(data)
+    window_df = mask_data(string_df, start='1999-12-31', end='2005-07-04')
+    print("\nFiltered DataFrame (string dates, 1999-12-31 to 2005-07-04):")
+    print(window_df)
+    assert window_df['Name'].tolist() == [222, 333], f"Got {window_df['Name'].tolist()}"
+    assert mask_data(string_df)['Name'].tolist() == mask_data(test_df)['Name'].tolist()
+
+    # Test 5: The integer epoch column gives the same rows as the dates
+    # (NASA epochs fall 7-8 hours into the UTC day of the date)
+    epoch_df = test_df.copy()
+    epoch_df['Epoch Date Close Approach'] = (test_df['Close Approach Date'] + pd.Timedelta(hours=8)).astype('datetime64[ms]').astype('int64')
+    epoch_only = epoch_df.drop(columns='Close Approach Date')
+    for start, end in [('2000-01-01', None), ('1999-12-31', '2005-07-04'), (None, '2000-01-20')]:
+        expected = mask_data(test_df, start, end)['Name'].tolist()
+        assert mask_data(epoch_only, start, end)['Name'].tolist() == expected, (start, end)
+    print("\nEpoch column matches the date column for every window")
+
+    # Test 6: End before start
+    try:
+        mask_data(test_df, start='2010-01-01', end='2000-01-01')
+        print("\nTest failed: Should have raised ValueError for reversed window")
+        assert False
+    except ValueError as e:
+        print(f"\nCorrectly raised error for reversed window: {e}")
+
+    # Test 7: Peak allocation is the kept rows plus the mask, not a full copy
+    import tracemalloc
+    n = 100_000
+    big_df = pd.DataFrame({f'Value {i}': np.random.rand(n) for i in range(20)})
+    big_df['Epoch Date Close Approach'] = np.where(np.arange(n) % 4 == 0, 0, 10 ** 12)
+    input_bytes = big_df.memory_usage(deep=True).sum()
+
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    filtered_big = mask_data(big_df)
+    peak_bytes = tracemalloc.get_traced_memory()[1] - start_bytes
+    tracemalloc.stop()
+
+    kept_bytes = filtered_big.memory_usage(deep=True).sum()
+    limit = kept_bytes + 16 * n + 64 * 1024
+    print(f"\nPeak allocation {peak_bytes} bytes for {input_bytes} input bytes "
+          f"({kept_bytes} bytes kept, limit {limit})")
+    assert peak_bytes <= limit, f"Peak allocation {peak_bytes} exceeds {limit}"
+
     print("\nAll tests passed!")
 
 
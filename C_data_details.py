@@ -4,25 +4,12 @@ import pandas as pd
 from datetime import datetime
 
 def data_details(df):
-    # Make a copy of the dataframe
-    df_copy = df.copy()
+    # Drop specified columns from the column list only; the data is not touched
+    columns_to_drop = ['Orbiting Body', 'Equinox', 'Neo Reference ID']
+    column_titles = [col for col in df.columns if col not in columns_to_drop]
 
-    # Drop specified columns
-    columns_to_drop = []
-    if "Orbiting Body" in df_copy.columns:
-        columns_to_drop.append('Orbiting Body')
-
-    if "Equinox" in df_copy.columns:
-        columns_to_drop.append('Equinox')
-
-    if "Neo Reference ID" in df_copy.columns:
-        columns_to_drop.append('Neo Reference ID')
-
-    if columns_to_drop:
-        df_copy = df_copy.drop(columns=columns_to_drop)
-
-    num_rows, num_cols = df_copy.shape
-    column_titles = list(df_copy.columns)
+    num_rows = len(df)
+    num_cols = len(column_titles)
 
     data = (num_rows, num_cols, column_titles)
     return data
@@ -76,6 +63,23 @@ def test_data_details():
     print(f"Number of columns: {result2[1]}")
     print(f"Column titles: {result2[2]}")
 
+    # Peak allocation depends on the number of columns, not on the rows
+    print("\n\nTest peak allocation on a large DataFrame:")
+    import tracemalloc
+    big_df = pd.DataFrame({f'Value {i}': np.random.rand(100_000) for i in range(40)})
+    big_df['Equinox'] = 'J2000'
+    input_bytes = big_df.memory_usage(deep=True).sum()
+
+    tracemalloc.start()
+    start_bytes = tracemalloc.get_traced_memory()[0]
+    big_result = data_details(big_df)
+    peak_bytes = tracemalloc.get_traced_memory()[1] - start_bytes
+    tracemalloc.stop()
+
+    print(f"Peak allocation {peak_bytes} bytes for {input_bytes} input bytes")
+    assert big_result[:2] == (100_000, 40)
+    assert peak_bytes < 64 * 1024, f"Peak allocation {peak_bytes} should not grow with the rows"
+
     # Fixed version of the function for demo purposes
     print("\n\nDemonstrating fixed version of function:")
 
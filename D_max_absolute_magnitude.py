@@ -3,32 +3,31 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from asteroid_summary import summarize
+from asteroid_topk import top_k_rows
 
-def max_absolute_magnitude(df):
+
+def max_absolute_magnitude(df, k=None, by=None):
     """
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    k (int): Number of asteroids to return, per group if by is given, or None for the maximum only
+    by (str): 'year' for the close approach year, a column name, or None
 
     Returns:
-    tuple: (index, name) of the asteroid with the maximum absolute magnitude
+    tuple: (index, name) of the asteroid with the maximum absolute magnitude, or with k
+        or by a DataFrame of 'Name' and 'Absolute Magnitude', largest first
     """
-    # Check if required columns exist
-    required_columns = ['Absolute Magnitude', 'Name']
-    for col in required_columns:
-        if col not in df.columns:
-            raise ValueError(f"DataFrame must contain '{col}' column")
-
-    # get index of the maximum absolute magnitude
-    max_magnitude_index = df['Absolute Magnitude'].idxmax()
+    if k is not None or by is not None:
+        return top_k_rows(df, 'D', 1 if k is None else k, by)
 
-    # Get the name of the asteroid with maximum absolute magnitude
-    max_magnitude_name = df.loc[max_magnitude_index, 'Name']
-
-    # Get the val of the asteroid with maximum absolute magnitude
-    max_magnitude_val = df.loc[max_magnitude_index, 'Absolute Magnitude']
+    # One positional pass over 'Absolute Magnitude'; checks the columns too
+    max_magnitude = summarize(df, 'D').max_absolute_magnitude
+    if max_magnitude is None:
+        raise ValueError("DataFrame has no 'Absolute Magnitude' values")
 
     # Return the tuple of (name, val)
-    return max_magnitude_name, max_magnitude_val
+    return max_magnitude
 
 
 def test_max_absolute_magnitude():
@@ -65,6 +64,27 @@ def test_max_absolute_magnitude():
 
     print("Test passed!")
 
+    # Test that missing values are skipped and ties keep the first row
+    nan_df = pd.DataFrame({
+        'Name': [1001, 1002, 1003, 1004],
+        'Absolute Magnitude': [np.nan, 22.5, 19.8, 22.5]
+    }, index=[9, 4, 7, 1])
+    assert max_absolute_magnitude(nan_df) == (1002, 22.5)
+    print("Missing values test passed")
+
+    # Test the k largest, overall and per asteroid
+    top = max_absolute_magnitude(df, k=3)
+    assert list(top['Name']) == [1003, 1004, 1002]
+    per_asteroid = max_absolute_magnitude(nan_df.assign(**{'Neo Reference ID': [1, 1, 2, 2]}), by='Neo Reference ID')
+    assert list(per_asteroid['Name']) == [1002, 1004]
+    for k in [0, -1]:
+        try:
+            max_absolute_magnitude(df, k=k)
+            raise AssertionError(f"k={k} should have raised an error")
+        except ValueError:
+            pass
+    print("Top-k test passed")
+
     # Test with an empty DataFrame
     empty_df = pd.DataFrame(columns=['Name', 'Absolute Magnitude'])
     try:
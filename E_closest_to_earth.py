@@ -3,7 +3,14 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
-def closest_to_earth(df):
+from asteroid_summary import summarize
+from asteroid_topk import top_k_rows
+
+def closest_to_earth(df, k=None, by=None):
+    # The k closest approaches, overall or per group, selected in O(n)
+    if k is not None or by is not None:
+        return top_k_rows(df, 'E', 1 if k is None else k, by)
+
     # Validate required columns
     required_columns = ['Miss Dist.(kilometers)', 'Name']
     for col in required_columns:
@@ -14,13 +21,11 @@ def closest_to_earth(df):
     if df.empty:
         raise ValueError("DataFrame is empty")
 
-    # get index of closest astroid to earth
-    closest_dist_index = df['Miss Dist.(kilometers)'].idxmin()
-
-    # Get the name of the asteroid with closest_dist
-    closest_dist_name = df.loc[closest_dist_index, 'Name']
+    # One positional pass over 'Miss Dist.(kilometers)'
+    closest_dist_name = summarize(df, 'E').closest_to_earth
+    if closest_dist_name is None:
+        raise ValueError("DataFrame has no 'Miss Dist.(kilometers)' values")
 
-    # return min of Miss Dist.(kilometers)
     return closest_dist_name
 
 
@@ -50,8 +55,7 @@ def test_closest_to_earth():
     print(f"\nResult: name={name}")
 
     # Verify the result
-    # Note: The function is looking for maximum distance, not minimum as the name might suggest
-    expected_name = 1004  # Name at the row with maximum Miss Dist.(kilometers) (8000)
+    expected_name = 1001  # Name at the row with minimum Miss Dist.(kilometers) (1000)
 
     assert name == expected_name, f"Expected name {expected_name}, but got {name}"
 
@@ -3,25 +3,25 @@ import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from asteroid_summary import summarize
 
-def common_orbit(df):
+
+def common_orbit(df, top_k=None, min_count=None):
     """
     Create a dictionary with orbit IDs as keys and count of asteroids in each orbit as values.
 
+    Orbit IDs are counted with np.bincount; only the kept IDs become dictionary entries.
+
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    top_k (int): Keep only the k most common orbits, or None for all of them
+    min_count (int): Keep only orbits with at least this many asteroids, or None
 
     Returns:
     dict: Dictionary where keys are Orbit IDs and values are counts of asteroids
     """
-    # Check if required column exists
-    if 'Orbit ID' not in df.columns:
-        raise ValueError("DataFrame must contain 'Orbit ID' column")
-
-    # Count asteroids by Orbit ID
-    orbit_counts = df['Orbit ID'].value_counts().to_dict()
-
-    return orbit_counts
+    # Count asteroids by Orbit ID, largest count first; checks the column too
+    return summarize(df, 'F').common_orbit.to_dict(top_k, min_count)
 
 
 def test_common_orbit():
@@ -55,6 +55,10 @@ def test_common_orbit():
 
     print("Test passed!")
 
+    # Test the top-k and minimum count options; ties keep the order of first appearance
+    assert common_orbit(df, top_k=2) == {101: 2, 102: 2}
+    assert common_orbit(df, min_count=3) == {}
+
     # Test with an empty DataFrame
     empty_df = pd.DataFrame(columns=['Orbit ID'])
     empty_result = common_orbit(empty_df)
@@ -1,3 +1,6 @@
+from asteroid_summary import summarize
+
+
 def min_max_diameter(df):
     """
     Count asteroids with maximum diameter above the average maximum diameter.
@@ -8,17 +11,9 @@ def min_max_diameter(df):
     Returns:
     int: Count of asteroids with maximum diameter above average
     """
-    # Check if required column exists
-    if 'Est Dia in KM(max)' not in df.columns:
-        raise ValueError("DataFrame must contain 'Est Dia in KM(max)' column")
-
-    # Calculate the average maximum diameter
-    avg_max_diameter = df['Est Dia in KM(max)'].mean()
-
-    # Count asteroids with maximum diameter above average
-    count_above_avg = df[df['Est Dia in KM(max)'] > avg_max_diameter].shape[0]
-
-    return count_above_avg
+    # The average is accumulated in float64, as the streaming path does, so
+    # both give the same threshold; an empty DataFrame gives 0
+    return summarize(df, 'G').min_max_diameter
 
 
 def test_min_max_diameter():
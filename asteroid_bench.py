@@ -0,0 +1,309 @@
+"""
+NASA Asteroid Data Analysis - scaling benchmark
+
+Times every section, from load_data (A) to plt_linear_motion_magnitude (K),
+on synthetic data sets of growing size written by asteroid_synth, and records
+the peak memory each one allocates. The results go to a JSON report, to be
+compared release to release, and a markdown table of the same numbers.
+
+Everything runs offline; the data sets depend only on their size and seed and
+are reused when they already exist in the data directory.
+
+Usage: python asteroid_bench.py [--sizes 10000 100000] [--seed 0] [--baseline old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+import numpy as np
+import pandas as pd
+import scipy
+
+from asteroid_render import render_plot
+from asteroid_synth import generate
+
+
+# Sizes benchmarked when none are given
+DEFAULT_SIZES = [10_000, 100_000]
+
+# Relative slowdown reported by compare_reports
+DEFAULT_TOLERANCE = 0.2
+
+
+#########################
+## SECTIONS
+#########################
+def _sections(file, plot_dir):
+    """
+    The calls of each section, as (section, function name, call) in order.
+
+    Each call takes the result of the previous sections and returns its own,
+    so that B runs on the loaded data and C-K on the filtered data.
+    """
+    from nasa_asteroid_ds import (closest_to_earth, common_orbit, data_details, load_data, mask_data,
+                                  max_absolute_magnitude, min_max_diameter)
+
+    def plot(name):
+        return lambda df: render_plot(name, df, os.path.join(plot_dir, f"{name}.png"))
+
+    return [
+        ('A', 'load_data', lambda _: load_data(file, cache=False)),
+        ('B', 'mask_data', mask_data),
+        ('C', 'data_details', data_details),
+        ('D', 'max_absolute_magnitude', max_absolute_magnitude),
+        ('E', 'closest_to_earth', closest_to_earth),
+        ('F', 'common_orbit', common_orbit),
+        ('G', 'min_max_diameter', min_max_diameter),
+        ('H', 'plt_hist_diameter', plot('hist_diameter')),
+        ('I', 'plt_hist_common_orbit', plot('hist_common_orbit')),
+        ('J', 'plt_pie_hazard', plot('pie_hazard')),
+        ('K', 'plt_linear_motion_magnitude', plot('linear_motion_magnitude')),
+    ]
+
+
+def _measure(call, arg, repeat, memory):
+    """
+    Best time of repeat calls and, if memory, the peak traced allocation of one more.
+
+    Returns:
+    tuple: (result, seconds, peak bytes or None)
+    """
+    seconds = np.inf
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = call(arg)
+        seconds = min(seconds, time.perf_counter() - begin)
+
+    peak = None
+    if memory:
+        # Traced separately: tracemalloc slows allocations down
+        tracemalloc.start()
+        try:
+            call(arg)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result, seconds, peak
+
+
+def bench_file(file, rows, repeat=1, memory=True):
+    """
+    Benchmark the sections A-K on one file.
+
+    Parameters:
+    file (str): Path to the CSV file
+    rows (int): Number of rows of the file, recorded with each result
+    repeat (int): Timed calls per section; the fastest is kept
+    memory (bool): Also record the peak memory allocated by each section
+
+    Returns:
+    list: One dict per section with rows, section, function, seconds and peak_bytes
+    """
+    if repeat < 1:
+        raise ValueError(f"repeat must be a positive integer, got: {repeat}")
+
+    results = []
+    plot_dir = tempfile.mkdtemp()
+    try:
+        df = filtered = None
+        for section, function, call in _sections(file, plot_dir):
+            # B takes the loaded data, every later section the filtered data
+            arg = df if section == 'B' else filtered
+            result, seconds, peak = _measure(call, arg, repeat, memory)
+            if section == 'A':
+                df = result
+            elif section == 'B':
+                filtered = result
+            results.append({'rows': rows, 'section': section, 'function': function,
+                            'seconds': seconds, 'peak_bytes': peak})
+    finally:
+        shutil.rmtree(plot_dir)
+    return results
+
+
+#########################
+## REPORT
+#########################
+def run_benchmark(sizes=DEFAULT_SIZES, seed=0, data_dir=None, out='bench_report', repeat=1, memory=True):
+    """
+    Generate the data sets and benchmark every section at every size.
+
+    Parameters:
+    sizes (list): Row counts of the synthetic data sets
+    seed (int): Seed of the data sets
+    data_dir (str): Directory of the data sets, reused across runs; None for a temporary one
+    out (str): Path of the report without extension; None to write no files
+    repeat (int): Timed calls per section; the fastest is kept
+    memory (bool): Also record the peak memory allocated by each section
+
+    Returns:
+    dict: The report, as written to out + '.json'
+    """
+    temp_dir = None
+    if data_dir is None:
+        data_dir = temp_dir = tempfile.mkdtemp()
+    os.makedirs(data_dir, exist_ok=True)
+
+    report = {
+        'seed': seed,
+        'sizes': list(sizes),
+        'repeat': repeat,
+        'environment': {
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'scipy': scipy.__version__,
+            'matplotlib': matplotlib.__version__,
+        },
+        'results': [],
+    }
+    try:
+        for rows in sizes:
+            file = os.path.join(data_dir, f"synthetic_{rows}_{seed}.csv")
+            if not os.path.exists(file):
+                print(f"Generating {rows} rows...")
+                generate(file, rows, seed)
+            print(f"Benchmarking {rows} rows...")
+            report['results'].extend(bench_file(file, rows, repeat, memory))
+    finally:
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+    if out is not None:
+        with open(out + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        with open(out + '.md', 'w') as f:
+            f.write(format_report(report))
+    return report
+
+
+def format_report(report):
+    """
+    Markdown table of a report, one row per section and a column pair per size.
+
+    Parameters:
+    report (dict): Report returned by run_benchmark
+
+    Returns:
+    str: Markdown text
+    """
+    sizes = report['sizes']
+    by_key = {(r['rows'], r['section']): r for r in report['results']}
+    sections = list(dict.fromkeys((r['section'], r['function']) for r in report['results']))
+
+    lines = [f"# Benchmark (seed {report['seed']}, best of {report['repeat']})", ""]
+    lines.append("| Section | Function | " + " | ".join(f"{rows:,} rows: s | MiB" for rows in sizes) + " |")
+    lines.append("|---|---|" + "---:|---:|" * len(sizes))
+    for section, function in sections:
+        cells = []
+        for rows in sizes:
+            result = by_key.get((rows, section))
+            if result is None:
+                cells += ['', '']
+                continue
+            cells.append(f"{result['seconds']:.4f}")
+            peak = result['peak_bytes']
+            cells.append('' if peak is None else f"{peak / 2 ** 20:.1f}")
+        lines.append(f"| {section} | {function} | " + " | ".join(cells) + " |")
+    lines.append("")
+    lines.append(", ".join(f"{name} {version}" for name, version in report['environment'].items()))
+    return "\n".join(lines) + "\n"
+
+
+def compare_reports(baseline, report, tolerance=DEFAULT_TOLERANCE):
+    """
+    Sections that got slower than a baseline report by more than tolerance.
+
+    Parameters:
+    baseline (dict): Earlier report
+    report (dict): Current report
+    tolerance (float): Allowed relative slowdown
+
+    Returns:
+    list: (rows, section, baseline seconds, seconds) of each slower section
+    """
+    before = {(r['rows'], r['section']): r['seconds'] for r in baseline['results']}
+    slower = []
+    for result in report['results']:
+        key = (result['rows'], result['section'])
+        if key in before and result['seconds'] > before[key] * (1 + tolerance):
+            slower.append((*key, before[key], result['seconds']))
+    return slower
+
+
+def test_benchmark():
+    """
+    Benchmark a small data set and check the report.
+    """
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        # Test case 1: every section at every size, in the JSON and markdown report
+        out = os.path.join(temp_dir, 'report')
+        report = run_benchmark([500, 1000], seed=3, data_dir=temp_dir, out=out)
+        print(open(out + '.md').read())
+        assert [r['section'] for r in report['results']] == list('ABCDEFGHIJK') * 2
+        assert all(r['seconds'] >= 0 and r['peak_bytes'] > 0 for r in report['results'])
+        with open(out + '.json') as f:
+            assert json.load(f) == report
+        assert os.path.exists(os.path.join(temp_dir, 'synthetic_1000_3.csv'))
+        print("✓ Success!")
+
+        # Test case 2: comparison with a baseline
+        print("\nTesting comparison...")
+        assert compare_reports(report, report) == []
+        faster = {'results': [dict(r, seconds=r['seconds'] / 2 - 1) for r in report['results']]}
+        assert len(compare_reports(faster, report)) == len(report['results'])
+        print("✓ Success!")
+
+        # Test case 3: invalid repeat count
+        try:
+            bench_file(os.path.join(temp_dir, 'synthetic_500_3.csv'), 500, repeat=0)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    finally:
+        # Clean up the temporary files
+        shutil.rmtree(temp_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sections A-K on synthetic data sets.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="row counts")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="timed calls per section")
+    parser.add_argument('--no-memory', action='store_true', help="skip the memory profile")
+    parser.add_argument('--data-dir', help="directory to keep and reuse the data sets in")
+    parser.add_argument('--out', default='bench_report', help="report path without extension")
+    parser.add_argument('--baseline', help="earlier JSON report to compare with")
+    parser.add_argument('--test', action='store_true', help="run the self test instead")
+    args = parser.parse_args()
+
+    if args.test:
+        test_benchmark()
+        return
+
+    report = run_benchmark(args.sizes, args.seed, args.data_dir, args.out, args.repeat, not args.no_memory)
+    print(format_report(report))
+    if args.baseline:
+        with open(args.baseline) as f:
+            slower = compare_reports(json.load(f), report)
+        for rows, section, before, seconds in slower:
+            print(f"Slower: section {section} at {rows} rows, {before:.4f}s -> {seconds:.4f}s")
+        if slower:
+            raise SystemExit(1)
+
+
+# Run the benchmark if this script is executed directly
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,392 @@
+"""
+NASA Asteroid Data Analysis - distinct counts with HyperLogLog
+
+HyperLogLog estimates the number of distinct values in a stream from 2**p
+small registers: each value is hashed to 64 bits, the first p bits pick a
+register and the register keeps the longest run of leading zeros seen in the
+rest. Two sketches of the same precision union by taking the larger of each
+register, so sketches built per chunk, year or shard combine into the sketch
+of all of them, exactly as if the values had been added to one sketch,
+without a global set of values.
+
+The estimate uses the improved estimator of Ertl (2017), unbiased from one
+value up to billions without empirical correction tables. Its relative
+standard error is 1.04 / sqrt(2**p): 0.8% at the default precision of 14,
+with 16 KiB of registers.
+
+distinct_counts() reports the distinct asteroids, orbit IDs and hazardous
+asteroids of a DataFrame; stream_distinct() does it over the chunks of a
+file, with the close approach window of section B as the other streaming
+sections.
+
+Usage: python asteroid_distinct.py [file]
+"""
+
+import base64
+import sys
+
+import numpy as np
+import pandas as pd
+
+from asteroid_io import DEFAULT_CHUNKSIZE, read_chunks
+
+
+# Registers are 2**precision bytes
+DEFAULT_PRECISION = 14
+
+# Distinct counts reported: name -> (column counted, boolean column the rows must have set, or None)
+DISTINCT_COUNTS = {
+    'asteroids': ('Neo Reference ID', None),
+    'orbit_ids': ('Orbit ID', None),
+    'hazardous_asteroids': ('Neo Reference ID', 'Hazardous'),
+}
+
+
+def relative_error(precision=DEFAULT_PRECISION):
+    """
+    Relative standard error of a HyperLogLog estimate.
+
+    About 68% of estimates are within this fraction of the true count, 95%
+    within twice it and 99.7% within three times it.
+
+    Parameters:
+    precision (int): Precision of the sketch
+
+    Returns:
+    float: 1.04 / sqrt(2**precision)
+    """
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+def _hash(values):
+    """
+    64-bit hash of each value.
+
+    Integers are hashed as int64 and floats as float64, so a column hashes
+    the same whatever dtype a chunk or shard parsed it with.
+    """
+    values = np.asarray(values)
+    if values.dtype.kind in 'iub':
+        values = values.astype(np.int64)
+    elif values.dtype.kind == 'f':
+        values = values.astype(np.float64)
+    return pd.util.hash_array(values)
+
+
+def _bit_length(values):
+    """Number of bits needed for each uint64, 0 for 0."""
+    values = values.copy()
+    length = np.zeros(len(values), dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        length[high] += shift
+        values[high] >>= np.uint64(shift)
+    return length + (values > 0)
+
+
+def _sigma(x):
+    """Correction of Ertl's estimator for empty registers."""
+    if x == 1:
+        return np.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        z_old = z
+        z += x * y
+        y += y
+        if z == z_old:
+            return z
+
+
+def _tau(x):
+    """Correction of Ertl's estimator for saturated registers."""
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = np.sqrt(x)
+        z_old = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == z_old:
+            return z / 3
+
+
+#########################
+## SKETCH
+#########################
+class HyperLogLog:
+    """
+    Distinct count sketch of a stream of values.
+
+    Parameters:
+    precision (int): Bits of the hash that pick a register, 4 to 18; the
+        sketch takes 2**precision bytes and errs by relative_error(precision)
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"precision must be between 4 and 18, got: {precision}")
+        self.precision = precision
+        self.registers = np.zeros(2 ** precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return relative_error(self.precision)
+
+    def add(self, values):
+        """
+        Add values to the sketch; NaN counts as one value.
+
+        Parameters:
+        values (numpy.ndarray): Values of any dtype pandas can hash
+
+        Returns:
+        HyperLogLog: self
+        """
+        hashes = _hash(values)
+        if len(hashes) == 0:
+            return self
+        rest_bits = 64 - self.precision
+        index = (hashes >> np.uint64(rest_bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << rest_bits) - 1)
+        # Position of the first one bit in the rest, rest_bits + 1 if there is none
+        rank = (rest_bits + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        """
+        Union with another sketch, e.g. of another chunk, year or shard.
+
+        Parameters:
+        other (HyperLogLog): Sketch of the same precision
+
+        Returns:
+        HyperLogLog: self
+        """
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge sketches of precision {self.precision} and {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        """
+        Estimated number of distinct values added.
+
+        Returns:
+        int: Estimate
+        """
+        m = len(self.registers)
+        rest_bits = 64 - self.precision
+        histogram = np.bincount(self.registers, minlength=rest_bits + 2).astype(np.float64)
+        z = m * _tau(1 - histogram[rest_bits + 1] / m)
+        for k in range(rest_bits, 0, -1):
+            z = 0.5 * (z + histogram[k])
+        z += m * _sigma(histogram[0] / m)
+        return int(round(m * m / (2 * np.log(2)) / z))
+
+    def to_dict(self):
+        """
+        The sketch as a JSON-compatible dictionary.
+
+        Returns:
+        dict: precision and base64 registers
+        """
+        return {'precision': self.precision, 'registers': base64.b64encode(self.registers.tobytes()).decode('ascii')}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Read a sketch written by to_dict.
+
+        Parameters:
+        data (dict): Dictionary from to_dict
+
+        Returns:
+        HyperLogLog: The sketch
+        """
+        sketch = cls(data['precision'])
+        registers = np.frombuffer(base64.b64decode(data['registers']), dtype=np.uint8)
+        if len(registers) != len(sketch.registers):
+            raise ValueError(f"Sketch of precision {sketch.precision} must have {len(sketch.registers)} registers")
+        sketch.registers[:] = registers
+        return sketch
+
+
+#########################
+## DISTINCT COUNTS
+#########################
+def sketch_distinct(df, counts=DISTINCT_COUNTS, precision=DEFAULT_PRECISION):
+    """
+    HyperLogLog sketch of each distinct count of a DataFrame.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    counts (dict): Name -> (column, boolean filter column or None), see DISTINCT_COUNTS
+    precision (int): Precision of the sketches
+
+    Returns:
+    dict: Name -> HyperLogLog
+    """
+    sketches = {}
+    for name, (col, flag) in counts.items():
+        for needed in (col, flag):
+            if needed is not None and needed not in df.columns:
+                raise ValueError(f"DataFrame must contain '{needed}' column")
+        values = df[col].to_numpy()
+        if flag is not None:
+            values = values[df[flag].to_numpy(dtype=bool)]
+        sketches[name] = HyperLogLog(precision).add(values)
+    return sketches
+
+
+def merge_distinct(sketches):
+    """
+    Union per-chunk, per-year or per-shard sketches count by count.
+
+    Parameters:
+    sketches (iterable): Dictionaries of name -> HyperLogLog, e.g. from sketch_distinct
+
+    Returns:
+    dict: Name -> union HyperLogLog
+    """
+    merged = {}
+    for sketch in sketches:
+        for name, hll in sketch.items():
+            if name in merged:
+                merged[name].merge(hll)
+            else:
+                merged[name] = HyperLogLog(hll.precision).merge(hll)
+    return merged
+
+
+def sketch_by_year(df, counts=DISTINCT_COUNTS, precision=DEFAULT_PRECISION):
+    """
+    Sketches of the rows of each close approach year.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    counts (dict): Name -> (column, boolean filter column or None)
+    precision (int): Precision of the sketches
+
+    Returns:
+    dict: Year -> {name: HyperLogLog}
+    """
+    from asteroid_topk import approach_years
+
+    years = approach_years(df)
+    return {int(year): sketch_distinct(df[years == year], counts, precision) for year in np.unique(years)}
+
+
+def distinct_counts(df, counts=DISTINCT_COUNTS, precision=DEFAULT_PRECISION):
+    """
+    Estimated distinct asteroids, orbit IDs and hazardous asteroids of a DataFrame.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    counts (dict): Name -> (column, boolean filter column or None)
+    precision (int): Precision of the sketches
+
+    Returns:
+    dict: Name -> estimated distinct count
+    """
+    return {name: hll.count() for name, hll in sketch_distinct(df, counts, precision).items()}
+
+
+def stream_distinct(file, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None, counts=DISTINCT_COUNTS,
+                    precision=DEFAULT_PRECISION):
+    """
+    Estimated distinct counts of a file of any size, from one pass over its chunks.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+    counts (dict): Name -> (column, boolean filter column or None)
+    precision (int): Precision of the sketches
+
+    Returns:
+    dict: Name -> estimated distinct count
+    """
+    columns = sorted({col for pair in counts.values() for col in pair if col is not None})
+    chunks = read_chunks(file, chunksize, columns=columns, date_window=(start, end))
+    merged = merge_distinct(sketch_distinct(chunk, counts, precision) for chunk in chunks)
+    return {name: hll.count() for name, hll in merged.items()}
+
+
+def test_distinct():
+    """
+    Check the estimates against exact distinct counts, unions and serialization.
+    """
+    import json
+    import os
+
+    rng = np.random.default_rng(5)
+
+    # Test case 1: estimates within three standard errors over a range of cardinalities
+    for cardinality in [1, 10, 1000, 30_000, 1_000_000]:
+        values = rng.choice(10 ** 9, cardinality, replace=False)
+        hll = HyperLogLog().add(np.concatenate([values, values[:cardinality // 2]]))
+        error = abs(hll.count() - cardinality) / cardinality
+        print(f"{cardinality} distinct: estimate {hll.count()}, error {error:.4f}")
+        assert error <= 3 * hll.relative_error
+    assert HyperLogLog().count() == 0
+    print("✓ Success!")
+
+    # Test case 2: the union of shard sketches is the sketch of all the values
+    print("\nTesting union...")
+    values = rng.integers(0, 200_000, 500_000)
+    whole = HyperLogLog().add(values)
+    shards = [HyperLogLog().add(values[start:start + 90_000]) for start in range(0, len(values), 90_000)]
+    union = HyperLogLog()
+    for shard in shards:
+        union.merge(shard)
+    assert np.array_equal(union.registers, whole.registers)
+    # Dtypes do not change the hashes
+    assert np.array_equal(HyperLogLog().add(values.astype(np.int32)).registers, whole.registers)
+    print("✓ Success!")
+
+    # Test case 3: serialization and errors
+    print("\nTesting serialization...")
+    restored = HyperLogLog.from_dict(json.loads(json.dumps(whole.to_dict())))
+    assert restored.count() == whole.count()
+    for bad in [lambda: HyperLogLog(20), lambda: HyperLogLog(12).merge(HyperLogLog(14)),
+                lambda: sketch_distinct(pd.DataFrame({'Orbit ID': [1]}))]:
+        try:
+            bad()
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 4: the bundled data set, whole, by year and streamed
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data
+        nasa = load_data('nasa.csv', cache=False)
+        exact = {
+            'asteroids': nasa['Neo Reference ID'].nunique(),
+            'orbit_ids': nasa['Orbit ID'].nunique(),
+            'hazardous_asteroids': nasa.loc[nasa['Hazardous'], 'Neo Reference ID'].nunique(),
+        }
+        estimates = distinct_counts(nasa)
+        by_year = merge_distinct(sketch_by_year(nasa).values())
+        streamed = stream_distinct('nasa.csv', chunksize=700, start=None)
+        print(f"Exact {exact}, estimated {estimates}")
+        for name, count in exact.items():
+            assert abs(estimates[name] - count) <= 3 * relative_error() * count, name
+            assert by_year[name].count() == estimates[name] == streamed[name], name
+        # By default the window of section B, as the other streaming sections
+        from nasa_asteroid_ds import mask_data
+        assert stream_distinct('nasa.csv', chunksize=700) == distinct_counts(mask_data(nasa))
+        print("✓ Success!")
+
+
+# Print the distinct counts of a file, or run the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for name, count in stream_distinct(sys.argv[1]).items():
+            print(f"Distinct {name.replace('_', ' ')}: ~{count} (±{relative_error():.1%})")
+    else:
+        test_distinct()
@@ -0,0 +1,286 @@
+"""
+NASA Asteroid Data Analysis - pre-binned histograms
+
+Histogram keeps only the bin edges and counts of a column, so the figures of
+sections H and I cost O(bins) to draw whatever the number of rows. Counts of
+histograms with the same edges add up, so they can be built chunk by chunk or
+per shard and merged. stream_histograms() builds both from a file in chunks.
+
+Usage: python asteroid_histogram.py
+"""
+
+import os
+
+import numpy as np
+
+from asteroid_io import DEFAULT_CHUNKSIZE, read_chunks, read_header
+
+
+#########################
+## HISTOGRAM
+#########################
+class Histogram:
+    """
+    Counts of values in fixed bins, mergeable across chunks.
+
+    Bins follow np.histogram: each bin holds [left, right) except the last,
+    which also holds its right edge. Values outside the edges and NaN are not
+    counted.
+    """
+
+    def __init__(self, edges, counts=None):
+        self.edges = np.asarray(edges)
+        if counts is None:
+            counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        if len(self.counts) != len(self.edges) - 1:
+            raise ValueError(f"Expected {len(self.edges) - 1} counts, got {len(self.counts)}")
+        # (first edge, last edge) when the edges are np.histogram's uniform bins
+        self._range = None
+
+    @classmethod
+    def uniform(cls, first, last, bins):
+        """
+        Equal-width bins from first to last, computed as np.histogram computes them.
+
+        Values are then counted by np.histogram's uniform path, which finds
+        the bin of each value arithmetically and counts with np.bincount
+        instead of searching the edges.
+
+        Parameters:
+        first: Left edge of the first bin; its dtype is the dtype of the edges
+        last: Right edge of the last bin
+        bins (int): Number of bins
+
+        Returns:
+        Histogram: Empty histogram
+        """
+        bounds = np.array([first, last])
+        histogram = cls(np.histogram_bin_edges(bounds, bins))
+        histogram._range = (bounds[0], bounds[1])
+        return histogram
+
+    @classmethod
+    def from_values(cls, values, bins=10):
+        """
+        Histogram of an array, with the edges np.histogram and plt.hist would use.
+
+        NaN values are dropped before the edges are found, as plt.hist does.
+
+        Parameters:
+        values (numpy.ndarray): Values to count
+        bins: Number of equal-width bins between the min and max, or the bin edges
+
+        Returns:
+        Histogram: Histogram of values
+        """
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            values = values[~np.isnan(values)]
+        counts, edges = np.histogram(values, bins=bins)
+        return cls(edges, counts)
+
+    def add(self, values):
+        """
+        Count more values into the bins.
+
+        Parameters:
+        values (numpy.ndarray): Values to count
+
+        Returns:
+        Histogram: self
+        """
+        if self._range is not None:
+            counts, _ = np.histogram(values, bins=len(self.counts), range=self._range)
+        else:
+            counts, _ = np.histogram(values, bins=self.edges)
+        self.counts += counts
+        return self
+
+    def merge(self, other):
+        """
+        Add the counts of a histogram with the same edges.
+
+        Parameters:
+        other (Histogram): Histogram of other values
+
+        Returns:
+        Histogram: self
+        """
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Histograms with different bin edges cannot be merged")
+        self.counts += other.counts
+        return self
+
+    def plot(self, ax, **kwargs):
+        """
+        Draw the bars on an Axes.
+
+        The counts are passed to Axes.hist as weights of one value per bin, so
+        the bars look exactly like those of Axes.hist on the raw values.
+
+        Parameters:
+        ax (matplotlib.axes.Axes): Axes to draw on
+        **kwargs: Style arguments for Axes.hist
+
+        Returns:
+        tuple: Result of Axes.hist
+        """
+        return ax.hist(self.edges[:-1], bins=self.edges, weights=self.counts, **kwargs)
+
+
+#########################
+## STREAMING
+#########################
+# Columns the histograms of sections H and I read
+HISTOGRAM_COLUMNS = ['Est Dia in KM(min)', 'Est Dia in KM(max)', 'Minimum Orbit Intersection']
+
+
+def _histogram_values(chunk):
+    """Known average diameters and orbit intersections of a chunk."""
+    avg_diameter = (chunk['Est Dia in KM(min)'].to_numpy() + chunk['Est Dia in KM(max)'].to_numpy()) / 2
+    orbit_intersections = chunk['Minimum Orbit Intersection'].to_numpy()
+    return avg_diameter[~np.isnan(avg_diameter)], orbit_intersections[~np.isnan(orbit_intersections)]
+
+
+def stream_histograms(file, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None):
+    """
+    Build the histograms of sections H and I while reading the file in chunks.
+
+    The first pass finds the range of each column and the second counts the
+    values into its bins, so memory is bounded by the chunk size. The counts
+    equal those of plt_hist_diameter and plt_hist_common_orbit on
+    mask_data(load_data(file)).
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+
+    Returns:
+    dict: 'hist_diameter' and 'hist_common_orbit' Histograms
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError(f"File does not exist: {file}")
+    header = read_header(file)
+    for col in HISTOGRAM_COLUMNS:
+        if col not in header:
+            raise ValueError(f"File must contain '{col}' column")
+
+    # First pass: range of each column
+    diameter_range = orbit_range = None
+    for chunk in read_chunks(file, chunksize, columns=HISTOGRAM_COLUMNS, date_window=(start, end)):
+        avg_diameter, orbit_intersections = _histogram_values(chunk)
+        if len(avg_diameter):
+            low, high = avg_diameter.min(), avg_diameter.max()
+            if diameter_range is not None:
+                low, high = min(low, diameter_range[0]), max(high, diameter_range[1])
+            diameter_range = (low, high)
+        if len(orbit_intersections):
+            low, high = orbit_intersections.min(), orbit_intersections.max()
+            if orbit_range is not None:
+                low, high = min(low, orbit_range[0]), max(high, orbit_range[1])
+            orbit_range = (low, high)
+    if diameter_range is None or orbit_range is None:
+        raise ValueError("No rows to build the histograms from")
+
+    # Second pass: count into the bins of the whole data
+    hist_diameter = Histogram.uniform(*diameter_range, bins=100)
+    hist_common_orbit = Histogram(np.linspace(*orbit_range, 11))  # 11 edges make 10 bins
+    for chunk in read_chunks(file, chunksize, columns=HISTOGRAM_COLUMNS, date_window=(start, end)):
+        avg_diameter, orbit_intersections = _histogram_values(chunk)
+        hist_diameter.add(avg_diameter)
+        hist_common_orbit.add(orbit_intersections)
+
+    return {'hist_diameter': hist_diameter, 'hist_common_orbit': hist_common_orbit}
+
+
+def test_histogram():
+    """
+    Compare pre-binned histograms with np.histogram and plt.hist on the raw values.
+    """
+    from matplotlib.figure import Figure
+
+    rng = np.random.RandomState(0)
+    values = rng.lognormal(size=10_000).astype(np.float32)
+
+    # Test case 1: built in chunks equals built at once
+    whole = Histogram.from_values(values, bins=100)
+    chunked = Histogram.uniform(values.min(), values.max(), bins=100)
+    for part in np.array_split(values, 7):
+        chunked.add(part)
+    print("Counts:", whole.counts[:10], "...")
+    assert np.array_equal(whole.edges, chunked.edges)
+    assert np.array_equal(whole.counts, chunked.counts)
+    assert whole.counts.sum() == len(values)
+    print("✓ Success!")
+
+    # Test case 2: merging shards equals one histogram
+    print("\nTesting merge...")
+    edges = np.linspace(values.min(), values.max(), 11)
+    merged = Histogram(edges).add(values[:3000]).merge(Histogram(edges).add(values[3000:]))
+    assert np.array_equal(merged.counts, np.histogram(values, bins=edges)[0])
+    try:
+        merged.merge(whole)
+        print("✗ Failed: Should have raised ValueError")
+    except ValueError as e:
+        print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 3: the bars match Axes.hist on the raw values
+    print("\nTesting bars...")
+    raw = Figure().subplots().hist(values, bins=100, color='skyblue', edgecolor='black')
+    binned = whole.plot(Figure().subplots(), color='skyblue', edgecolor='black')
+    assert np.array_equal(raw[0], binned[0]) and np.array_equal(raw[1], binned[1])
+    for a, b in zip(raw[2], binned[2]):
+        assert a.get_bbox().bounds == b.get_bbox().bounds
+    print("✓ Success!")
+
+    # Test case 4: streamed histograms of the bundled data set
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data, mask_data
+        df = mask_data(load_data('nasa.csv', cache=False))
+        streamed = stream_histograms('nasa.csv', chunksize=1000)
+        avg_diameter = ((df['Est Dia in KM(min)'] + df['Est Dia in KM(max)']) / 2).to_numpy()
+        expected = Histogram.from_values(avg_diameter, bins=100)
+        assert np.array_equal(streamed['hist_diameter'].edges, expected.edges)
+        assert np.array_equal(streamed['hist_diameter'].counts, expected.counts)
+        orbit_intersections = df['Minimum Orbit Intersection'].dropna().to_numpy()
+        counts, edges = np.histogram(orbit_intersections,
+                                     bins=np.linspace(orbit_intersections.min(), orbit_intersections.max(), 11))
+        assert np.array_equal(streamed['hist_common_orbit'].counts, counts)
+        print("✓ Success!")
+
+    # Test case 5: missing diameters are not counted, in memory and streamed
+    print("\nTesting missing diameters...")
+    with_nan = np.concatenate([values[:50], [np.nan], values[50:]])
+    assert np.array_equal(Histogram.from_values(with_nan, bins=100).counts, whole.counts)
+    if os.path.exists('nasa.csv'):
+        import shutil
+        import tempfile
+        import pandas as pd
+        from asteroid_render import _hist_diameter_inputs
+        from nasa_asteroid_ds import load_data, mask_data
+        temp_dir = tempfile.mkdtemp()
+        try:
+            raw = pd.read_csv('nasa.csv')
+            in_window = np.flatnonzero(raw['Close Approach Date'].to_numpy() >= '2000-01-01')
+            raw.loc[in_window[0], 'Est Dia in KM(min)'] = np.nan
+            raw.loc[in_window[1], 'Est Dia in KM(max)'] = np.nan
+            file_path = os.path.join(temp_dir, 'blanked.csv')
+            raw.to_csv(file_path, index=False)
+            df = mask_data(load_data(file_path, cache=False))
+            in_memory = _hist_diameter_inputs(df)
+            streamed = stream_histograms(file_path, chunksize=1000)['hist_diameter']
+            assert in_memory['counts'].sum() == len(df) - 2
+            assert np.array_equal(streamed.edges, in_memory['edges'])
+            assert np.array_equal(streamed.counts, in_memory['counts'])
+        finally:
+            shutil.rmtree(temp_dir)
+    print("✓ Success!")
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_histogram()
@@ -0,0 +1,225 @@
+"""
+NASA Asteroid Data Analysis - per-asteroid index
+
+nasa.csv has one row per close approach, so the name, diameters, orbital
+elements and hazard flag of an asteroid are repeated on every approach.
+AsteroidIndex splits the rows into an asteroid table with one row per Neo
+Reference ID and a slim approaches table keyed by the integer position of the
+asteroid in that table. Approaches are sorted by asteroid, and an offsets
+array gives the slice of each one, so all the approaches of an asteroid are
+found in O(1) without a group-by.
+
+Sections D and G can run on AsteroidIndex.asteroids to count each asteroid
+once instead of once per approach.
+
+Usage: python asteroid_index.py
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Columns that describe a close approach rather than the asteroid
+APPROACH_COLUMNS = [
+    'Close Approach Date',
+    'Epoch Date Close Approach',
+    'Relative Velocity km per sec',
+    'Relative Velocity km per hr',
+    'Miles per hour',
+    'Miss Dist.(Astronomical)',
+    'Miss Dist.(lunar)',
+    'Miss Dist.(kilometers)',
+    'Miss Dist.(miles)',
+    'Orbiting Body',
+]
+
+# Key of the asteroids in the source rows
+ASTEROID_KEY = 'Neo Reference ID'
+
+# Column of the approaches table holding the position of the asteroid
+ASTEROID_COLUMN = 'asteroid'
+
+
+#########################
+## INDEX
+#########################
+class AsteroidIndex:
+    """
+    Close approach rows normalized into an asteroid table and an approaches table.
+
+    asteroids: one row per Neo Reference ID, sorted by it, with every column
+        that is not in APPROACH_COLUMNS; row i is asteroid i
+    approaches: the APPROACH_COLUMNS of every row and the 'asteroid' position,
+        sorted by asteroid and, within one asteroid, in the order of the source
+    offsets: approaches of asteroid i are the rows offsets[i]:offsets[i + 1]
+    """
+
+    def __init__(self, asteroids, approaches, offsets):
+        self.asteroids = asteroids
+        self.approaches = approaches
+        self.offsets = offsets
+        self._keys = asteroids[ASTEROID_KEY].to_numpy()
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Build the index of a DataFrame of close approaches.
+
+        The asteroid columns of the first approach of each asteroid are kept;
+        in nasa.csv they are the same on every approach.
+
+        Parameters:
+        df (pandas.DataFrame): DataFrame containing asteroid data
+
+        Returns:
+        AsteroidIndex: The normalized data
+        """
+        if ASTEROID_KEY not in df.columns:
+            raise ValueError(f"DataFrame must contain '{ASTEROID_KEY}' column")
+
+        keys, first, inverse = np.unique(df[ASTEROID_KEY].to_numpy(), return_index=True, return_inverse=True)
+        # A stable sort keeps the approaches of each asteroid in source order
+        order = np.argsort(inverse, kind='stable')
+        offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(inverse, minlength=len(keys)), out=offsets[1:])
+
+        asteroid_columns = [col for col in df.columns if col not in APPROACH_COLUMNS]
+        approach_columns = [col for col in df.columns if col in APPROACH_COLUMNS]
+        asteroids = df[asteroid_columns].iloc[first].reset_index(drop=True)
+        approaches = df[approach_columns].iloc[order].reset_index(drop=True)
+        approaches.insert(0, ASTEROID_COLUMN, inverse[order].astype(np.min_scalar_type(max(len(keys) - 1, 0))))
+        return cls(asteroids, approaches, offsets)
+
+    def __len__(self):
+        return len(self.asteroids)
+
+    def locate(self, neo_reference_id):
+        """
+        Position of an asteroid in the asteroid table.
+
+        Parameters:
+        neo_reference_id (int): Neo Reference ID of the asteroid
+
+        Returns:
+        int: Row of the asteroid table
+        """
+        position = int(np.searchsorted(self._keys, neo_reference_id))
+        if position == len(self._keys) or self._keys[position] != neo_reference_id:
+            raise KeyError(f"Unknown Neo Reference ID: {neo_reference_id}")
+        return position
+
+    def approaches_of(self, asteroid):
+        """
+        Close approaches of one asteroid, a slice of the approaches table.
+
+        Parameters:
+        asteroid (int): Row of the asteroid table, e.g. from locate()
+
+        Returns:
+        pandas.DataFrame: Approaches of the asteroid in source order
+        """
+        if not 0 <= asteroid < len(self):
+            raise IndexError(f"Asteroid {asteroid} out of range for {len(self)} asteroids")
+        return self.approaches.iloc[self.offsets[asteroid]:self.offsets[asteroid + 1]]
+
+    def approach_counts(self):
+        """
+        Number of close approaches of each asteroid.
+
+        Returns:
+        numpy.ndarray: Count per row of the asteroid table
+        """
+        return np.diff(self.offsets)
+
+    def to_frame(self):
+        """
+        One row per close approach again, with the asteroid columns repeated.
+
+        Rows come sorted by asteroid and columns in the order of the asteroid
+        table followed by the approach columns.
+
+        Returns:
+        pandas.DataFrame: Denormalized rows
+        """
+        asteroids = self.asteroids.iloc[self.approaches[ASTEROID_COLUMN].to_numpy()].reset_index(drop=True)
+        return pd.concat([asteroids, self.approaches.drop(columns=ASTEROID_COLUMN)], axis=1)
+
+    def memory_usage(self):
+        """
+        Bytes held by both tables and the offsets.
+
+        Returns:
+        int: Memory usage in bytes
+        """
+        return int(self.asteroids.memory_usage(deep=True).sum() + self.approaches.memory_usage(deep=True).sum()
+                   + self.offsets.nbytes)
+
+
+def test_asteroid_index():
+    """
+    Check the tables, lookups and round trip of the index.
+    """
+    import os
+
+    df = pd.DataFrame({
+        'Neo Reference ID': [30, 10, 30, 20, 10, 30],
+        'Name': [30, 10, 30, 20, 10, 30],
+        'Absolute Magnitude': [21.0, 25.5, 21.0, 19.2, 25.5, 21.0],
+        'Close Approach Date': ['2001-01-01', '2002-02-02', '2003-03-03', '2004-04-04', '2005-05-05', '2006-06-06'],
+        'Miss Dist.(kilometers)': [5.0, 4.0, 3.0, 2.0, 1.0, 0.5],
+    })
+
+    # Test case 1: one row per asteroid, approaches grouped in source order
+    index = AsteroidIndex.from_frame(df)
+    print(index.asteroids)
+    print(index.approaches)
+    assert list(index.asteroids['Neo Reference ID']) == [10, 20, 30]
+    assert list(index.asteroids.columns) == ['Neo Reference ID', 'Name', 'Absolute Magnitude']
+    assert list(index.offsets) == [0, 2, 3, 6]
+    assert list(index.approach_counts()) == [2, 1, 3]
+    assert list(index.approaches_of(index.locate(30))['Close Approach Date']) == ['2001-01-01', '2003-03-03',
+                                                                                 '2006-06-06']
+    print("✓ Success!")
+
+    # Test case 2: the round trip gives the source rows back
+    print("\nTesting round trip...")
+    restored = index.to_frame()
+    expected = df.sort_values('Neo Reference ID', kind='stable').reset_index(drop=True)[restored.columns]
+    pd.testing.assert_frame_equal(restored, expected)
+    print("✓ Success!")
+
+    # Test case 3: unknown asteroids and a missing key column
+    print("\nTesting errors...")
+    for lookup in [lambda: index.locate(15), lambda: index.approaches_of(3)]:
+        try:
+            lookup()
+            print("✗ Failed: Should have raised")
+        except (KeyError, IndexError) as e:
+            print(f"✓ Success! Correctly raised: {e}")
+    try:
+        AsteroidIndex.from_frame(df.drop(columns='Neo Reference ID'))
+        print("✗ Failed: Should have raised ValueError")
+    except ValueError as e:
+        print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 4: the bundled data set repeats no asteroid data and shrinks
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data
+        from asteroid_summary import summarize
+        nasa = load_data('nasa.csv', cache=False)
+        index = AsteroidIndex.from_frame(nasa)
+        per_asteroid = nasa.groupby('Neo Reference ID')[list(index.asteroids.columns)].nunique()
+        assert (per_asteroid == 1).all().all()
+        assert len(index) == nasa['Neo Reference ID'].nunique() and len(index.approaches) == len(nasa)
+        print(f"Memory: {nasa.memory_usage(deep=True).sum()} bytes -> {index.memory_usage()} bytes")
+        assert index.memory_usage() < nasa.memory_usage(deep=True).sum()
+        # The brightest asteroid is the same either way; G counts asteroids instead of approaches
+        assert summarize(index.asteroids, 'D').max_absolute_magnitude == summarize(nasa, 'D').max_absolute_magnitude
+        print("G per asteroid:", summarize(index.asteroids, 'G').min_max_diameter)
+        print("✓ Success!")
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_asteroid_index()
@@ -0,0 +1,545 @@
+"""
+NASA Asteroid Data Analysis - incremental ingestion
+
+The NASA feed grows by appending close approach rows to the end of the CSV
+file. ingest() keeps the mergeable results of sections C-G in a state file
+next to the source, together with the byte offset of the last row it read,
+so a re-run parses only the appended rows and merges them into the state.
+Section G keeps its column as two sorted runs, so the count above the new
+mean is a binary search instead of a pass over the history: the values of
+recent runs are kept in the state file, and are merged into the main run, a
+.npy file read with a memory map, once there are more than RECENT_RUN_SIZE of
+them. A daily update then costs the appended rows and the recent run, and
+the history is only moved and rewritten once per RECENT_RUN_SIZE values.
+
+Usage: python asteroid_ingest.py
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from asteroid_io import (DEFAULT_CHUNKSIZE, date_window_bounds, date_window_column, date_window_mask,
+                         read_csv_kwargs, read_header, schema_fingerprint)
+from asteroid_stream import DETAIL_DROP_COLUMNS, STREAM_COLUMNS
+from asteroid_summary import OrbitCounts, SectionState
+
+
+STATE_VERSION = 3
+
+# Values of the recent sorted run of section G before it is merged into the main run
+RECENT_RUN_SIZE = 1 << 16
+
+# Bytes before the ingested offset whose hash detects a rewritten file
+TAIL_CHECK_BYTES = 4096
+
+
+def state_path(file):
+    """
+    Path of the ingestion state of a CSV file.
+
+    Parameters:
+    file (str): Path to the source CSV file
+
+    Returns:
+    str: Path of the .state.npz file next to the source
+    """
+    return file + '.state.npz'
+
+
+def run_path(target, generation):
+    """
+    Path of a main sorted run of an ingestion state.
+
+    Parameters:
+    target (str): Path of the state file
+    generation (int): Number of the run, increased on each merge
+
+    Returns:
+    str: Path of the .npy file next to the state
+    """
+    return f"{os.path.splitext(target)[0]}.run{generation}.npy"
+
+
+#########################
+## BYTE RANGES
+#########################
+class _ByteRange(io.RawIOBase):
+    """
+    Read-only view of bytes [start, stop) of an open binary file.
+    """
+
+    def __init__(self, f, start, stop):
+        self._f = f
+        self._f.seek(start)
+        self._remaining = stop - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self._remaining)
+        if size <= 0:
+            return 0
+        read = self._f.readinto(memoryview(buffer)[:size])
+        self._remaining -= read
+        return read
+
+
+def _complete_end(f, size, block_size=1 << 16):
+    """
+    Offset just after the last newline of the file.
+
+    Rows after it are still being written and are left for the next run.
+
+    Parameters:
+    f (file): File open in binary mode
+    size (int): Size of the file
+
+    Returns:
+    int: Offset after the last b'\\n', or 0 if there is none
+    """
+    position = size
+    while position > 0:
+        start = max(0, position - block_size)
+        f.seek(start)
+        index = f.read(position - start).rfind(b'\n')
+        if index >= 0:
+            return start + index + 1
+        position = start
+    return 0
+
+
+def _tail_digest(f, offset):
+    """
+    SHA-256 of the TAIL_CHECK_BYTES bytes before an offset.
+    """
+    start = max(0, offset - TAIL_CHECK_BYTES)
+    f.seek(start)
+    return hashlib.sha256(f.read(offset - start)).hexdigest()
+
+
+#########################
+## SORTED COLUMN
+#########################
+def merge_sorted(values, new_values):
+    """
+    Merge values into a sorted array, dropping NaN.
+
+    Only new_values is sorted; the merge moves the existing array once, so
+    ingest() merges into the small recent run and only periodically into the
+    main run.
+
+    Parameters:
+    values (numpy.ndarray): Sorted array without NaN
+    new_values (numpy.ndarray): Values to add, in any order
+
+    Returns:
+    numpy.ndarray: Sorted array of both, with the dtype of values
+    """
+    new_values = np.sort(new_values[~np.isnan(new_values)]).astype(values.dtype, copy=False)
+    if len(values) == 0:
+        return new_values
+    return np.insert(values, np.searchsorted(values, new_values, side='right'), new_values)
+
+
+def count_above(values, threshold):
+    """
+    Count the values of a sorted array greater than a float64 threshold.
+
+    The threshold is rounded to the array dtype for the search and the values
+    equal to the rounded threshold are then decided exactly, so the result is
+    that of np.count_nonzero(values > threshold) without casting the array.
+
+    Parameters:
+    values (numpy.ndarray): Sorted array without NaN
+    threshold (float): Value to compare against
+
+    Returns:
+    int: Number of values above threshold
+    """
+    rounded = values.dtype.type(threshold)
+    side = 'right' if float(rounded) <= float(threshold) else 'left'
+    return len(values) - int(np.searchsorted(values, rounded, side=side))
+
+
+#########################
+## STATE FILE
+#########################
+def _extreme_arrays(extreme, dtype):
+    """(value, name) pair as two arrays of length 0 or 1."""
+    if extreme is None:
+        return np.empty(0, dtype=dtype), np.empty(0, dtype=np.int64)
+    value, name = extreme
+    return np.array([value]), np.array([name])
+
+
+def _extreme_from_arrays(values, names):
+    """Inverse of _extreme_arrays, keeping the numpy scalar types."""
+    if len(values) == 0:
+        return None
+    return values[0], names[0]
+
+
+def _write_atomic(target, save):
+    """
+    Write a file through a temporary file next to it, so a crash never leaves a partial file.
+
+    Parameters:
+    target (str): Path of the file
+    save (callable): Function writing the content to an open binary file
+
+    Returns:
+    bool: True if the file was written
+    """
+    try:
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(os.path.abspath(target)))
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            save(f)
+        os.replace(temp_path, target)
+    except OSError:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        return False
+    return True
+
+
+def write_run(target, values):
+    """
+    Write a main sorted run atomically.
+
+    Parameters:
+    target (str): Path of the .npy file
+    values (numpy.ndarray): Sorted values
+
+    Returns:
+    bool: True if the run was written
+    """
+    return _write_atomic(target, lambda f: np.save(f, values))
+
+
+def write_state(target, meta, state, recent):
+    """
+    Write an ingestion state atomically.
+
+    The main run of section G is written apart by write_run; meta['run']
+    names it, or is None while every value is in the recent run.
+
+    Parameters:
+    target (str): Path of the state file
+    meta (dict): Offset, file identity, window and main run of the state
+    state (SectionState): Aggregates of the ingested rows
+    recent (numpy.ndarray): Sorted 'Est Dia in KM(max)' values not yet in the main run
+
+    Returns:
+    bool: True if the state was written
+    """
+    meta = dict(meta, rows=state.rows, diameter_sum=state.diameter_sum,
+                diameter_count=state.diameter_count)
+    arrays = {'meta': np.array(json.dumps(meta)), 'recent': recent}
+    arrays['max_magnitude'], arrays['max_magnitude_name'] = _extreme_arrays(state.max_magnitude, np.float64)
+    arrays['min_miss_distance'], arrays['min_miss_distance_name'] = _extreme_arrays(
+        state.min_miss_distance, np.float64)
+    # First rows decide ties in common_orbit, so they are kept with the counts
+    arrays['orbit_ids'] = state.orbit_counts.ids
+    arrays['orbit_counts'] = state.orbit_counts.counts
+    arrays['orbit_first'] = state.orbit_counts.first
+    return _write_atomic(target, lambda f: np.savez(f, **arrays))
+
+
+def read_state(target):
+    """
+    Read an ingestion state written by write_state.
+
+    Parameters:
+    target (str): Path of the state file
+
+    Returns:
+    tuple: (meta, SectionState, main run, recent run), or None if there is no readable state
+    """
+    if not os.path.exists(target):
+        return None
+    try:
+        with np.load(target, allow_pickle=False) as saved:
+            meta = json.loads(str(saved['meta']))
+            if meta.get('version') != STATE_VERSION or meta.get('schema') != schema_fingerprint():
+                return None
+
+            state = SectionState()
+            state.rows = meta['rows']
+            state.diameter_sum = meta['diameter_sum']
+            state.diameter_count = meta['diameter_count']
+            state.max_magnitude = _extreme_from_arrays(saved['max_magnitude'], saved['max_magnitude_name'])
+            state.min_miss_distance = _extreme_from_arrays(saved['min_miss_distance'],
+                                                           saved['min_miss_distance_name'])
+            state.orbit_counts = OrbitCounts(saved['orbit_ids'], saved['orbit_counts'], saved['orbit_first'])
+            recent = saved['recent']
+        # The main run is mapped, not read: a daily update only searches it
+        main = np.empty(0, dtype=recent.dtype)
+        if meta['run'] is not None:
+            main = np.load(run_path(target, meta['run']), mmap_mode='r', allow_pickle=False)
+            if len(main) != meta['run_length']:
+                return None
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile, json.JSONDecodeError):
+        return None
+    return meta, state, main, recent
+
+
+#########################
+## INGESTION
+#########################
+def ingest(file, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None, state_file=None):
+    """
+    Compute the results of sections C-G, reading only the rows appended since the last run.
+
+    The first run reads the whole file. Later runs check that the ingested
+    part is unchanged (header, size and the bytes just before the offset) and
+    parse from the offset on; if it changed, or the window differs, the state
+    is rebuilt. A last row without its newline is left for the next run.
+    The appended diameters are merged into the recent run, and the recent run
+    into the main run once it holds more than RECENT_RUN_SIZE values.
+
+    Parameters:
+    file (str): Path to a plain CSV file
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+    state_file (str): Path of the state file, by default next to the source
+
+    Returns:
+    dict: Results keyed by section function name like stream_sections, plus
+    'rows_appended', the rows read in this run
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError(f"File does not exist: {file}")
+    if os.path.splitext(file.lower())[1] != '.csv':
+        raise ValueError(f"Incremental ingestion needs a plain .csv file, got: {file}")
+    if chunksize is None or chunksize < 1:
+        raise ValueError(f"chunksize must be a positive integer, got: {chunksize}")
+
+    # Check that the file has every column the sections need
+    header = read_header(file)
+    for col in STREAM_COLUMNS:
+        if col not in header:
+            raise ValueError(f"File must contain '{col}' column")
+    columns = STREAM_COLUMNS + [date_window_column(header)]
+    lo, hi = date_window_bounds(start, end)
+    window = [None if lo is None else lo.isoformat(), None if hi is None else hi.isoformat()]
+
+    target = state_file or state_path(file)
+    with open(file, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        stop = _complete_end(f, size)
+
+        # Resume from the saved state if the ingested part is still there
+        saved = read_state(target)
+        previous_run = None
+        if saved is not None:
+            meta, state, main, recent = saved
+            offset = meta['offset']
+            previous_run = meta['run']
+            if (meta['header'] != header or meta['window'] != window or offset > stop
+                    or meta['tail_sha256'] != _tail_digest(f, offset)):
+                saved = None
+        if saved is None:
+            meta = {'version': STATE_VERSION, 'schema': schema_fingerprint(), 'header': header,
+                    'window': window, 'rows_loaded': 0, 'run': None, 'run_length': 0}
+            state = SectionState()
+            main = recent = np.empty(0, dtype=np.float32)
+            f.seek(0)
+            offset = len(f.readline())
+
+        # Parse the appended rows only
+        rows_appended = 0
+        new_diameters = []
+        if stop > offset:
+            kwargs = read_csv_kwargs(header, columns)
+            source = io.BufferedReader(_ByteRange(f, offset, stop))
+            with pd.read_csv(source, header=None, names=header, chunksize=chunksize, **kwargs) as reader:
+                for chunk in reader:
+                    rows_appended += len(chunk)
+                    chunk = chunk[date_window_mask(chunk, start, end)]
+                    state.update(chunk)
+                    new_diameters.append(chunk['Est Dia in KM(max)'].to_numpy())
+            offset = stop
+
+        tail_sha256 = _tail_digest(f, offset)
+
+    if rows_appended or saved is None:
+        if new_diameters:
+            recent = merge_sorted(recent, np.concatenate(new_diameters))
+        meta = dict(meta, offset=offset, tail_sha256=tail_sha256,
+                    rows_loaded=meta['rows_loaded'] + rows_appended)
+        # Move the history only once the recent run is large
+        if len(recent) > RECENT_RUN_SIZE:
+            generation = (previous_run or 0) + 1
+            merged = merge_sorted(main, recent)
+            if write_run(run_path(target, generation), merged):
+                main, recent = merged, np.empty(0, dtype=merged.dtype)
+                meta = dict(meta, run=generation, run_length=len(main))
+        if write_state(target, meta, state, recent) and previous_run is not None and previous_run != meta['run']:
+            try:
+                os.remove(run_path(target, previous_run))
+            except OSError:
+                pass
+
+    count_above_avg = 0
+    if state.diameter_count > 0:
+        mean = state.mean_max_diameter()
+        count_above_avg = count_above(main, mean) + count_above(recent, mean)
+
+    kept = [col for col in header if col not in DETAIL_DROP_COLUMNS]
+    return {
+        'rows_loaded': meta['rows_loaded'],
+        'rows_appended': rows_appended,
+        'rows': state.rows,
+        'data_details': (state.rows, len(kept), kept),
+        'max_absolute_magnitude': state.max_absolute_magnitude(),
+        'closest_to_earth': state.closest_to_earth(),
+        'common_orbit': state.common_orbit(),
+        'min_max_diameter': count_above_avg,
+    }
+
+
+def test_ingest():
+    """
+    Compare incremental results with streaming over the whole file after each append.
+    """
+    from asteroid_stream import stream_sections
+
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        header = ("Neo Reference ID,Name,Absolute Magnitude,Est Dia in KM(max),Close Approach Date,"
+                  "Miss Dist.(kilometers),Orbiting Body,Orbit ID,Equinox\n")
+        rows = ["1,1001,25.0,0.5,1995-01-01,100,Earth,7,J2000\n",
+                "2,1002,22.5,1.2,2000-01-20,5000,Earth,8,J2000\n",
+                "3,1003,22.5,0.8,2001-03-03,2500,Earth,8,J2000\n",
+                "4,1004,19.8,,2005-07-04,2500,Earth,7,J2000\n",
+                "5,1005,16.3,2.5,2010-11-30,4200,Earth,9,J2000\n",
+                "6,1006,28.5,0.3,1999-12-31,10,Earth,9,J2000\n",
+                "7,1007,27.0,3.0,2012-05-05,90,Earth,9,J2000\n"]
+        file_path = os.path.join(temp_dir, "nasa_sample.csv")
+
+        def check(result):
+            expected = stream_sections(file_path)
+            for key, value in expected.items():
+                assert result[key] == value, f"{key}: {result[key]} != {value}"
+
+        # Test case 1: the first run reads every row
+        with open(file_path, 'w') as f:
+            f.write(header + ''.join(rows[:3]))
+        result = ingest(file_path)
+        print("First run:", result)
+        check(result)
+        assert result['rows_appended'] == 3 and os.path.exists(state_path(file_path))
+        print("✓ Success!")
+
+        # Test case 2: a re-run reads only the appended rows
+        print("\nTesting append...")
+        with open(file_path, 'a') as f:
+            f.write(''.join(rows[3:6]))
+        result = ingest(file_path)
+        check(result)
+        assert result['rows_appended'] == 3 and result['rows_loaded'] == 6
+        assert ingest(file_path)['rows_appended'] == 0
+        print("✓ Success!")
+
+        # Test case 3: a row without its newline waits for the next run
+        print("\nTesting partial row...")
+        with open(file_path, 'a') as f:
+            f.write(rows[6][:10])
+        assert ingest(file_path)['rows_appended'] == 0
+        with open(file_path, 'a') as f:
+            f.write(rows[6][10:])
+        result = ingest(file_path)
+        check(result)
+        assert result['rows_appended'] == 1 and result['max_absolute_magnitude'] == (1007, 27.0)
+        print("✓ Success!")
+
+        # Test case 4: a rewritten file or another window rebuilds the state
+        print("\nTesting rebuild...")
+        with open(file_path, 'w') as f:
+            f.write(header + rows[1].replace('1002,22.5', '1002,30.5') + ''.join(rows[2:]))
+        result = ingest(file_path)
+        check(result)
+        assert result['rows_appended'] == 6 and result['max_absolute_magnitude'] == (1002, 30.5)
+        result = ingest(file_path, start=None)
+        assert result['rows_appended'] == 6 and result['rows'] == 6
+        print("✓ Success!")
+
+        # Test case 5: archives cannot be appended to
+        print("\nTesting archive...")
+        import gzip
+        with open(file_path, 'rb') as f, gzip.open(file_path + '.gz', 'wb') as archive:
+            archive.write(f.read())
+        try:
+            ingest(file_path + '.gz')
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+        # Test case 6: exact count above a mean that float32 cannot represent
+        print("\nTesting sorted count...")
+        values = merge_sorted(np.empty(0, dtype=np.float32), np.array([0.1, 0.3, np.nan, 0.2], dtype=np.float32))
+        for threshold in [0.0, 0.1, float(np.float32(0.1)), 0.2, 0.25, 0.3, 1.0]:
+            assert count_above(values, threshold) == np.count_nonzero(values.astype(np.float64) > threshold)
+        print("✓ Success!")
+
+        # Test case 7: the recent run is merged into a new main run once it is large
+        print("\nTesting sorted runs...")
+        global RECENT_RUN_SIZE
+        recent_run_size, RECENT_RUN_SIZE = RECENT_RUN_SIZE, 2
+        try:
+            runs_path = os.path.join(temp_dir, "nasa_runs.csv")
+            target = state_path(runs_path)
+            with open(runs_path, 'w') as f:
+                f.write(header + ''.join(rows[1:3]))
+            ingest(runs_path)
+            assert not os.path.exists(run_path(target, 1))
+            for appended, generation in [(rows[3:5], 1), (rows[5:], 1), (rows[1:3], 2)]:
+                with open(runs_path, 'a') as f:
+                    f.write(''.join(appended))
+                result = ingest(runs_path)
+                assert result == dict(stream_sections(runs_path), rows_loaded=result['rows_loaded'],
+                                      rows_appended=len(appended)), result
+                assert os.path.exists(run_path(target, generation))
+            assert not os.path.exists(run_path(target, 1))
+        finally:
+            RECENT_RUN_SIZE = recent_run_size
+        print("✓ Success!")
+
+        # Test case 8: the bundled data set, ingested in two halves
+        if os.path.exists('nasa.csv'):
+            print("\nTesting nasa.csv...")
+            with open('nasa.csv', 'rb') as f:
+                lines = f.readlines()
+            half = len(lines) // 2
+            with open(file_path, 'wb') as f:
+                f.writelines(lines[:half])
+            ingest(file_path, chunksize=1000)
+            with open(file_path, 'ab') as f:
+                f.writelines(lines[half:])
+            result = ingest(file_path, chunksize=1000)
+            assert result['rows_appended'] == len(lines) - half
+            check(result)
+            print("✓ Success!")
+
+    finally:
+        # Clean up the temporary files
+        import shutil
+        shutil.rmtree(temp_dir)
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_ingest()
@@ -0,0 +1,940 @@
+"""
+NASA Asteroid Data Analysis - input layer
+
+Declared schema of the NASA asteroid file and the helpers load_data uses to
+parse it with compact dtypes, loading only the columns a caller asks for, from
+a plain or compressed CSV, to keep a binary columnar cache of the parsed file
+next to the source, and to convert the data set into a memory-mapped column
+store.
+
+Usage: python asteroid_io.py
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+import zipfile
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+
+#########################
+## SCHEMA
+#########################
+# dtype of every column in nasa.csv.
+# float32 keeps ~7 significant digits, which is more than the source carries for
+# the physical measurements. Julian dates, the km/miles/AU miss distances and the
+# absolute magnitude keep float64: sections D and E return them and they are
+# compared exactly.
+NASA_SCHEMA = {
+    'Neo Reference ID': 'int32',
+    'Name': 'int32',
+    'Absolute Magnitude': 'float64',
+    'Est Dia in KM(min)': 'float32',
+    'Est Dia in KM(max)': 'float32',
+    'Est Dia in M(min)': 'float32',
+    'Est Dia in M(max)': 'float32',
+    'Est Dia in Miles(min)': 'float32',
+    'Est Dia in Miles(max)': 'float32',
+    'Est Dia in Feet(min)': 'float32',
+    'Est Dia in Feet(max)': 'float32',
+    'Close Approach Date': 'datetime64',
+    'Epoch Date Close Approach': 'int64',
+    'Relative Velocity km per sec': 'float32',
+    'Relative Velocity km per hr': 'float32',
+    'Miles per hour': 'float32',
+    'Miss Dist.(Astronomical)': 'float64',
+    'Miss Dist.(lunar)': 'float32',
+    'Miss Dist.(kilometers)': 'float64',
+    'Miss Dist.(miles)': 'float64',
+    'Orbiting Body': 'category',
+    'Orbit ID': 'int16',
+    'Orbit Determination Date': 'datetime64',
+    'Orbit Uncertainity': 'int8',
+    'Minimum Orbit Intersection': 'float32',
+    'Jupiter Tisserand Invariant': 'float32',
+    'Epoch Osculation': 'float64',
+    'Eccentricity': 'float32',
+    'Semi Major Axis': 'float32',
+    'Inclination': 'float32',
+    'Asc Node Longitude': 'float32',
+    'Orbital Period': 'float32',
+    'Perihelion Distance': 'float32',
+    'Perihelion Arg': 'float32',
+    'Aphelion Dist': 'float32',
+    'Perihelion Time': 'float64',
+    'Mean Anomaly': 'float32',
+    'Mean Motion': 'float32',
+    'Equinox': 'category',
+    'Hazardous': 'bool',
+}
+
+# Fixed formats of the two date columns, so pandas does not have to infer them
+DATE_FORMATS = {
+    'Close Approach Date': '%Y-%m-%d',
+    'Orbit Determination Date': '%Y-%m-%d %H:%M:%S',
+}
+
+
+# Compressed archives load_data accepts next to plain .csv files
+COMPRESSED_EXTENSIONS = ('.zip', '.gz', '.bz2', '.xz', '.zst')
+
+# Rows per chunk when a file is read in chunks
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def is_supported_file(file):
+    """
+    Check whether a path names a CSV file or a compressed archive of one.
+
+    Parameters:
+    file (str): Path to the file
+
+    Returns:
+    bool: True for .csv, .zip, .gz, .bz2, .xz and .zst paths
+    """
+    extension = os.path.splitext(file.lower())[1]
+    return extension == '.csv' or extension in COMPRESSED_EXTENSIONS
+
+
+def zip_member(archive):
+    """
+    Pick the CSV member of a zip archive.
+
+    Parameters:
+    archive (zipfile.ZipFile): Open archive
+
+    Returns:
+    str: Name of the only .csv member, or of the only member
+    """
+    names = [info.filename for info in archive.infolist() if not info.is_dir()]
+    csv_names = [name for name in names if name.lower().endswith('.csv')]
+    if len(csv_names) == 1:
+        return csv_names[0]
+    if len(names) == 1:
+        return names[0]
+    raise ValueError(f"Zip archive must contain exactly one .csv file, found: {names}")
+
+
+@contextmanager
+def open_csv(file):
+    """
+    Open a CSV file or archive as a source for pandas.read_csv.
+
+    Archives are decompressed while pandas reads them, without a temporary file.
+    A zip archive may hold other files next to its one CSV member.
+
+    Parameters:
+    file (str): Path to a .csv file or a .zip/.gz/.bz2/.xz/.zst archive
+
+    Returns:
+    context manager: Yields a path or binary stream for pandas.read_csv
+    """
+    if os.path.splitext(file.lower())[1] == '.zip':
+        with zipfile.ZipFile(file) as archive:
+            with archive.open(zip_member(archive)) as member:
+                yield member
+    else:
+        # pandas infers gzip, bz2, xz and zstd from the extension
+        yield file
+
+
+def read_header(file):
+    """
+    Read only the header line of a CSV file.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+
+    Returns:
+    list: Column titles in file order
+    """
+    with open_csv(file) as source:
+        return list(pd.read_csv(source, sep=',', nrows=0).columns)
+
+
+def read_csv_kwargs(header, columns=None):
+    """
+    Build the pandas.read_csv arguments that apply NASA_SCHEMA to a file.
+
+    Columns of the file that are not in the schema keep the pandas defaults,
+    so any CSV can still be loaded.
+
+    Parameters:
+    header (list): Column titles of the file
+    columns (list): Columns to load, or None for all of them
+
+    Returns:
+    dict: Keyword arguments for pandas.read_csv
+    """
+    # Check that every requested column is in the file
+    if columns is not None:
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise ValueError(f"Columns not found in file: {missing}")
+        selected = [col for col in header if col in columns]
+    else:
+        selected = header
+
+    dtypes = {}
+    dates = []
+    for col in selected:
+        dtype = NASA_SCHEMA.get(col)
+        if dtype == 'datetime64':
+            dates.append(col)
+        elif dtype is not None:
+            dtypes[col] = dtype
+
+    kwargs = {'sep': ',', 'dtype': dtypes}
+    if columns is not None:
+        kwargs['usecols'] = selected
+    if dates:
+        kwargs['parse_dates'] = dates
+        kwargs['date_format'] = {col: DATE_FORMATS[col] for col in dates}
+    return kwargs
+
+
+def read_csv(file, columns=None, date_window=None):
+    """
+    Parse a CSV file or archive with NASA_SCHEMA.
+
+    With a date window the file is parsed in chunks and rows outside the window
+    are dropped chunk by chunk, so they are never held all at once.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    columns (list): Columns to load, or None for all of them
+    date_window (tuple): (start, end) close approach window, see date_window_mask
+
+    Returns:
+    pandas.DataFrame: Parsed data
+    """
+    if date_window is not None:
+        chunks = list(read_chunks(file, DEFAULT_CHUNKSIZE, columns, date_window))
+        if chunks:
+            return pd.concat(chunks)
+
+    kwargs = read_csv_kwargs(read_header(file), columns)
+    with open_csv(file) as source:
+        return pd.read_csv(source, **kwargs)
+
+
+def read_chunks(file, chunksize, columns=None, date_window=None):
+    """
+    Read a CSV file with NASA_SCHEMA as a stream of DataFrames.
+
+    The index keeps counting across chunks, as if the file had been loaded whole.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    chunksize (int): Number of rows per chunk
+    columns (list): Columns to load, or None for all of them
+    date_window (tuple): (start, end) close approach window, see date_window_mask
+
+    Returns:
+    iterator: pandas.DataFrame chunks of at most chunksize rows
+    """
+    if chunksize is None or chunksize < 1:
+        raise ValueError(f"chunksize must be a positive integer, got: {chunksize}")
+
+    header = read_header(file)
+    kwargs = read_csv_kwargs(header, columns)
+
+    # Parse the column the window is tested on even if it was not asked for
+    window_column = None
+    if date_window is not None:
+        window_column = date_window_column(header)
+        if columns is not None and window_column not in columns:
+            kwargs = read_csv_kwargs(header, list(columns) + [window_column])
+        else:
+            window_column = None
+
+    with open_csv(file) as source:
+        with pd.read_csv(source, chunksize=chunksize, **kwargs) as reader:
+            for chunk in reader:
+                if date_window is not None:
+                    chunk = chunk[date_window_mask(chunk, *date_window)]
+                if window_column is not None:
+                    chunk = chunk.drop(columns=window_column)
+                yield chunk
+
+
+#########################
+## DATE WINDOW
+#########################
+# Close approach columns a date window can be tested on, fastest first:
+# integer milliseconds compare without any parsing
+EPOCH_COLUMN = 'Epoch Date Close Approach'
+DATE_COLUMN = 'Close Approach Date'
+
+
+def date_window_column(header):
+    """
+    Pick the column a date window is tested on.
+
+    Parameters:
+    header (list): Column titles
+
+    Returns:
+    str: 'Epoch Date Close Approach' if present, else 'Close Approach Date'
+    """
+    if EPOCH_COLUMN in header:
+        return EPOCH_COLUMN
+    if DATE_COLUMN in header:
+        return DATE_COLUMN
+    raise ValueError(f"DataFrame must contain '{DATE_COLUMN}' column")
+
+
+def date_window_bounds(start=None, end=None):
+    """
+    Turn the ends of a [start, end) date window into midnight Timestamps.
+
+    Close approach dates are whole days, so a bound inside a day moves to the
+    next midnight; both bounds then select the same days on either column.
+
+    Parameters:
+    start: First date in the window (str, datetime or Timestamp), or None for no lower bound
+    end: First date after the window, or None for no upper bound
+
+    Returns:
+    tuple: (start, end) as pandas.Timestamp or None
+    """
+    start = pd.Timestamp(start).ceil('D') if start is not None else None
+    end = pd.Timestamp(end).ceil('D') if end is not None else None
+    if start is not None and end is not None and end < start:
+        raise ValueError(f"Date window end {end.date()} is before its start {start.date()}")
+    return start, end
+
+
+def date_window_mask(df, start=None, end=None):
+    """
+    Boolean mask of the rows whose close approach date is in [start, end).
+
+    Uses the integer 'Epoch Date Close Approach' column when present. It holds
+    the approach time in milliseconds, always within the UTC day of
+    'Close Approach Date', so comparing it against midnight bounds selects the
+    same rows. Otherwise 'Close Approach Date' is compared as datetime64;
+    string dates are converted first.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame with one of the close approach columns
+    start: First date in the window, or None
+    end: First date after the window, or None
+
+    Returns:
+    numpy.ndarray: bool array with one entry per row
+    """
+    start, end = date_window_bounds(start, end)
+    column = date_window_column(df.columns)
+
+    values = df[column]
+    if column == EPOCH_COLUMN and values.dtype.kind in 'iu':
+        values = values.to_numpy()
+        bounds = [None if bound is None else bound.value // 1_000_000 for bound in (start, end)]
+    else:
+        if column == EPOCH_COLUMN:
+            values = pd.to_datetime(values, unit='ms')
+        elif not pd.api.types.is_datetime64_any_dtype(values):
+            values = pd.to_datetime(values, format='ISO8601')
+        values = values.to_numpy()
+        bounds = [None if bound is None else bound.to_datetime64() for bound in (start, end)]
+
+    mask = np.ones(len(values), dtype=bool)
+    if bounds[0] is not None:
+        mask &= values >= bounds[0]
+    if bounds[1] is not None:
+        mask &= values < bounds[1]
+    return mask
+
+
+#########################
+## CACHE
+#########################
+# Bump when the cache layout changes so old cache files are rebuilt
+CACHE_VERSION = 1
+
+
+def cache_path(file):
+    """
+    Path of the binary cache that belongs to a CSV file.
+
+    Parameters:
+    file (str): Path to the CSV file
+
+    Returns:
+    str: Path of the .npz cache next to the CSV
+    """
+    return file + '.npz'
+
+
+def file_sha256(file, block_size=1 << 20):
+    """
+    Hash the content of a file in fixed-size blocks.
+
+    Parameters:
+    file (str): Path to the file
+    block_size (int): Bytes read per block
+
+    Returns:
+    str: Hex digest of the SHA-256 of the file
+    """
+    digest = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def schema_fingerprint():
+    """
+    Hash of the declared schema, so a schema change invalidates every cache.
+
+    Returns:
+    str: Hex digest of NASA_SCHEMA and DATE_FORMATS
+    """
+    text = json.dumps([CACHE_VERSION, NASA_SCHEMA, DATE_FORMATS], sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _encode_column(series):
+    """
+    Split a column into a NumPy array and the JSON metadata needed to rebuild it.
+
+    Returns None for dtypes the cache does not support.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        meta = {'kind': 'category', 'categories': series.cat.categories.tolist()}
+        return series.cat.codes.to_numpy(), meta
+    if pd.api.types.is_string_dtype(dtype):
+        # dictionary-encode strings; code -1 marks a missing value
+        codes, uniques = pd.factorize(series)
+        if not all(isinstance(value, str) for value in uniques):
+            return None
+        meta = {'kind': 'string', 'dtype': str(dtype), 'categories': uniques.tolist()}
+        return codes, meta
+    if dtype.kind in 'biufM':
+        return series.to_numpy(), {'kind': 'array'}
+    return None
+
+
+def _decode_column(values, meta):
+    """
+    Rebuild a column written by _encode_column or write_column_store.
+    """
+    if meta['kind'] == 'category':
+        # the codes were written by _encode_column, so skip validating them
+        dtype = pd.CategoricalDtype(meta['categories'])
+        return pd.Categorical.from_codes(values, dtype=dtype, validate=False)
+    if meta['kind'] == 'string':
+        uniques = pd.Index(meta['categories'], dtype=meta['dtype'])
+        return uniques.take(values, allow_fill=True, fill_value=np.nan)
+    return values
+
+
+# (path, size, mtime_ns) of sources whose cache could not be written
+_UNCACHEABLE = set()
+
+
+def _source_key(file):
+    stat = os.stat(file)
+    return os.path.abspath(file), stat.st_size, stat.st_mtime_ns
+
+
+def cache_writable(file):
+    """
+    Whether write_cache can be expected to store the cache of a source.
+
+    False when the directory of the cache is not writable, or when writing
+    the cache of this version of the source already failed in this process.
+
+    Parameters:
+    file (str): Path to the source CSV file
+
+    Returns:
+    bool: True if a full parse would be kept in the cache
+    """
+    if not os.access(os.path.dirname(os.path.abspath(cache_path(file))), os.W_OK):
+        return False
+    return _source_key(file) not in _UNCACHEABLE
+
+
+def write_cache(file, df):
+    """
+    Write a DataFrame loaded from a CSV file to its columnar .npz cache.
+
+    The cache records the size, modification time and SHA-256 of the source and
+    the schema fingerprint. Failing to write (read-only directory, unsupported
+    column type) only means the next load parses the CSV again.
+
+    Parameters:
+    file (str): Path to the source CSV file
+    df (pandas.DataFrame): Full DataFrame parsed from the file
+
+    Returns:
+    bool: True if the cache was written
+    """
+    written = _write_cache(file, df)
+    if not written:
+        _UNCACHEABLE.add(_source_key(file))
+    return written
+
+
+def _write_cache(file, df):
+    arrays = {}
+    columns = []
+    for i, col in enumerate(df.columns):
+        encoded = _encode_column(df[col])
+        if encoded is None:
+            return False
+        arrays[f'c{i}'], meta = encoded
+        columns.append(dict(meta, name=col))
+
+    stat = os.stat(file)
+    manifest = {
+        'schema': schema_fingerprint(),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': file_sha256(file),
+        'rows': len(df),
+        'columns': columns,
+    }
+    arrays['manifest'] = np.array(json.dumps(manifest))
+
+    # Write to a temporary file first so readers never see a partial cache
+    target = cache_path(file)
+    try:
+        fd, temp_path = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(os.path.abspath(target)))
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, target)
+    except OSError:
+        os.remove(temp_path)
+        return False
+    return True
+
+
+def read_cache(file, columns=None, date_window=None):
+    """
+    Load a DataFrame from the cache of a CSV file if the cache is still valid.
+
+    A cache is valid when it was written with the current schema and the source
+    has the recorded size and modification time. If only the modification time
+    differs, the content hash decides.
+
+    Parameters:
+    file (str): Path to the source CSV file
+    columns (list): Columns to load, or None for all of them
+    date_window (tuple): (start, end) close approach window, see date_window_mask
+
+    Returns:
+    pandas.DataFrame: Cached DataFrame, or None if there is no valid cache
+    """
+    target = cache_path(file)
+    if not os.path.exists(target):
+        return None
+
+    try:
+        with np.load(target, allow_pickle=False) as cache:
+            manifest = json.loads(str(cache['manifest']))
+
+            # Check the cache against the schema and the source file
+            stat = os.stat(file)
+            if manifest['schema'] != schema_fingerprint() or manifest['size'] != stat.st_size:
+                return None
+            touched = manifest['mtime_ns'] != stat.st_mtime_ns
+            if touched and manifest['sha256'] != file_sha256(file):
+                return None
+
+            def load(i, meta):
+                return cache[f'c{i}']
+
+            df = _select_columns(manifest, load, columns, date_window)
+    except (OSError, KeyError, zipfile.BadZipFile, json.JSONDecodeError):
+        return None
+
+    # Same content with a new mtime: refresh the cache so the hash is not needed again
+    if touched and columns is None and date_window is None:
+        write_cache(file, df)
+    return df
+
+
+def _select_columns(manifest, load, columns=None, date_window=None):
+    """
+    Build a DataFrame from the encoded columns of a cache or column store.
+
+    Only the requested columns are loaded. With a date window the rows are
+    selected on the encoded arrays, before strings and categories are decoded.
+
+    Parameters:
+    manifest (dict): Manifest with 'rows' and the 'columns' metadata
+    load (function): Returns the encoded array of column i given (i, meta)
+    columns (list): Columns to load, or None for all of them
+    date_window (tuple): (start, end) close approach window, see date_window_mask
+
+    Returns:
+    pandas.DataFrame: Selected columns and rows
+    """
+    header = [meta['name'] for meta in manifest['columns']]
+    if columns is not None:
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise ValueError(f"Columns not found in file: {missing}")
+
+    index = pd.RangeIndex(manifest['rows'])
+    rows = None
+    if date_window is not None:
+        i = header.index(date_window_column(header))
+        meta = manifest['columns'][i]
+        window = pd.DataFrame({meta['name']: _decode_column(load(i, meta), meta)})
+        rows = np.flatnonzero(date_window_mask(window, *date_window))
+        index = pd.Index(rows)
+
+    data = {}
+    for i, meta in enumerate(manifest['columns']):
+        if columns is None or meta['name'] in columns:
+            values = load(i, meta)
+            if rows is not None:
+                values = values[rows]
+            data[meta['name']] = _decode_column(values, meta)
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+#########################
+## COLUMN STORE
+#########################
+# A column store is a directory with one .npy file per column, a vocabulary
+# file per string column and a manifest. Opening it maps the files read-only,
+# so it takes the same time for any size and processes that open the same
+# store share one copy of the data in the page cache.
+STORE_MANIFEST = 'manifest.json'
+
+
+def _code_dtype(size):
+    """Smallest integer dtype pandas uses for the codes of `size` categories."""
+    for dtype in (np.int8, np.int16, np.int32):
+        if size < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def is_column_store(directory):
+    """
+    Check whether a path is a column store written by write_column_store.
+
+    Parameters:
+    directory (str): Path to check
+
+    Returns:
+    bool: True if the directory holds a store manifest
+    """
+    return os.path.isfile(os.path.join(directory, STORE_MANIFEST))
+
+
+def write_column_store(source, directory, chunksize=1_000_000):
+    """
+    Convert a CSV file or archive into a memory-mappable column store.
+
+    The source is read in chunks, so converting needs memory for one chunk only.
+    Strings and categories are stored as integer codes plus a vocabulary;
+    categories are sorted like pandas.read_csv sorts them.
+
+    Parameters:
+    source (str): Path to the CSV file or archive
+    directory (str): Directory to write the store to
+    chunksize (int): Number of rows converted at a time
+
+    Returns:
+    int: Number of rows written
+    """
+    os.makedirs(directory, exist_ok=True)
+    header = read_header(source)
+    kinds = [None] * len(header)
+    dtypes = [None] * len(header)
+    string_dtypes = [None] * len(header)
+    vocabularies = [{} for _ in header]
+    rows = 0
+
+    with tempfile.TemporaryDirectory(dir=directory) as raw_dir:
+        raw_files = [open(os.path.join(raw_dir, f'c{i}.raw'), 'wb') for i in range(len(header))]
+        try:
+            # First pass: append every chunk to one raw file per column
+            for chunk in read_chunks(source, chunksize):
+                rows += len(chunk)
+                for i, col in enumerate(header):
+                    series = chunk[col]
+                    if isinstance(series.dtype, pd.CategoricalDtype):
+                        kind = 'category'
+                    elif pd.api.types.is_string_dtype(series.dtype):
+                        kind = 'string'
+                    elif series.dtype.kind in 'biufM':
+                        kind = 'array'
+                    else:
+                        raise ValueError(f"Column '{col}' has unsupported dtype {series.dtype}")
+
+                    if kind == 'array':
+                        values = series.to_numpy()
+                        if dtypes[i] is not None and dtypes[i] != values.dtype:
+                            raise ValueError(f"Column '{col}' changes dtype from {dtypes[i]} to {values.dtype} "
+                                             f"between chunks; declare it in NASA_SCHEMA")
+                    else:
+                        # map the chunk's codes onto the store-wide vocabulary
+                        codes, uniques = pd.factorize(series)
+                        vocabulary = vocabularies[i]
+                        mapping = np.array([vocabulary.setdefault(value, len(vocabulary)) for value in uniques] + [-1],
+                                           dtype=np.int64)
+                        values = mapping[codes]
+                    if kinds[i] is None:
+                        kinds[i] = kind
+                        string_dtypes[i] = str(series.dtype)
+                    dtypes[i] = values.dtype
+                    raw_files[i].write(np.ascontiguousarray(values).tobytes())
+        finally:
+            for f in raw_files:
+                f.close()
+
+        # Second pass: turn each raw file into a .npy file with the final dtype
+        columns = []
+        for i, col in enumerate(header):
+            raw_path = os.path.join(raw_dir, f'c{i}.raw')
+            meta = {'name': col, 'file': f'c{i}.npy', 'kind': kinds[i] or 'array'}
+            remap = None
+            dtype = dtypes[i] if dtypes[i] is not None else np.dtype(np.float64)
+
+            if kinds[i] in ('category', 'string'):
+                vocabulary = list(vocabularies[i])
+                if kinds[i] == 'category':
+                    order = sorted(range(len(vocabulary)), key=lambda code: vocabulary[code])
+                    remap = np.empty(len(vocabulary) + 1, dtype=np.int64)
+                    remap[order] = np.arange(len(vocabulary))
+                    remap[-1] = -1
+                    vocabulary = [vocabulary[code] for code in order]
+                meta['vocabulary'] = f'c{i}.vocab.json'
+                if kinds[i] == 'string':
+                    meta['dtype'] = string_dtypes[i]
+                with open(os.path.join(directory, meta['vocabulary']), 'w') as f:
+                    json.dump(vocabulary, f)
+                target_dtype = _code_dtype(len(vocabulary))
+            else:
+                target_dtype = dtype
+
+            target = np.lib.format.open_memmap(os.path.join(directory, meta['file']), mode='w+',
+                                               dtype=target_dtype, shape=(rows,)) if rows else None
+            if target is None:
+                np.save(os.path.join(directory, meta['file']), np.empty(0, dtype=target_dtype))
+            else:
+                with open(raw_path, 'rb') as f:
+                    start = 0
+                    for block in iter(lambda: f.read(chunksize * dtype.itemsize), b''):
+                        values = np.frombuffer(block, dtype=dtype)
+                        if remap is not None:
+                            values = remap[values]
+                        target[start:start + len(values)] = values
+                        start += len(values)
+                target.flush()
+                del target
+            columns.append(meta)
+
+    stat = os.stat(source)
+    manifest = {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(source),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'schema': schema_fingerprint(),
+        'rows': rows,
+        'columns': columns,
+    }
+    # The manifest is written last, so a half-written store is never opened
+    with open(os.path.join(directory, STORE_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return rows
+
+
+def read_column_store(directory, columns=None, date_window=None):
+    """
+    Open a column store as a DataFrame backed by read-only memory maps.
+
+    Numeric, bool, datetime and categorical columns wrap the mapped files
+    without copying, so the DataFrame must not be modified in place.
+    Plain string columns are decoded into memory. With a date window only the
+    selected rows are copied out of the mapped files.
+
+    Parameters:
+    directory (str): Path of a store written by write_column_store
+    columns (list): Columns to open, or None for all of them
+    date_window (tuple): (start, end) close approach window, see date_window_mask
+
+    Returns:
+    pandas.DataFrame: DataFrame over the mapped columns
+    """
+    if not is_column_store(directory):
+        raise ValueError(f"Directory is not a column store: {directory}")
+
+    with open(os.path.join(directory, STORE_MANIFEST)) as f:
+        manifest = json.load(f)
+
+    # np.load cannot map a zero-length array
+    mmap_mode = 'r' if manifest['rows'] else None
+
+    def load(i, meta):
+        # The vocabulary is read only for the columns that are used
+        if 'vocabulary' in meta and 'categories' not in meta:
+            with open(os.path.join(directory, meta['vocabulary'])) as f:
+                meta['categories'] = json.load(f)
+        # view as a plain ndarray; the view keeps the mapping open
+        return np.load(os.path.join(directory, meta['file']), mmap_mode=mmap_mode).view(np.ndarray)
+
+    return _select_columns(manifest, load, columns, date_window)
+
+
+#########################
+## MEMORY REPORT
+#########################
+def memory_report(file, columns=None):
+    """
+    Compare the memory of a file loaded with default dtypes and with NASA_SCHEMA.
+
+    Parameters:
+    file (str): Path to the CSV file
+    columns (list): Columns to load, or None for all of them
+
+    Returns:
+    pandas.DataFrame: Bytes per column before and after, plus a 'TOTAL' row
+    """
+    kwargs = read_csv_kwargs(read_header(file), columns)
+
+    # default dtypes of pandas.read_csv
+    with open_csv(file) as source:
+        before = pd.read_csv(source, sep=',', usecols=kwargs.get('usecols'))
+    # declared schema
+    after = read_csv(file, columns)
+
+    report = pd.DataFrame({
+        'dtype before': before.dtypes.astype(str),
+        'dtype after': after.dtypes.astype(str),
+        'bytes before': before.memory_usage(deep=True, index=False),
+        'bytes after': after.memory_usage(deep=True, index=False),
+    })
+    report.loc['TOTAL'] = ['', '', report['bytes before'].sum(), report['bytes after'].sum()]
+    report['ratio'] = report['bytes before'] / report['bytes after']
+    return report
+
+
+def test_asteroid_io():
+    """
+    Test the schema helpers on a small file with NASA columns.
+    """
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        file_path = os.path.join(temp_dir, "nasa_sample.csv")
+        with open(file_path, 'w') as f:
+            f.write("Name,Absolute Magnitude,Close Approach Date,Orbiting Body,Hazardous,Extra\n"
+                    "1001,21.6,1995-01-01,Earth,True,x\n"
+                    "1002,19.3,2005-07-04,Earth,False,y\n")
+
+        # Test case 1: schema dtypes are applied, unknown columns keep defaults
+        print("Testing schema dtypes...")
+        df = pd.read_csv(file_path, **read_csv_kwargs(read_header(file_path)))
+        print(df.dtypes)
+        assert df['Name'].dtype == np.int32
+        assert df['Absolute Magnitude'].dtype == np.float64
+        assert pd.api.types.is_datetime64_any_dtype(df['Close Approach Date'])
+        assert isinstance(df['Orbiting Body'].dtype, pd.CategoricalDtype)
+        assert df['Hazardous'].dtype == bool
+        assert df['Hazardous'].tolist() == [True, False]
+        print("✓ Success!")
+
+        # Test case 2: column pruning keeps file order
+        print("\nTesting column pruning...")
+        kwargs = read_csv_kwargs(read_header(file_path), columns=['Hazardous', 'Name'])
+        df = pd.read_csv(file_path, **kwargs)
+        assert list(df.columns) == ['Name', 'Hazardous'], list(df.columns)
+        print("✓ Success! Columns:", list(df.columns))
+
+        # Test case 3: unknown column
+        print("\nTesting unknown column...")
+        try:
+            read_csv_kwargs(read_header(file_path), columns=['Name', 'Not A Column'])
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+        # Test case 4: the typed frame is smaller
+        print("\nTesting memory report...")
+        report = memory_report(file_path)
+        print(report)
+        assert report.loc['TOTAL', 'bytes after'] < report.loc['TOTAL', 'bytes before']
+        print("✓ Success!")
+
+        # Test case 5: the cache returns the same DataFrame as the parser
+        print("\nTesting cache round trip...")
+        parsed = pd.read_csv(file_path, **read_csv_kwargs(read_header(file_path)))
+        assert read_cache(file_path) is None
+        assert write_cache(file_path, parsed)
+        cached = read_cache(file_path)
+        pd.testing.assert_frame_equal(cached, parsed)
+        pruned = read_cache(file_path, columns=['Hazardous', 'Name'])
+        assert list(pruned.columns) == ['Name', 'Hazardous'], list(pruned.columns)
+        print("✓ Success! Cached dtypes:", dict(cached.dtypes.astype(str)))
+
+        # Test case 6: touching the file without changing it keeps the cache
+        print("\nTesting cache after touch...")
+        stat = os.stat(file_path)
+        os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert read_cache(file_path) is not None
+        print("✓ Success!")
+
+        # Test case 7: changing the content invalidates the cache
+        print("\nTesting cache invalidation...")
+        with open(file_path, 'a') as f:
+            f.write("1003,18.1,2010-03-03,Earth,True,z\n")
+        assert read_cache(file_path) is None
+        with open(file_path, 'r+') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace('1003,18.1', '1004,18.1'))
+        parsed = pd.read_csv(file_path, **read_csv_kwargs(read_header(file_path)))
+        write_cache(file_path, parsed)
+        with open(file_path, 'r+') as f:
+            f.write(content)
+        assert read_cache(file_path) is None, "same size, new content must invalidate"
+        print("✓ Success!")
+
+        # Test case 8: the column store maps the same DataFrame
+        print("\nTesting column store...")
+        store_dir = os.path.join(temp_dir, "nasa_sample.store")
+        parsed = read_csv(file_path)
+        assert write_column_store(file_path, store_dir, chunksize=2) == len(parsed)
+        stored = read_column_store(store_dir)
+        pd.testing.assert_frame_equal(stored, parsed)
+        values = stored['Absolute Magnitude'].to_numpy()
+        while values is not None and not isinstance(values, (np.memmap, mmap.mmap)):
+            values = values.base
+        assert values is not None, "column should be backed by the mapped file"
+        pruned = read_column_store(store_dir, columns=['Orbiting Body'])
+        assert list(pruned.columns) == ['Orbiting Body']
+        assert not is_column_store(temp_dir)
+        print("✓ Success! Store files:", sorted(os.listdir(store_dir)))
+
+    finally:
+        # Clean up the temporary files
+        import shutil
+        shutil.rmtree(temp_dir)
+
+
+# Run the test, then print the report for the bundled data set
+if __name__ == "__main__":
+    test_asteroid_io()
+    if os.path.exists('nasa.csv'):
+        print("\nMemory report for nasa.csv")
+        print("-" * 50)
+        print(memory_report('nasa.csv').to_string())
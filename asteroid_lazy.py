@@ -0,0 +1,502 @@
+"""
+NASA Asteroid Data Analysis - lazy queries
+
+A Query describes what to compute without computing it:
+
+    Asteroids.scan('nasa.csv').where(year >= 2000).agg(max_abs_mag, closest, orbit_counts).collect()
+
+collect() plans the query first. Filters on the approach year or date are
+fused into one [start, end) window and pushed into the scan, so rows outside
+it are dropped while the file is read (load_data(date_window=...)). Other
+filters are combined into a single mask. Only the columns the aggregates,
+filters and selected columns touch are read, and every aggregate is
+computed in one pass by asteroid_summary.summarize. explain() shows the plan.
+
+The eager section functions of nasa_asteroid_ds.py run the same summarize
+pass on a DataFrame they are given.
+
+Usage: python asteroid_lazy.py
+"""
+
+import operator
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from asteroid_io import DATE_COLUMN, read_chunks
+from asteroid_summary import SECTION_COLUMNS, SectionState, summarize
+from asteroid_topk import YEAR
+
+
+#########################
+## EXPRESSIONS
+#########################
+# Comparison operators of predicates
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+
+class Column:
+    """
+    Column referenced in a predicate; comparing it with a value gives a Predicate.
+
+    'year' is the close approach year, which is not a column of the file.
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __lt__(self, value):
+        return Predicate(self.name, '<', value)
+
+    def __le__(self, value):
+        return Predicate(self.name, '<=', value)
+
+    def __eq__(self, value):
+        return Predicate(self.name, '==', value)
+
+    def __ne__(self, value):
+        return Predicate(self.name, '!=', value)
+
+    def __ge__(self, value):
+        return Predicate(self.name, '>=', value)
+
+    def __gt__(self, value):
+        return Predicate(self.name, '>', value)
+
+    __hash__ = None
+
+
+def col(name):
+    """
+    Column of the data, to compare in a predicate, e.g. col('Hazardous') == True.
+
+    Parameters:
+    name (str): Column title
+
+    Returns:
+    Column: The column
+    """
+    return Column(name)
+
+
+# Close approach year
+year = Column(YEAR)
+
+
+class Predicate:
+    """
+    Comparison of a column with a value.
+
+    Predicates on 'year' and 'Close Approach Date' become a date window of
+    the scan; others are applied as masks to the rows that were read.
+    """
+
+    def __init__(self, column, op, value):
+        if op not in OPERATORS:
+            raise ValueError(f"Operator must be one of {list(OPERATORS)}, got: {op}")
+        self.column = column
+        self.op = op
+        self.value = value
+
+    def __repr__(self):
+        return f"{self.column} {self.op} {self.value!r}"
+
+    @property
+    def is_window(self):
+        return self.column in (YEAR, DATE_COLUMN)
+
+    def window(self):
+        """
+        [start, end) close approach window of a year or date predicate.
+
+        Returns:
+        tuple: (start, end) Timestamps, either may be None
+        """
+        if self.op == '!=':
+            raise ValueError(f"Cannot filter {self.column} with '!='")
+        if self.column == YEAR:
+            first, step = pd.Timestamp(year=int(self.value), month=1, day=1), pd.DateOffset(years=1)
+        else:
+            # Close approach dates are whole days
+            first, step = pd.Timestamp(self.value).normalize(), pd.Timedelta(days=1)
+        after = first + step
+        return {
+            '<': (None, first),
+            '<=': (None, after),
+            '==': (first, after),
+            '>=': (first, None),
+            '>': (after, None),
+        }[self.op]
+
+    def mask(self, df):
+        """
+        Rows of df that satisfy the predicate.
+
+        Parameters:
+        df (pandas.DataFrame): Rows with the predicate's column
+
+        Returns:
+        numpy.ndarray: Boolean mask
+        """
+        return np.asarray(OPERATORS[self.op](df[self.column].to_numpy(), self.value))
+
+
+#########################
+## AGGREGATES
+#########################
+Aggregate = namedtuple('Aggregate', ['name', 'section', 'field'])
+
+# Number of rows that pass the filters
+count = Aggregate('count', None, 'rows')
+# Section D: (name, value) of the largest absolute magnitude
+max_abs_mag = Aggregate('max_abs_mag', 'D', 'max_absolute_magnitude')
+# Section E: name of the asteroid closest to Earth
+closest = Aggregate('closest', 'E', 'closest_to_earth')
+# Section F: OrbitCounts of the rows
+orbit_counts = Aggregate('orbit_counts', 'F', 'common_orbit')
+# Section G: average 'Est Dia in KM(max)' and the number of rows above it
+mean_diameter = Aggregate('mean_diameter', 'G', 'mean_max_diameter')
+above_mean_diameter = Aggregate('above_mean_diameter', 'G', 'min_max_diameter')
+
+
+#########################
+## PLAN
+#########################
+# What a query reads and computes
+Plan = namedtuple('Plan', [
+    'source',       # path, or the DataFrame of Asteroids.from_frame
+    'columns',      # columns read, in a stable order, or None for every column
+    'window',       # (start, end) pushed into the scan, or None
+    'filters',      # Predicates applied as one mask after the scan
+    'sections',     # letters passed to summarize
+    'aggregates',   # Aggregates computed
+    'select',       # columns returned by to_frame, or None
+])
+
+
+class Query:
+    """
+    Immutable description of a scan, its filters and its outputs.
+
+    Every method returns a new Query; nothing is read until collect() or
+    to_frame().
+    """
+
+    def __init__(self, source, chunksize=None, cache=True, predicates=(), aggregates=(), select=None):
+        self.source = source
+        self.chunksize = chunksize
+        self.cache = cache
+        self.predicates = tuple(predicates)
+        self.aggregates = tuple(aggregates)
+        self.select_columns = select
+
+    def _with(self, **changes):
+        fields = dict(source=self.source, chunksize=self.chunksize, cache=self.cache, predicates=self.predicates,
+                      aggregates=self.aggregates, select=self.select_columns)
+        fields.update(changes)
+        return Query(**fields)
+
+    def where(self, *predicates):
+        """
+        Keep only the rows that satisfy every predicate.
+
+        Parameters:
+        *predicates (Predicate): e.g. year >= 2000, col('Hazardous') == True
+
+        Returns:
+        Query: The filtered query
+        """
+        for predicate in predicates:
+            if not isinstance(predicate, Predicate):
+                raise ValueError(f"where() takes predicates such as year >= 2000, got: {predicate!r}")
+        return self._with(predicates=self.predicates + predicates)
+
+    def agg(self, *aggregates):
+        """
+        Compute aggregates of the filtered rows.
+
+        Parameters:
+        *aggregates (Aggregate): e.g. max_abs_mag, closest, orbit_counts
+
+        Returns:
+        Query: The query; collect() returns {aggregate name: value}
+        """
+        for aggregate in aggregates:
+            if not isinstance(aggregate, Aggregate):
+                raise ValueError(f"agg() takes aggregates such as max_abs_mag, got: {aggregate!r}")
+        return self._with(aggregates=self.aggregates + aggregates)
+
+    def select(self, *columns):
+        """
+        Columns of the filtered rows to_frame() returns.
+
+        Parameters:
+        *columns (str): Column titles
+
+        Returns:
+        Query: The query
+        """
+        return self._with(select=list(columns))
+
+    def plan(self):
+        """
+        Work out the columns, the pushed-down window, the remaining filters and the sections.
+
+        Returns:
+        Plan: The plan of the query
+        """
+        start = end = None
+        filters = []
+        for predicate in self.predicates:
+            if not predicate.is_window:
+                filters.append(predicate)
+                continue
+            low, high = predicate.window()
+            if low is not None and (start is None or low > start):
+                start = low
+            if high is not None and (end is None or high < end):
+                end = high
+        # Disjoint predicates leave an empty window, which selects no rows
+        if start is not None and end is not None and end < start:
+            end = start
+        window = None if start is None and end is None else (start, end)
+
+        sections = ''.join(sorted({aggregate.section for aggregate in self.aggregates} - {None}))
+        needed = set(self.select_columns or [])
+        needed.update(predicate.column for predicate in filters)
+        for section in sections:
+            needed.update(SECTION_COLUMNS[section])
+        if self.select_columns is None and not self.aggregates:
+            # A bare scan returns whole rows
+            columns = None
+        else:
+            # Read at least one column, so the rows survive a count alone
+            columns = sorted(needed or {'Name'})
+        return Plan(self.source, columns, window, filters, sections, self.aggregates, self.select_columns)
+
+    def explain(self):
+        """
+        Text form of the plan.
+
+        Returns:
+        str: One line per step, scan first
+        """
+        plan = self.plan()
+        source = plan.source if isinstance(plan.source, str) else f"DataFrame{plan.source.shape}"
+        window = 'none' if plan.window is None else '[{}, {})'.format(*(
+            'None' if bound is None else bound.date() for bound in plan.window))
+        columns = 'all' if plan.columns is None else plan.columns
+        lines = [f"Scan {source} columns={columns} window={window}"
+                 + (f" chunksize={self.chunksize}" if self.chunksize else "")]
+        if plan.filters:
+            lines.append(f"Filter {' and '.join(map(repr, plan.filters))}")
+        if plan.aggregates:
+            names = ', '.join(aggregate.name for aggregate in plan.aggregates)
+            lines.append(f"Aggregate {names} in one pass (sections {plan.sections or '-'})")
+        if plan.select is not None:
+            lines.append(f"Select {plan.select}")
+        return "\n".join(lines)
+
+    def _scan(self, plan):
+        """DataFrames of the rows in the window, one per chunk, with the planned columns."""
+        if not isinstance(plan.source, str):
+            df = plan.source
+            if plan.window is not None:
+                from nasa_asteroid_ds import mask_data
+                df = mask_data(df, *plan.window)
+            if plan.columns is None:
+                yield df
+                return
+            missing = [c for c in plan.columns if c not in df.columns]
+            if missing:
+                raise ValueError(f"DataFrame must contain '{missing[0]}' column")
+            yield df[plan.columns]
+        elif self.chunksize:
+            yield from read_chunks(plan.source, self.chunksize, plan.columns, plan.window)
+        else:
+            from nasa_asteroid_ds import load_data
+            yield load_data(plan.source, columns=plan.columns, cache=self.cache, date_window=plan.window)
+
+    @staticmethod
+    def _filter(df, filters):
+        """Rows of df that pass every filter, selected once."""
+        if not filters:
+            return df
+        mask = filters[0].mask(df)
+        for predicate in filters[1:]:
+            mask &= predicate.mask(df)
+        return df[mask]
+
+    def to_frame(self):
+        """
+        Read the filtered rows with the selected columns, or the planned ones.
+
+        Returns:
+        pandas.DataFrame: The rows
+        """
+        plan = self.plan()
+        chunks = [self._filter(chunk, plan.filters) for chunk in self._scan(plan)]
+        df = chunks[0] if len(chunks) == 1 else pd.concat(chunks)
+        return df[plan.select] if plan.select is not None else df
+
+    def collect(self):
+        """
+        Run the query.
+
+        In memory, one summarize pass computes every aggregate. With a
+        chunksize the chunks fold into a SectionState, and the count above
+        the mean diameter reads its column a second time.
+
+        Returns:
+        dict: Aggregate name -> value, in the order the aggregates were given
+        """
+        plan = self.plan()
+        if not plan.aggregates:
+            raise ValueError("Nothing to collect: add aggregates with agg(), or use to_frame()")
+
+        if not self.chunksize or not isinstance(plan.source, str):
+            summary = summarize(self.to_frame() if plan.select is None else self._with(select=None).to_frame(),
+                                plan.sections)
+            return {aggregate.name: getattr(summary, aggregate.field) for aggregate in plan.aggregates}
+
+        state = SectionState(plan.sections)
+        for chunk in self._scan(plan):
+            state.update(self._filter(chunk, plan.filters))
+        values = {
+            'rows': state.rows,
+            'max_absolute_magnitude': state.max_absolute_magnitude() if state.max_magnitude else None,
+            'closest_to_earth': state.closest_to_earth() if state.min_miss_distance else None,
+            'common_orbit': state.common_orbit(),
+            'mean_max_diameter': state.mean_max_diameter(),
+        }
+        if above_mean_diameter in plan.aggregates:
+            mean = state.mean_max_diameter()
+            values['min_max_diameter'] = sum(
+                int(np.count_nonzero(self._filter(chunk, plan.filters)['Est Dia in KM(max)'].to_numpy() > mean))
+                for chunk in self._scan(plan))
+        return {aggregate.name: values[aggregate.field] for aggregate in plan.aggregates}
+
+
+class Asteroids:
+    """Entry points of lazy queries."""
+
+    @staticmethod
+    def scan(path, chunksize=None, cache=True):
+        """
+        Query over a CSV file, archive or column store.
+
+        Parameters:
+        path (str): Path of the data
+        chunksize (int): Stream the file in chunks of this many rows, or None to load it
+        cache (bool): Read and write the columnar cache of a CSV file
+
+        Returns:
+        Query: Query of every row
+        """
+        return Query(path, chunksize=chunksize, cache=cache)
+
+    @staticmethod
+    def from_frame(df):
+        """
+        Query over a DataFrame already in memory.
+
+        Parameters:
+        df (pandas.DataFrame): DataFrame containing asteroid data
+
+        Returns:
+        Query: Query of every row
+        """
+        return Query(df)
+
+
+def test_lazy():
+    """
+    Compare lazy queries with the eager section functions and check their plans.
+    """
+    import os
+    import time
+
+    # Test case 1: plans read only the needed columns and fuse the date filters
+    query = (Asteroids.scan('nasa.csv').where(year >= 2000, year < 2010, col('Hazardous') == True)
+             .agg(max_abs_mag, closest, orbit_counts))
+    print(query.explain())
+    plan = query.plan()
+    assert plan.columns == ['Absolute Magnitude', 'Hazardous', 'Miss Dist.(kilometers)', 'Name', 'Orbit ID']
+    assert plan.window == (pd.Timestamp('2000-01-01'), pd.Timestamp('2010-01-01'))
+    assert [repr(p) for p in plan.filters] == ["Hazardous == True"]
+    assert plan.sections == 'DEF'
+    assert (year > 2004).window() == (pd.Timestamp('2005-01-01'), None)
+    assert (col('Close Approach Date') <= '2003-05-17').window() == (None, pd.Timestamp('2003-05-18'))
+    assert Asteroids.scan('nasa.csv').plan().columns is None
+    assert Asteroids.scan('nasa.csv').agg(count).plan().columns == ['Name']
+    print("✓ Success!")
+
+    # Test case 2: errors
+    print("\nTesting errors...")
+    for bad in [lambda: (year != 2000).window(), lambda: query.where('year >= 2000'),
+                lambda: Asteroids.scan('nasa.csv').collect(),
+                lambda: Asteroids.from_frame(pd.DataFrame({'Name': [1]})).agg(closest).collect()]:
+        try:
+            bad()
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 3: the bundled data set, in memory, streamed and from a frame
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import (load_data, mask_data, max_absolute_magnitude, closest_to_earth,
+                                      common_orbit, min_max_diameter)
+        begin = time.perf_counter()
+        df = mask_data(load_data('nasa.csv', cache=False))
+        expected = {
+            'count': len(df),
+            'max_abs_mag': max_absolute_magnitude(df),
+            'closest': closest_to_earth(df),
+            'orbit_counts': common_orbit(df),
+            'above_mean_diameter': min_max_diameter(df),
+        }
+        eager_seconds = time.perf_counter() - begin
+        aggregates = (count, max_abs_mag, closest, orbit_counts, above_mean_diameter)
+        begin = time.perf_counter()
+        lazy = Asteroids.scan('nasa.csv', cache=False).where(year >= 2000).agg(*aggregates).collect()
+        lazy_seconds = time.perf_counter() - begin
+        streamed = Asteroids.scan('nasa.csv', chunksize=700).where(year >= 2000).agg(*aggregates).collect()
+        framed = Asteroids.from_frame(load_data('nasa.csv', cache=False)).where(year >= 2000).agg(*aggregates)
+        for result in (lazy, streamed, framed.collect()):
+            result['orbit_counts'] = result['orbit_counts'].to_dict()
+            assert result == expected, result
+        print(f"Eager {eager_seconds * 1000:.0f} ms, lazy {lazy_seconds * 1000:.0f} ms")
+
+        # Only the planned columns are read
+        rows = Asteroids.scan('nasa.csv', cache=False).where(year == 2005, col('Hazardous') == True)
+        hazardous = rows.select('Name', 'Orbit ID').to_frame()
+        assert list(hazardous.columns) == ['Name', 'Orbit ID']
+        assert len(hazardous) == len(mask_data(df, '2005-01-01', '2006-01-01').query('Hazardous'))
+
+        # A count alone and a bare scan still read the rows
+        everything = load_data('nasa.csv', cache=False)
+        for chunksize in (None, 700):
+            scan = Asteroids.scan('nasa.csv', chunksize=chunksize, cache=False)
+            assert scan.agg(count).collect() == {'count': len(everything)}
+            assert scan.where(year >= 2000).agg(count).collect() == {'count': len(df)}
+            assert scan.to_frame().shape == everything.shape
+            # Disjoint years select no rows
+            empty = scan.where(year >= 2010, year < 2005)
+            assert empty.agg(count, closest).collect() == {'count': 0, 'closest': None}
+            assert len(empty.to_frame()) == 0
+        assert Asteroids.from_frame(everything).to_frame().shape == everything.shape
+        print("✓ Success!")
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_lazy()
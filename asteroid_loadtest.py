@@ -0,0 +1,240 @@
+"""
+NASA Asteroid Data Analysis - query service load test
+
+Runs concurrent clients against asteroid_service.py and reports the latency
+of their requests. Each client keeps one connection alive and sends a mix of
+section queries (QUERIES) in turn; the mix is sent once first so the
+measured requests are repeated queries, as a resident service sees them.
+
+Without --port the service is started on the file in a separate process, on
+a free port, and stopped at the end; with --port the running service at
+--host:--port is measured. The report gives requests per second and the
+p50, p90, p99 and maximum latency in milliseconds, and the number of queries
+the service computed during the measured requests (0 when every one was
+answered from its memo). The exit code is 1 if the p99 is above --budget-ms
+or any request failed; the latency budget is checked only here, not in the
+test, as it depends on the machine.
+
+Usage: python asteroid_loadtest.py [file] [--clients 32] [--requests 200] [--port 8016] [--budget-ms 10]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from asteroid_service import DEFAULT_HOST, fetch
+
+
+# Queries of every client, in turn
+QUERIES = [
+    '/closest_to_earth?year=2015',
+    '/common_orbit?hazardous=true',
+    '/max_absolute_magnitude?start=2000-01-01',
+    '/min_max_diameter?start=2000-01-01',
+    '/details?start=2000-01-01',
+    '/common_orbit?start=2000-01-01&top_k=10',
+    '/closest_to_earth?start=2000-01-01&k=5&by=year',
+    '/max_absolute_magnitude?hazardous=false&year=2010',
+    '/count?hazardous=true&start=2010-01-01&end=2015-01-01',
+]
+
+# p99 latency of repeated queries allowed, in milliseconds
+P99_BUDGET_MS = 10.0
+
+SERVICE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'asteroid_service.py')
+
+
+async def _client(host, port, queries, requests, offset, latencies, failures):
+    """One client: a kept-alive connection sending requests queries in turn."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for i in range(requests):
+            target = queries[(offset + i) % len(queries)]
+            begin = time.perf_counter()
+            status, _ = await fetch(reader, writer, target, host)
+            latencies.append(time.perf_counter() - begin)
+            if status != 200:
+                failures.append((target, status))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def _computed(host, port):
+    """Number of queries the service has computed, from /health."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, body = await fetch(reader, writer, '/health', host)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    if status != 200:
+        raise RuntimeError(f"/health answered {status}")
+    return json.loads(body)['computed']
+
+
+async def run_load(host, port, clients=32, requests=200, queries=QUERIES):
+    """
+    Run concurrent clients against a service and measure their requests.
+
+    Parameters:
+    host (str): Address of the service
+    port (int): Port of the service
+    clients (int): Concurrent clients, each on its own connection
+    requests (int): Requests of each client
+    queries (list): Paths and query strings the clients send in turn
+
+    Returns:
+    dict: Requests, failures, queries computed, seconds, requests per second and latency
+          percentiles in milliseconds
+    """
+    # Send the mix once so the measured requests are repeated queries
+    await _client(host, port, queries, len(queries), 0, [], [])
+    computed = await _computed(host, port)
+
+    latencies, failures = [], []
+    begin = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, queries, requests, n, latencies, failures) for n in range(clients)))
+    seconds = time.perf_counter() - begin
+    computed = await _computed(host, port) - computed
+
+    milliseconds = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(milliseconds, [50, 90, 99])
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'failures': len(failures),
+        'computed': computed,
+        'seconds': round(seconds, 3),
+        'requests_per_second': round(len(latencies) / seconds, 1),
+        'p50_ms': round(float(p50), 3),
+        'p90_ms': round(float(p90), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(milliseconds.max()), 3),
+    }
+
+
+class ServiceProcess:
+    """
+    asteroid_service.py serving a file in a child process, on a free port.
+
+    Parameters:
+    file (str): CSV file, archive or column store
+    host (str): Address to listen on
+    workers (int): Threads computing the results
+    """
+
+    def __init__(self, file, host=DEFAULT_HOST, workers=4):
+        self.file = file
+        self.host = host
+        self.workers = workers
+        self.process = None
+        self.port = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [sys.executable, SERVICE, self.file, '--host', self.host, '--port', '0', '--workers', str(self.workers)],
+            stdout=subprocess.PIPE, text=True)
+        # The service prints its address once the data set is loaded and it listens
+        line = self.process.stdout.readline()
+        match = re.search(r':(\d+)$', line.strip())
+        if match is None:
+            self.process.kill()
+            self.process.wait()
+            raise RuntimeError(f"Service did not start on {self.file}: {line!r}")
+        self.port = int(match.group(1))
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+
+def format_report(report):
+    """
+    Text of a load test report.
+
+    Parameters:
+    report (dict): Result of run_load
+
+    Returns:
+    str: One line of throughput and one of latency percentiles
+    """
+    return (f"{report['requests']} requests from {report['clients']} clients in {report['seconds']}s "
+            f"({report['requests_per_second']} req/s, {report['failures']} failed, "
+            f"{report['computed']} computed)\n"
+            f"latency ms: p50 {report['p50_ms']}  p90 {report['p90_ms']}  p99 {report['p99_ms']}  "
+            f"max {report['max_ms']}")
+
+
+def test_load_test():
+    """
+    Run a short load test against a service on nasa.csv, or on a synthetic
+    data set, and check every request succeeds and is answered from the memo.
+    The latencies are reported only: the p99 budget is checked by main.
+    """
+    import shutil
+    import tempfile
+
+    temp_dir = None
+    file_path = 'nasa.csv'
+    if not os.path.exists(file_path):
+        from asteroid_synth import generate
+        temp_dir = tempfile.mkdtemp()
+        file_path = generate(os.path.join(temp_dir, 'nasa.csv'), 5000, seed=0)
+
+    try:
+        print("Testing repeated queries under concurrent clients...")
+        with ServiceProcess(file_path, workers=2) as service:
+            report = asyncio.run(run_load(service.host, service.port, clients=16, requests=100))
+        print(format_report(report))
+        assert report['requests'] == 1600 and report['failures'] == 0, report
+        assert report['computed'] == 0, report
+        print("✓ Success!")
+
+    finally:
+        # Clean up the temporary files
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the NASA asteroid query service.")
+    parser.add_argument('file', nargs='?', default='nasa.csv', help="file to serve when --port is not given")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address of the service")
+    parser.add_argument('--port', type=int, default=None, help="port of a running service")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent clients")
+    parser.add_argument('--requests', type=int, default=200, help="requests of each client")
+    parser.add_argument('--workers', type=int, default=4, help="threads of a started service")
+    parser.add_argument('--budget-ms', type=float, default=P99_BUDGET_MS, help="p99 latency allowed")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.port is None:
+        with ServiceProcess(args.file, args.host, args.workers) as service:
+            report = asyncio.run(run_load(service.host, service.port, args.clients, args.requests))
+    else:
+        report = asyncio.run(run_load(args.host, args.port, args.clients, args.requests))
+
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0 if report['failures'] == 0 and report['p99_ms'] <= args.budget_ms else 1
+
+
+# Run a load test, or the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    else:
+        test_load_test()
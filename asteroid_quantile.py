@@ -0,0 +1,389 @@
+"""
+NASA Asteroid Data Analysis - mergeable quantile sketches
+
+TDigest summarizes the distribution of a column in a few hundred weighted
+centroids, small clusters at the tails and larger ones near the median. A
+digest is built chunk by chunk, merged with the digests of other chunks or
+shards, written to a JSON-compatible dictionary and read back, and answers
+any quantile without sorting the data. The rank of an estimate is off by at
+most rank_error_bound(q): about 2 pi sqrt(q (1 - q)) / compression, so the
+error shrinks towards the tails where p99 and p999 live.
+
+stream_quantiles() gives the medians, p90 and p99 of diameter, velocity and
+miss distance of a file of any size in one pass over its chunks, with the
+close approach window of section B as the other streaming sections.
+
+Usage: python asteroid_quantile.py [file]
+"""
+
+import sys
+
+import numpy as np
+
+from asteroid_io import DEFAULT_CHUNKSIZE, read_chunks
+
+
+# Columns whose distributions are sketched by default
+QUANTILE_COLUMNS = [
+    'Est Dia in KM(max)',
+    'Relative Velocity km per sec',
+    'Miss Dist.(kilometers)',
+]
+
+# Quantiles reported by default: median, p90 and p99
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99)
+
+# Centroids kept are at most compression / 2 + 1
+DEFAULT_COMPRESSION = 200
+
+# Values buffered before they are merged into the centroids, per unit of compression
+BUFFER_FACTOR = 50
+
+
+def _scale(q, compression):
+    """The k1 scale function of t-digest, shifted to start at 0: clusters span one unit of k."""
+    return compression / (2 * np.pi) * (np.arcsin(2 * q - 1) + np.pi / 2)
+
+
+def rank_error_bound(q, compression=DEFAULT_COMPRESSION, count=None):
+    """
+    Largest rank error of TDigest.quantile(q), as a fraction of the values.
+
+    A centroid spans one unit of the scale function, 2 pi sqrt(q (1 - q)) /
+    compression of the values around q, and the estimate stays inside the
+    centroid, or between the two next to it; one more value covers the edges.
+
+    Parameters:
+    q (float or numpy.ndarray): Quantile(s) in [0, 1]
+    compression (int): Compression of the digest
+    count (int): Number of values in the digest, or None to leave out the edge term
+
+    Returns:
+    float or numpy.ndarray: Bound on |rank of the estimate / count - q|
+    """
+    bound = 2 * np.pi * np.sqrt(np.asarray(q, dtype=np.float64) * (1 - np.asarray(q, dtype=np.float64))) / compression
+    if count:
+        bound = bound + 1 / count
+    return bound
+
+
+#########################
+## DIGEST
+#########################
+class TDigest:
+    """
+    Merging t-digest of a stream of values.
+
+    means and weights are the centroids in increasing order of mean; values
+    added since the last compression wait in a buffer. minimum and maximum are
+    exact, so the 0 and 1 quantiles are too. NaN values are not counted.
+
+    Parameters:
+    compression (int): Accuracy against size; the digest keeps at most
+        compression / 2 + 1 centroids
+    """
+
+    def __init__(self, compression=DEFAULT_COMPRESSION):
+        if compression < 10:
+            raise ValueError(f"compression must be at least 10, got: {compression}")
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.minimum = np.inf
+        self.maximum = -np.inf
+        self._buffer = []
+        self._buffered = 0
+
+    @property
+    def count(self):
+        """Number of values in the digest."""
+        return int(round(self.weights.sum())) + self._buffered
+
+    def add(self, values):
+        """
+        Add values to the digest.
+
+        Parameters:
+        values (numpy.ndarray): Values of any float or integer dtype
+
+        Returns:
+        TDigest: self
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._buffer.append(values)
+        self._buffered += len(values)
+        if self._buffered >= BUFFER_FACTOR * self.compression:
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """
+        Add the values of another digest, e.g. of another chunk or shard.
+
+        The result keeps the compression of self.
+
+        Parameters:
+        other (TDigest): Digest to merge
+
+        Returns:
+        TDigest: self
+        """
+        other._compress()
+        if len(other.weights) == 0:
+            return self
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress(other.means, other.weights)
+        return self
+
+    def _compress(self, means=None, weights=None):
+        """
+        Merge the buffer, and the given centroids, into the centroids.
+
+        Points are sorted by mean and grouped by the unit of the scale
+        function their middle falls in, in one vectorized pass.
+        """
+        parts_means = [self.means] + self._buffer
+        parts_weights = [self.weights] + [np.ones(len(values)) for values in self._buffer]
+        if means is not None:
+            parts_means.append(means)
+            parts_weights.append(weights)
+        self._buffer = []
+        self._buffered = 0
+        if sum(len(part) for part in parts_means[1:]) == 0:
+            return
+
+        means = np.concatenate(parts_means)
+        weights = np.concatenate(parts_weights)
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+
+        cumulative = np.cumsum(weights)
+        middle = (cumulative - weights / 2) / cumulative[-1]
+        groups = np.floor(_scale(middle, self.compression)).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+        # Rounding can move a mean just outside the values it summarizes
+        np.clip(self.means, self.minimum, self.maximum, out=self.means)
+
+    def quantile(self, q):
+        """
+        Estimated q-quantile(s) of the values.
+
+        Each centroid stands at the rank of its middle value; ranks in
+        between are interpolated linearly, and the ends are the exact
+        minimum and maximum.
+
+        Parameters:
+        q (float or sequence): Quantile(s) in [0, 1]
+
+        Returns:
+        float or numpy.ndarray: Estimate(s), NaN for an empty digest
+        """
+        q_array = np.asarray(q, dtype=np.float64)
+        if ((q_array < 0) | (q_array > 1)).any():
+            raise ValueError(f"Quantiles must be in [0, 1], got: {q}")
+        self._compress()
+        if len(self.weights) == 0:
+            result = np.full(q_array.shape, np.nan)
+        else:
+            cumulative = np.cumsum(self.weights)
+            total = cumulative[-1]
+            ranks = np.concatenate(([0.0], cumulative - self.weights / 2, [total]))
+            values = np.concatenate(([self.minimum], self.means, [self.maximum]))
+            result = np.interp(q_array * total, ranks, values)
+        return float(result) if result.ndim == 0 else result
+
+    def to_dict(self):
+        """
+        The digest as a JSON-compatible dictionary.
+
+        Returns:
+        dict: compression, minimum, maximum, means and weights
+        """
+        self._compress()
+        return {
+            'compression': self.compression,
+            'minimum': self.minimum if self.count else None,
+            'maximum': self.maximum if self.count else None,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Read a digest written by to_dict.
+
+        Parameters:
+        data (dict): Dictionary from to_dict
+
+        Returns:
+        TDigest: The digest
+        """
+        digest = cls(data['compression'])
+        digest.means = np.asarray(data['means'], dtype=np.float64)
+        digest.weights = np.asarray(data['weights'], dtype=np.float64)
+        if len(digest.means) != len(digest.weights):
+            raise ValueError("Digest must have as many weights as means")
+        if len(digest.weights):
+            digest.minimum, digest.maximum = float(data['minimum']), float(data['maximum'])
+        return digest
+
+    def __len__(self):
+        self._compress()
+        return len(self.means)
+
+
+#########################
+## COLUMNS
+#########################
+def sketch_columns(df, columns=QUANTILE_COLUMNS, compression=DEFAULT_COMPRESSION):
+    """
+    Digest of each column of a DataFrame.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    columns (list): Columns to sketch
+    compression (int): Compression of the digests
+
+    Returns:
+    dict: Column -> TDigest
+    """
+    for col in columns:
+        if col not in df.columns:
+            raise ValueError(f"DataFrame must contain '{col}' column")
+    return {col: TDigest(compression).add(df[col].to_numpy()) for col in columns}
+
+
+def merge_sketches(sketches):
+    """
+    Merge per-chunk or per-shard digests column by column.
+
+    Parameters:
+    sketches (iterable): Dictionaries of column -> TDigest, e.g. from sketch_columns
+
+    Returns:
+    dict: Column -> merged TDigest
+    """
+    merged = {}
+    for sketch in sketches:
+        for col, digest in sketch.items():
+            if col in merged:
+                merged[col].merge(digest)
+            else:
+                merged[col] = TDigest(digest.compression).merge(digest)
+    return merged
+
+
+def stream_quantiles(file, columns=QUANTILE_COLUMNS, quantiles=DEFAULT_QUANTILES, chunksize=DEFAULT_CHUNKSIZE,
+                     start='2000-01-01', end=None, compression=DEFAULT_COMPRESSION):
+    """
+    Quantiles of columns of a file of any size, from one pass over its chunks.
+
+    Memory is bounded by the chunk size and the digests.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    columns (list): Columns to sketch
+    quantiles (sequence): Quantiles to report
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+    compression (int): Compression of the digests
+
+    Returns:
+    dict: Column -> {quantile: estimate}
+    """
+    sketch = {col: TDigest(compression) for col in columns}
+    for chunk in read_chunks(file, chunksize, columns=list(columns), date_window=(start, end)):
+        for col, digest in sketch.items():
+            digest.add(chunk[col].to_numpy())
+    return {col: dict(zip(quantiles, digest.quantile(quantiles).tolist())) for col, digest in sketch.items()}
+
+
+def test_quantile():
+    """
+    Check the estimates against np.quantile, merging and serialization.
+    """
+    import json
+    import os
+
+    def rank_error(values, estimate, q):
+        # Distance from q to the ranks the estimate takes, ties included
+        low = np.count_nonzero(values < estimate) / len(values)
+        high = np.count_nonzero(values <= estimate) / len(values)
+        return max(0.0, low - q, q - high)
+
+    qs = np.array([0.001, 0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99, 0.999])
+    rng = np.random.default_rng(11)
+
+    # Test case 1: a skewed million values stay within the rank bound
+    values = rng.lognormal(0, 1.5, 1_000_000)
+    digest = TDigest().add(values)
+    estimates = digest.quantile(qs)
+    exact = np.quantile(values, qs)
+    errors = np.array([rank_error(values, e, q) for e, q in zip(estimates, qs)])
+    print(f"{len(digest)} centroids, rank errors: {np.round(errors, 5)}")
+    print(f"relative value errors: {np.round(np.abs(estimates - exact) / exact, 4)}")
+    assert (errors <= rank_error_bound(qs, count=len(values))).all()
+    assert len(digest) <= DEFAULT_COMPRESSION // 2 + 1
+    assert digest.quantile(0) == values.min() and digest.quantile(1) == values.max()
+    print("✓ Success!")
+
+    # Test case 2: digests of chunks merge to the same accuracy
+    print("\nTesting merge...")
+    parts = [TDigest().add(values[start:start + 70_000]) for start in range(0, len(values), 70_000)]
+    merged = TDigest()
+    for part in parts:
+        merged.merge(part)
+    assert merged.count == len(values)
+    for q in qs:
+        assert rank_error(values, merged.quantile(q), q) <= rank_error_bound(q, count=len(values)), q
+    print("✓ Success!")
+
+    # Test case 3: serialization round trip, NaN, empty digests and bad quantiles
+    print("\nTesting serialization...")
+    restored = TDigest.from_dict(json.loads(json.dumps(merged.to_dict())))
+    assert np.array_equal(restored.quantile(qs), merged.quantile(qs))
+    assert TDigest().add([1.0, np.nan, 3.0]).quantile(0.5) == 2.0
+    assert np.isnan(TDigest().quantile(0.5))
+    assert TDigest.from_dict(TDigest().to_dict()).count == 0
+    try:
+        digest.quantile(1.5)
+        print("✗ Failed: Should have raised ValueError")
+    except ValueError as e:
+        print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 4: the bundled data set, whole and streamed in chunks
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data, mask_data
+        nasa = mask_data(load_data('nasa.csv', cache=False))
+        sketches = merge_sketches(sketch_columns(nasa.iloc[start:start + 500])
+                                  for start in range(0, len(nasa), 500))
+        streamed = stream_quantiles('nasa.csv', quantiles=tuple(qs), chunksize=1000)
+        for col in QUANTILE_COLUMNS:
+            column = nasa[col].to_numpy().astype(np.float64)
+            exact = np.quantile(column, qs)
+            for q, estimate, exact_value in zip(qs, sketches[col].quantile(qs), exact):
+                assert rank_error(column, estimate, q) <= rank_error_bound(q, count=len(column)), (col, q)
+                assert rank_error(column, streamed[col][q], q) <= rank_error_bound(q, count=len(column)), (col, q)
+            print(f"{col}: p50/p90/p99 exact {np.round(np.quantile(column, DEFAULT_QUANTILES), 4)}, "
+                  f"sketch {np.round(sketches[col].quantile(DEFAULT_QUANTILES), 4)}")
+        print("✓ Success!")
+
+
+# Print the quantiles of a file, or run the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        for col, estimates in stream_quantiles(sys.argv[1]).items():
+            print(f"{col}: " + ", ".join(f"p{q * 100:g} {value:.6g}" for q, value in estimates.items()))
+    else:
+        test_quantile()
@@ -0,0 +1,361 @@
+"""
+NASA Asteroid Data Analysis - streaming linear regression (section K)
+
+LinearFit accumulates the means and centered sums of squares of two columns
+chunk by chunk, merging partial results with the pairwise update of Chan et
+al., and gives the slope, intercept, r, p-value and standard errors that
+scipy.stats.linregress gives on all the rows at once. Reservoir keeps a
+uniform sample of bounded size for the scatter plot, so drawing costs the same
+however many rows were fitted.
+
+Usage: python asteroid_regression.py
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from asteroid_io import DEFAULT_CHUNKSIZE, read_chunks, read_header
+
+
+# Columns of the section K regression
+REGRESSION_X = 'Absolute Magnitude'
+REGRESSION_Y = 'Miles per hour'
+
+# Rows drawn in the section K scatter plot
+SAMPLE_SIZE = 5000
+
+# Same fields as the result of scipy.stats.linregress
+Regression = namedtuple('Regression', ['slope', 'intercept', 'rvalue', 'pvalue', 'stderr', 'intercept_stderr'])
+
+
+#########################
+## LEAST SQUARES
+#########################
+class LinearFit:
+    """
+    Mergeable least-squares fit of y on x.
+
+    Holds the count, the means, the centered sums of squares and of products,
+    and the range of x. Rows where x or y is NaN are skipped.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self.sxx = 0.0
+        self.syy = 0.0
+        self.sxy = 0.0
+        self.min_x = np.inf
+        self.max_x = -np.inf
+
+    def update(self, x, y):
+        """
+        Add the rows of a chunk.
+
+        Parameters:
+        x (numpy.ndarray): Values of the explanatory column
+        y (numpy.ndarray): Values of the response column
+
+        Returns:
+        LinearFit: self
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        valid = ~(np.isnan(x) | np.isnan(y))
+        if not valid.all():
+            x, y = x[valid], y[valid]
+        if len(x) == 0:
+            return self
+
+        # Centered sums of the chunk, then the same merge as for two fits
+        chunk = LinearFit()
+        chunk.n = len(x)
+        chunk.mean_x = float(x.mean())
+        chunk.mean_y = float(y.mean())
+        dx = x - chunk.mean_x
+        dy = y - chunk.mean_y
+        chunk.sxx = float(dx @ dx)
+        chunk.syy = float(dy @ dy)
+        chunk.sxy = float(dx @ dy)
+        chunk.min_x = float(x.min())
+        chunk.max_x = float(x.max())
+        return self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Merge the fit of other rows.
+
+        Parameters:
+        other (LinearFit): Fit of other rows
+
+        Returns:
+        LinearFit: self
+        """
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+
+        n = self.n + other.n
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.sxx += other.sxx + delta_x * delta_x * weight
+        self.syy += other.syy + delta_y * delta_y * weight
+        self.sxy += other.sxy + delta_x * delta_y * weight
+        self.mean_x += delta_x * other.n / n
+        self.mean_y += delta_y * other.n / n
+        self.n = n
+        self.min_x = min(self.min_x, other.min_x)
+        self.max_x = max(self.max_x, other.max_x)
+        return self
+
+    def result(self):
+        """
+        Regression of the rows added so far, as scipy.stats.linregress computes it.
+
+        Returns:
+        Regression: slope, intercept, rvalue, pvalue, stderr, intercept_stderr
+        """
+        if self.n == 0:
+            raise ValueError("Inputs must not be empty.")
+        if self.n > 1 and self.min_x == self.max_x:
+            raise ValueError("Cannot calculate a linear regression if all x values are identical")
+
+        # Mean sums of squares, as np.cov(x, y, bias=1)
+        ssxm = self.sxx / self.n
+        ssym = self.syy / self.n
+        ssxym = self.sxy / self.n
+
+        if ssxm == 0.0 or ssym == 0.0:
+            r = np.nan if ssxym == 0 else 0.0
+        else:
+            r = min(1.0, max(-1.0, ssxym / np.sqrt(ssxm * ssym)))
+
+        slope = ssxym / ssxm
+        intercept = self.mean_y - slope * self.mean_x
+        if self.n == 2:
+            # Two points lie on their line; only a flat one has no evidence of a slope
+            pvalue = 1.0 if ssym == 0.0 else 0.0
+            slope_stderr = intercept_stderr = 0.0
+        else:
+            # scipy is imported here so the module loads without it
+            from scipy import stats
+            df = self.n - 2
+            tiny = 1.0e-20
+            t = r * np.sqrt(df / ((1.0 - r + tiny) * (1.0 + r + tiny)))
+            pvalue = float(2 * stats.t.sf(abs(t), df))
+            slope_stderr = float(np.sqrt((1 - r ** 2) * ssym / ssxm / df))
+            intercept_stderr = slope_stderr * float(np.sqrt(ssxm + self.mean_x ** 2))
+
+        return Regression(float(slope), float(intercept), float(r), pvalue, slope_stderr, intercept_stderr)
+
+
+#########################
+## RESERVOIR SAMPLE
+#########################
+class Reservoir:
+    """
+    Uniform sample of at most size rows of a stream (algorithm R).
+
+    Until size rows were seen the sample holds all of them in order.
+    """
+
+    def __init__(self, size=SAMPLE_SIZE, seed=0):
+        self.size = size
+        self.seen = 0
+        self.rng = np.random.default_rng(seed)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+
+    def update(self, x, y):
+        """
+        Offer the rows of a chunk to the sample.
+
+        Parameters:
+        x (numpy.ndarray): Values of the first column
+        y (numpy.ndarray): Values of the second column
+
+        Returns:
+        Reservoir: self
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+
+        # Fill the free slots first
+        free = min(self.size - len(self.x), len(x))
+        if free > 0:
+            self.x = np.concatenate([self.x, x[:free]])
+            self.y = np.concatenate([self.y, y[:free]])
+            self.seen += free
+            x, y = x[free:], y[free:]
+        if len(x) == 0:
+            return self
+
+        # Row i of the stream replaces a random slot with probability size / (i + 1)
+        slots = self.rng.integers(0, self.seen + np.arange(1, len(x) + 1))
+        keep = np.flatnonzero(slots < self.size)
+        self.x[slots[keep]] = x[keep]
+        self.y[slots[keep]] = y[keep]
+        self.seen += len(x)
+        return self
+
+    def merge(self, other):
+        """
+        Merge the sample of another stream into a uniform sample of both.
+
+        A reservoir that dropped rows can give at most the rows it holds, so
+        the merged sample is no larger than such a side: merging a full
+        reservoir of 10 rows keeps at most 10, whatever this one's size.
+
+        Parameters:
+        other (Reservoir): Sample of other rows
+
+        Returns:
+        Reservoir: self
+        """
+        if other.seen == 0:
+            return self
+        if self.seen == 0 and len(other.x) <= self.size:
+            self.seen, self.x, self.y = other.seen, other.x.copy(), other.y.copy()
+            return self
+
+        # Largest sample whose split between the streams each side can
+        # always supply; a side that kept every row can supply any split
+        size = min(self.size, len(self.x) + len(other.x))
+        for sample in (self, other):
+            if len(sample.x) < sample.seen:
+                size = min(size, len(sample.x))
+        # How many of a uniform sample of both streams come from this one
+        own = self.rng.hypergeometric(self.seen, other.seen, size) if self.seen else 0
+        mine = self.rng.choice(len(self.x), own, replace=False)
+        theirs = self.rng.choice(len(other.x), size - own, replace=False)
+        self.x = np.concatenate([self.x[mine], other.x[theirs]])
+        self.y = np.concatenate([self.y[mine], other.y[theirs]])
+        self.seen += other.seen
+        return self
+
+
+#########################
+## STREAMING
+#########################
+def stream_regression(file, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None, sample_size=SAMPLE_SIZE):
+    """
+    Fit the section K regression and sample its scatter while reading the file in chunks.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+    sample_size (int): Number of rows kept for the scatter plot
+
+    Returns:
+    tuple: (LinearFit, Reservoir)
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError(f"File does not exist: {file}")
+    header = read_header(file)
+    for col in [REGRESSION_X, REGRESSION_Y]:
+        if col not in header:
+            raise ValueError(f"File must contain '{col}' column")
+
+    fit = LinearFit()
+    sample = Reservoir(sample_size)
+    for chunk in read_chunks(file, chunksize, columns=[REGRESSION_X, REGRESSION_Y], date_window=(start, end)):
+        x, y = chunk[REGRESSION_X].to_numpy(), chunk[REGRESSION_Y].to_numpy()
+        fit.update(x, y)
+        sample.update(x, y)
+    return fit, sample
+
+
+def test_linear_fit():
+    """
+    Compare the chunked fit with scipy.stats.linregress and check the reservoir sample.
+    """
+    from scipy import stats
+
+    def fields(result):
+        return (result.slope, result.intercept, result.rvalue, result.pvalue, result.stderr,
+                result.intercept_stderr)
+
+    rng = np.random.default_rng(1)
+    x = rng.uniform(10, 30, 10_000)
+    y = 60000 - 1200 * x + rng.normal(0, 15000, len(x))
+
+    # Test case 1: chunks of every size give the linregress result
+    expected = stats.linregress(x, y)
+    print("linregress:", expected)
+    for chunksize in [1, 7, 1000, len(x)]:
+        fit = LinearFit()
+        for i in range(0, len(x), chunksize):
+            fit.update(x[i:i + chunksize], y[i:i + chunksize])
+        result = fit.result()
+        assert np.allclose(result, fields(expected), rtol=1e-9, atol=0), f"chunksize={chunksize}: {result}"
+    print("✓ Success!")
+
+    # Test case 2: merged shards, two points and identical x values
+    print("\nTesting merge and edge cases...")
+    shards = [LinearFit().update(x[i::3], y[i::3]) for i in range(3)]
+    merged = shards[0].merge(shards[1]).merge(shards[2])
+    assert np.allclose(merged.result(), fields(expected), rtol=1e-9, atol=0)
+    assert np.allclose(LinearFit().update([1, 2], [3, 5]).result(), fields(stats.linregress([1, 2], [3, 5])))
+    try:
+        LinearFit().update([2, 2, 2], [1, 2, 3]).result()
+        print("✗ Failed: Should have raised ValueError")
+    except ValueError as e:
+        print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 3: the reservoir keeps every row until it is full, then a uniform sample
+    print("\nTesting reservoir...")
+    sample = Reservoir(size=100).update(x[:60], y[:60])
+    assert np.array_equal(sample.x, x[:60])
+    for i in range(60, len(x), 250):
+        sample.update(x[i:i + 250], y[i:i + 250])
+    assert len(sample.x) == 100 and sample.seen == len(x)
+    assert set(zip(sample.x, sample.y)) <= set(zip(x, y))
+    # Each row is kept with probability 100 / 10000; count the first half
+    first_half = np.isin(sample.x, x[:5000]).sum()
+    assert 30 <= first_half <= 70, first_half
+    merged = Reservoir(size=100).update(x[:9000], y[:9000]).merge(Reservoir(size=100).update(x[9000:], y[9000:]))
+    assert len(merged.x) == 100 and merged.seen == len(x)
+    # Merging samples of different sizes keeps every row equally likely
+    for own_rows, own_size, other_size in [(9995, 10, 5), (5, 100, 10), (600, 20, 50), (9000, 100, 10)]:
+        # Rows are told apart by their position, sampled as the x values
+        rows = np.arange(len(x), dtype=np.float64)
+        trials, kept = 400, np.zeros(len(x))
+        for trial in range(trials):
+            mine = Reservoir(own_size, seed=trial).update(rows[:own_rows], rows[:own_rows])
+            merged = mine.merge(Reservoir(other_size, seed=trials + trial).update(rows[own_rows:], rows[own_rows:]))
+            assert merged.seen == len(x) and len(np.unique(merged.x)) == len(merged.x)
+            kept[merged.x.astype(np.int64)] += 1
+        # Share of the sample from this stream, and the most often kept row
+        share = kept[:own_rows].sum() / kept.sum()
+        expected_share = own_rows / len(x)
+        assert abs(share - expected_share) <= 4 * np.sqrt(expected_share * (1 - expected_share) / kept.sum()) + 1e-9, \
+            (own_rows, own_size, other_size, share)
+        p = kept.sum() / trials / len(x)
+        assert kept.max() <= trials * p + 6 * np.sqrt(trials * p) + 2, (own_rows, own_size, other_size, kept.max())
+    assert len(Reservoir(size=10).merge(Reservoir(size=100).update(x, y)).x) == 10
+    print("✓ Success!")
+
+    # Test case 4: the bundled data set in chunks
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data, mask_data
+        df = mask_data(load_data('nasa.csv', cache=False))
+        fit, sample = stream_regression('nasa.csv', chunksize=500)
+        expected = stats.linregress(df[REGRESSION_X].astype('float64'), df[REGRESSION_Y].astype('float64'))
+        assert np.allclose(fit.result(), fields(expected), rtol=1e-9, atol=0)
+        assert sample.seen == len(df) and len(sample.x) == min(SAMPLE_SIZE, len(df))
+        print("r-squared:", fit.result().rvalue ** 2)
+        print("✓ Success!")
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_linear_fit()
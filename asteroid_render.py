@@ -0,0 +1,412 @@
+"""
+NASA Asteroid Data Analysis - rendering of sections H-K
+
+Draws the four figures with the object-oriented Figure API instead of pyplot's
+global state, so figures can be rendered side by side. render_plots() hands
+each figure to a worker process and passes the arrays it needs through shared
+memory, so the DataFrame itself is never pickled. The histograms of sections
+H and I are binned before drawing (asteroid_histogram.py), so only their bin
+edges and counts reach the figure.
+
+Usage: python asteroid_render.py
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from asteroid_histogram import Histogram
+from asteroid_regression import REGRESSION_X, REGRESSION_Y, LinearFit, Reservoir
+
+
+#########################
+## PLOT INPUTS
+#########################
+def _hist_diameter_inputs(df):
+    """Histogram of the average diameter of each asteroid in 100 bins (section H)."""
+    required_columns = ['Est Dia in KM(min)', 'Est Dia in KM(max)']
+    for col in required_columns:
+        if col not in df.columns:
+            raise ValueError(f"DataFrame must contain '{col}' column")
+    avg_diameter = (df['Est Dia in KM(min)'].to_numpy() + df['Est Dia in KM(max)'].to_numpy()) / 2
+    histogram = Histogram.from_values(avg_diameter, bins=100)
+    return {'edges': histogram.edges, 'counts': histogram.counts}
+
+
+def _hist_common_orbit_inputs(df):
+    """Histogram of 'Minimum Orbit Intersection' in 10 bins from min to max (section I)."""
+    if 'Minimum Orbit Intersection' not in df.columns:
+        raise ValueError("DataFrame must contain 'Minimum Orbit Intersection' column")
+    orbit_intersections = df['Minimum Orbit Intersection'].dropna().to_numpy()
+
+    # Create 10 bins spanning from min to max
+    bins = np.linspace(orbit_intersections.min(), orbit_intersections.max(), 11)  # 11 edges make 10 bins
+    histogram = Histogram(bins).add(orbit_intersections)
+    return {'edges': histogram.edges, 'counts': histogram.counts}
+
+
+def _pie_hazard_inputs(df):
+    """Number of hazardous asteroids and of all asteroids (section J)."""
+    if 'Hazardous' not in df.columns:
+        raise ValueError("DataFrame must contain 'Hazardous' column")
+    return {'hazardous_count': int(df['Hazardous'].sum()), 'total': len(df)}
+
+
+def _linear_motion_magnitude_inputs(df):
+    """Fit of 'Miles per hour' on 'Absolute Magnitude' and a sample of the rows (section K)."""
+    for col in [REGRESSION_X, REGRESSION_Y]:
+        if col not in df.columns:
+            raise ValueError(f"DataFrame must contain '{col}' column")
+    x, y = df[REGRESSION_X].to_numpy(), df[REGRESSION_Y].to_numpy()
+    fit = LinearFit().update(x, y)
+    sample = Reservoir().update(x, y)
+    return linear_motion_magnitude_inputs(fit, sample)
+
+
+def linear_motion_magnitude_inputs(fit, sample):
+    """
+    Inputs of the section K figure from a fit and a sample built elsewhere.
+
+    Parameters:
+    fit (LinearFit): Fit of all the rows
+    sample (Reservoir): Sample of the rows for the scatter plot
+
+    Returns:
+    dict: Keyword arguments of the figure
+    """
+    result = fit.result()
+    return {'x_sample': sample.x, 'y_sample': sample.y, 'slope': result.slope,
+            'intercept': result.intercept, 'rvalue': result.rvalue,
+            'min_x': fit.min_x, 'max_x': fit.max_x}
+
+
+#########################
+## FIGURES
+#########################
+def _figure(figsize):
+    """
+    New Figure of the given size.
+
+    matplotlib is imported on the first figure rather than with the module,
+    so callers that only compute plot inputs, and the parent process of
+    render_plots(), do not pay for it.
+    """
+    from matplotlib.figure import Figure
+    return Figure(figsize=figsize)
+
+
+def _draw_hist_diameter(path, edges, counts):
+    """
+    Histogram of the asteroids by average diameter in km.
+    """
+    fig = _figure((12, 6))
+    ax = fig.subplots()
+    Histogram(edges, counts).plot(ax, color='skyblue', edgecolor='black')
+
+    # Add title and labels
+    ax.set_title('Distribution of Asteroids by Average Diameter', fontsize=14)
+    ax.set_xlabel('Average Diameter (km)', fontsize=12)
+    ax.set_ylabel('Number of Asteroids', fontsize=12)
+
+    # Add grid for better readability
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _draw_hist_common_orbit(path, edges, counts):
+    """
+    Histogram of the asteroids by orbit intersection.
+    """
+    fig = _figure((12, 6))
+    ax = fig.subplots()
+    Histogram(edges, counts).plot(ax, color='skyblue', edgecolor='black')
+
+    # Add title and labels
+    ax.set_title('Distribution of Asteroids by Orbit Intersection', fontsize=14)
+    ax.set_xlabel('Minimum Orbit Intersection', fontsize=12)
+    ax.set_ylabel('Number of Asteroids', fontsize=12)
+
+    # Add grid for better readability
+    ax.grid(True, linestyle='--', alpha=0.7)
+
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _draw_pie_hazard(path, hazardous_count, total):
+    """
+    Pie chart of the percentage of hazardous and non-hazardous asteroids.
+    """
+    # Calculate percentages
+    non_hazardous_count = total - hazardous_count
+    hazardous_percent = (hazardous_count / total) * 100 if total > 0 else 0
+    non_hazardous_percent = (non_hazardous_count / total) * 100 if total > 0 else 0
+
+    # Prepare data for pie chart
+    labels = ['Hazardous', 'Non-Hazardous']
+    sizes = [hazardous_percent, non_hazardous_percent]
+    colors = ['#ff9999', '#66b3ff']
+    explode = (0.1, 0)  # explode the 1st slice (Hazardous)
+
+    fig = _figure((10, 7))
+    ax = fig.subplots()
+    ax.pie(sizes, explode=explode, labels=labels, colors=colors,
+           autopct='%1.1f%%', shadow=True, startangle=90)
+
+    # Equal aspect ratio ensures that pie is drawn as a circle
+    ax.axis('equal')
+
+    # Add title , legend, layout
+    ax.set_title('Percentage of Hazardous vs Non-Hazardous Asteroids', fontsize=14)
+    ax.legend(labels, loc="best")
+    fig.tight_layout()
+    fig.savefig(path)
+
+
+def _draw_linear_motion_magnitude(path, x_sample, y_sample, slope, intercept, rvalue, min_x, max_x):
+    """
+    Scatter plot of a sample of the rows and the regression line fitted on all of them.
+
+    Returns:
+    float: R-squared value of the linear regression
+    """
+    fig = _figure((12, 8))
+    ax = fig.subplots()
+    ax.scatter(x_sample, y_sample, alpha=0.5, color='#1f77b4', s=15, label='Data points')
+
+    # Create the regression line over the range of all rows
+    line_x = np.linspace(min_x, max_x, 100)
+    line_y = slope * line_x + intercept
+    ax.plot(line_x, line_y, color='red', linewidth=2, label='Regression line')
+
+    # Add labels and title
+    ax.set_title('Linear Regression: Absolute Magnitude vs Miles per hour', fontsize=14)
+    ax.set_xlabel('Absolute Magnitude', fontsize=12)
+    ax.set_ylabel('Miles per hour', fontsize=12)
+
+    # Add legend and grid
+    ax.legend(loc='upper right')
+    ax.grid(True, linestyle='--', alpha=0.3)
+
+    # Set y-axis limits
+    ax.set_ylim(0, 100000)
+
+    fig.tight_layout()
+    fig.savefig(path)
+
+    r_squared = rvalue ** 2
+    return r_squared
+
+
+# Figures of sections H-K in drawing order: name -> (inputs from df, draw, default file)
+PLOTS = {
+    'hist_diameter': (_hist_diameter_inputs, _draw_hist_diameter, 'hist_diameter.png'),
+    'hist_common_orbit': (_hist_common_orbit_inputs, _draw_hist_common_orbit, 'hist_common_orbit.png'),
+    'pie_hazard': (_pie_hazard_inputs, _draw_pie_hazard, 'pie_hazard.png'),
+    'linear_motion_magnitude': (_linear_motion_magnitude_inputs, _draw_linear_motion_magnitude,
+                                'linear_motion_magnitude.png'),
+}
+
+
+def render_plot(name, df, path=None):
+    """
+    Draw one figure of sections H-K in this process.
+
+    Parameters:
+    name (str): Key of PLOTS
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    path (str): PNG file to write, or None for the default file name
+
+    Returns:
+    Value returned by the figure (the R-squared of section K), else None
+    """
+    if name not in PLOTS:
+        raise ValueError(f"Unknown plot '{name}', expected one of {list(PLOTS)}")
+    return draw_plot(name, PLOTS[name][0](df), path)
+
+
+def draw_plot(name, inputs, path=None):
+    """
+    Draw one figure of sections H-K from inputs computed elsewhere.
+
+    The histograms take {'edges', 'counts'}, for example from the Histograms
+    of stream_histograms(), the pie chart {'hazardous_count', 'total'} and
+    the regression linear_motion_magnitude_inputs(), for example of the fit
+    and sample of stream_regression().
+
+    Parameters:
+    name (str): Key of PLOTS
+    inputs (dict): Keyword arguments of the figure
+    path (str): PNG file to write, or None for the default file name
+
+    Returns:
+    Value returned by the figure (the R-squared of section K), else None
+    """
+    if name not in PLOTS:
+        raise ValueError(f"Unknown plot '{name}', expected one of {list(PLOTS)}")
+    draw, default_path = PLOTS[name][1:]
+    return draw(path or default_path, **inputs)
+
+
+#########################
+## PARALLEL RENDERING
+#########################
+def _render_shared(name, path, shared, scalars):
+    """
+    Worker entry: attach the shared arrays of a figure and draw it.
+
+    Parameters:
+    name (str): Key of PLOTS
+    path (str): PNG file to write
+    shared (dict): Argument name -> (shared memory name, shape, dtype)
+    scalars (dict): Arguments passed by value
+
+    Returns:
+    Value returned by the figure
+    """
+    blocks = []
+    arrays = {}
+    try:
+        for key, (block_name, shape, dtype) in shared.items():
+            block = shared_memory.SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        return PLOTS[name][1](path, **arrays, **scalars)
+    finally:
+        # Views must be gone before the mappings can close
+        arrays.clear()
+        for block in blocks:
+            block.close()
+
+
+def render_plots(df, names=None, parallel=True, max_workers=None, out_dir=None):
+    """
+    Draw the figures of sections H-K, each in its own worker process.
+
+    The inputs of every figure are computed and checked here first. Arrays go
+    to the workers through shared memory, scalars by value. With a single
+    worker, or parallel=False, the figures are drawn one after another in this
+    process.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    names (list): Keys of PLOTS to draw, or None for all of them
+    parallel (bool): Render in worker processes
+    max_workers (int): Number of workers, by default one per figure up to the CPU count
+    out_dir (str): Directory of the PNG files, or None for the current directory
+
+    Returns:
+    dict: Plot name -> (PNG file, value returned by the figure), in drawing order
+    """
+    names = list(PLOTS) if names is None else list(names)
+    for name in names:
+        if name not in PLOTS:
+            raise ValueError(f"Unknown plot '{name}', expected one of {list(PLOTS)}")
+
+    # Check every figure's columns before drawing any of them
+    jobs = [(name, os.path.join(out_dir or '', PLOTS[name][2]), PLOTS[name][0](df)) for name in names]
+
+    if max_workers is None:
+        max_workers = min(len(jobs), os.cpu_count() or 1)
+    if not parallel or max_workers <= 1:
+        return {name: (path, PLOTS[name][1](path, **inputs)) for name, path, inputs in jobs}
+
+    blocks = []
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = []
+            for name, path, inputs in jobs:
+                shared, scalars = {}, {}
+                for key, value in inputs.items():
+                    if isinstance(value, np.ndarray):
+                        block = shared_memory.SharedMemory(create=True, size=max(value.nbytes, 1))
+                        blocks.append(block)
+                        np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = value
+                        shared[key] = (block.name, value.shape, value.dtype.str)
+                    else:
+                        scalars[key] = value
+                futures.append((name, path, pool.submit(_render_shared, name, path, shared, scalars)))
+            return {name: (path, future.result()) for name, path, future in futures}
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def test_render_plots():
+    """
+    Render the figures in worker processes and in this process and compare the PNG files.
+    """
+    import tempfile
+    import pandas as pd
+    from matplotlib.image import imread
+
+    temp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+
+    try:
+        rng = np.random.RandomState(0)
+        n = 500
+        df = pd.DataFrame({
+            'Est Dia in KM(min)': rng.uniform(0, 1, n).astype(np.float32),
+            'Est Dia in KM(max)': rng.uniform(1, 3, n).astype(np.float32),
+            'Minimum Orbit Intersection': np.where(rng.uniform(size=n) < 0.1, np.nan, rng.uniform(0, 0.5, n)),
+            'Hazardous': rng.uniform(size=n) < 0.2,
+            'Absolute Magnitude': rng.uniform(15, 30, n).astype(np.float32),
+            'Miles per hour': rng.uniform(1000, 90000, n).astype(np.float32),
+        })
+
+        # Test case 1: every figure is written and section K returns its R-squared
+        os.chdir(temp_dir)
+        os.mkdir('serial')
+        serial = render_plots(df, parallel=False)
+        print("Serial:", serial)
+        assert list(serial) == list(PLOTS)
+        from scipy import stats
+        fit = stats.linregress(df['Absolute Magnitude'].astype('float64'), df['Miles per hour'].astype('float64'))
+        assert np.isclose(serial['linear_motion_magnitude'][1], fit.rvalue ** 2)
+        for name, (path, value) in serial.items():
+            assert os.path.exists(path), f"{path} was not written"
+            os.replace(path, os.path.join('serial', path))
+        print("✓ Success!")
+
+        # Test case 2: worker processes draw the same pixels
+        print("\nTesting worker processes...")
+        parallel = render_plots(df, parallel=True, max_workers=2)
+        assert {name: value for name, (path, value) in parallel.items()} == \
+            {name: value for name, (path, value) in serial.items()}
+        for name, (path, value) in parallel.items():
+            assert np.array_equal(imread(path), imread(os.path.join('serial', path))), f"{path} differs"
+        print("✓ Success!")
+
+        # Test case 3: a missing column fails before any figure is drawn
+        print("\nTesting missing column...")
+        os.remove('hist_diameter.png')
+        try:
+            render_plots(df.drop(columns='Hazardous'), max_workers=2)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            assert not os.path.exists('hist_diameter.png')
+            print(f"✓ Success! Correctly raised: {e}")
+
+        # Test case 4: unknown plot name
+        try:
+            render_plot('scatter', df)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    finally:
+        # Clean up the temporary files
+        os.chdir(cwd)
+        import shutil
+        shutil.rmtree(temp_dir)
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_render_plots()
@@ -0,0 +1,376 @@
+"""
+NASA Asteroid Data Analysis - result cache
+
+ResultCache keeps the result of each section main() runs, keyed by the
+content of the data set, the section, its parameters and the code version,
+so a re-run on unchanged data reads its results instead of computing them:
+
+- key: sha256 of the data fingerprint (the sha256 of the file, or of the
+  manifest of a column store), the section letter, its parameters and the
+  sha256 of the analysis modules; editing the data or the code gives new keys
+- values: JSON with tags for tuples, numpy scalars and OrbitCounts, so
+  results come back with the types they were computed with, and no pickle
+- images: the PNG of sections H-K, copied back to the output path on a hit
+- eviction: entries are dropped least recently used first once they take
+  more than max_bytes
+
+The sha256 of a file is remembered with its size and modification time, so a
+warm run hashes nothing and does not load the data when every selected
+section is cached. clear() drops everything; `python nasa_asteroid_ds.py
+--clear-result-cache` does it from the command line.
+
+Usage: python asteroid_result_cache.py [clear] [directory]
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from asteroid_io import STORE_MANIFEST, file_sha256
+from asteroid_summary import OrbitCounts
+
+
+# Directory of the cache, relative to the working directory
+RESULT_CACHE_DIR = '.asteroid_results'
+
+# Bytes of values and images kept before the least recently used are evicted
+RESULT_CACHE_BYTES = 64 * 2 ** 20
+
+# Index of the entries and of the file hashes
+INDEX_FILE = 'index.json'
+
+# Returned by ResultCache.get when there is no entry
+MISS = object()
+
+_CODE_VERSION = None
+
+
+def code_version():
+    """
+    sha256 of the sources of the analysis modules, computed once per process.
+
+    Returns:
+    str: Hex digest over nasa_asteroid_ds.py and asteroid_*.py
+    """
+    global _CODE_VERSION
+    if _CODE_VERSION is None:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        paths = [os.path.join(directory, 'nasa_asteroid_ds.py')] + glob.glob(os.path.join(directory, 'asteroid_*.py'))
+        for path in sorted(paths):
+            with open(path, 'rb') as f:
+                digest.update(os.path.basename(path).encode() + b'\0' + f.read())
+        _CODE_VERSION = digest.hexdigest()
+    return _CODE_VERSION
+
+
+#########################
+## VALUES
+#########################
+def _encode(value):
+    """JSON form of a section result; raises TypeError for types it cannot restore."""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, np.generic):
+        return {'__numpy__': value.dtype.str, 'value': value.item()}
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, tuple):
+        return {'__tuple__': [_encode(item) for item in value]}
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        return {'__dict__': [[_encode(key), _encode(item)] for key, item in value.items()]}
+    if isinstance(value, OrbitCounts):
+        return {'__orbits__': value.ids.dtype.str, 'ids': value.ids.tolist(), 'counts': value.counts.tolist(),
+                'first': value.first.tolist()}
+    raise TypeError(f"Cannot cache a result of type {type(value).__name__}")
+
+
+def _decode(data):
+    """Section result of its JSON form."""
+    if isinstance(data, list):
+        return [_decode(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    if '__numpy__' in data:
+        return np.dtype(data['__numpy__']).type(data['value'])
+    if '__tuple__' in data:
+        return tuple(_decode(item) for item in data['__tuple__'])
+    if '__dict__' in data:
+        return {_decode(key): _decode(item) for key, item in data['__dict__']}
+    if '__orbits__' in data:
+        return OrbitCounts(np.array(data['ids'], dtype=data['__orbits__']), data['counts'], data['first'])
+    raise ValueError(f"Unknown cached value: {data}")
+
+
+#########################
+## CACHE
+#########################
+class ResultCache:
+    """
+    Size-bounded, least recently used cache of section results and images.
+
+    Parameters:
+    directory (str): Directory of the cache, created on the first write
+    max_bytes (int): Size above which the least recently used entries are evicted
+    """
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_bytes=RESULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _load_index(self):
+        if self._index is None:
+            try:
+                with open(self._path(INDEX_FILE)) as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {'entries': {}, 'files': {}}
+        return self._index
+
+    def _save_index(self):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(suffix='.json', dir=self.directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self._index, f)
+        os.replace(temp_path, self._path(INDEX_FILE))
+
+    def fingerprint(self, file):
+        """
+        sha256 of a data set's content, hashed again only when its size or modification time changes.
+
+        Parameters:
+        file (str): CSV file, archive or column store directory
+
+        Returns:
+        str: Hex digest
+        """
+        source = os.path.join(file, STORE_MANIFEST) if os.path.isdir(file) else file
+        stat = os.stat(source)
+        files = self._load_index()['files']
+        path = os.path.abspath(source)
+        known = files.get(path)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return known[2]
+        digest = file_sha256(source)
+        files[path] = [stat.st_size, stat.st_mtime_ns, digest]
+        self._save_index()
+        return digest
+
+    @staticmethod
+    def key(fingerprint, section, params=None):
+        """
+        Key of a section result.
+
+        Parameters:
+        fingerprint (str): Fingerprint of the data set
+        section (str): Section letter
+        params (dict): Parameters the result depends on, JSON-compatible
+
+        Returns:
+        str: Hex digest
+        """
+        text = json.dumps([fingerprint, section, params or {}, code_version()], sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def get(self, key, image_path=None):
+        """
+        Cached result of a key, with its image copied to image_path.
+
+        Parameters:
+        key (str): Key from ResultCache.key
+        image_path (str): Where to restore the image of the entry, if it has one
+
+        Returns:
+        The result, or MISS
+        """
+        entries = self._load_index()['entries']
+        if key not in entries:
+            return MISS
+        try:
+            with open(self._path(f"{key}.json")) as f:
+                value = _decode(json.load(f))
+            if entries[key]['image']:
+                if image_path is None:
+                    return MISS
+                shutil.copyfile(self._path(f"{key}.png"), image_path)
+        except (OSError, ValueError):
+            self._drop(key)
+            self._save_index()
+            return MISS
+        entries[key]['used'] = time.time_ns()
+        self._save_index()
+        return value
+
+    def put(self, key, value, image_path=None):
+        """
+        Store a result, and the image at image_path, then evict down to max_bytes.
+
+        Parameters:
+        key (str): Key from ResultCache.key
+        value: Section result
+        image_path (str): Image of the section, or None
+
+        Returns:
+        bool: True if the result was stored
+        """
+        try:
+            text = json.dumps(_encode(value))
+        except TypeError:
+            return False
+        os.makedirs(self.directory, exist_ok=True)
+        size = len(text)
+        try:
+            with open(self._path(f"{key}.json"), 'w') as f:
+                f.write(text)
+            if image_path is not None:
+                shutil.copyfile(image_path, self._path(f"{key}.png"))
+                size += os.path.getsize(image_path)
+        except OSError:
+            return False
+        entries = self._load_index()['entries']
+        entries[key] = {'bytes': size, 'used': time.time_ns(), 'image': image_path is not None}
+        self._evict()
+        self._save_index()
+        return key in entries
+
+    def _drop(self, key):
+        self._load_index()['entries'].pop(key, None)
+        for extension in ('json', 'png'):
+            if os.path.exists(self._path(f"{key}.{extension}")):
+                os.remove(self._path(f"{key}.{extension}"))
+
+    def _evict(self):
+        entries = self._load_index()['entries']
+        total = sum(entry['bytes'] for entry in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]['used']):
+            if total <= self.max_bytes:
+                break
+            total -= entries[key]['bytes']
+            self._drop(key)
+
+    def size(self):
+        """
+        Bytes of values and images in the cache.
+
+        Returns:
+        int: Total size of the entries
+        """
+        return sum(entry['bytes'] for entry in self._load_index()['entries'].values())
+
+    def __len__(self):
+        return len(self._load_index()['entries'])
+
+    def clear(self):
+        """
+        Drop every entry and file hash.
+        """
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+        self._index = None
+
+
+def test_result_cache():
+    """
+    Check the value round trip, images, eviction and a warm run of main().
+    """
+    import contextlib
+    import io
+
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        cache = ResultCache(os.path.join(temp_dir, 'cache'))
+
+        # Test case 1: results come back with their types
+        values = [
+            (np.int32(3432678), np.float32(32.1)),
+            np.int32(3728733),
+            OrbitCounts.from_values(np.array([8, 9, 8, 7], dtype=np.int16)),
+            1187,
+            {'file': 'nasa.csv', 'shape': (4687, 40)},
+            (3896, 2, ['Name', 'Orbit ID']),
+            {'path': 'plot.png', 'r_squared': 0.1417},
+        ]
+        data_file = os.path.join(temp_dir, 'data.csv')
+        with open(data_file, 'w') as f:
+            f.write("Name\n1\n")
+        fingerprint = cache.fingerprint(data_file)
+        for i, value in enumerate(values):
+            key = cache.key(fingerprint, 'X', {'i': i})
+            assert cache.get(key) is MISS
+            assert cache.put(key, value)
+            restored = cache.get(key)
+            assert repr(restored) == repr(value) and str(restored) == str(value), (restored, value)
+        assert not cache.put(cache.key(fingerprint, 'X', {'i': 'bad'}), object())
+        print("✓ Success!")
+
+        # Test case 2: images, new keys for new data, eviction and clearing
+        print("\nTesting images and eviction...")
+        image = os.path.join(temp_dir, 'image.png')
+        with open(image, 'wb') as f:
+            f.write(b'\x89PNG' + bytes(1000))
+        key = cache.key(fingerprint, 'H', {'path': image})
+        cache.put(key, {'path': image}, image_path=image)
+        os.remove(image)
+        assert cache.get(key, image_path=image) == {'path': image} and os.path.getsize(image) == 1004
+        with open(data_file, 'a') as f:
+            f.write("2\n")
+        assert ResultCache(cache.directory).fingerprint(data_file) != fingerprint
+        small = ResultCache(cache.directory, max_bytes=1200)
+        small.put(small.key(fingerprint, 'Y'), 'x' * 300)
+        assert small.get(key, image_path=image) is MISS and small.size() <= 1200
+        small.clear()
+        assert len(ResultCache(cache.directory)) == 0
+        print("✓ Success!")
+
+        # Test case 3: a warm run of main() prints the same, restores the images and loads nothing
+        if os.path.exists('nasa.csv'):
+            print("\nTesting warm run...")
+            from nasa_asteroid_ds import main
+            out_dir = os.path.join(temp_dir, 'out')
+            runs = []
+            for _ in range(2):
+                stdout = io.StringIO()
+                begin = time.perf_counter()
+                with contextlib.redirect_stdout(stdout):
+                    main('nasa.csv', parallel_plots=False, output_dir=out_dir, result_cache=cache.directory)
+                seconds = time.perf_counter() - begin
+                images = {}
+                for name in os.listdir(out_dir):
+                    with open(os.path.join(out_dir, name), 'rb') as f:
+                        images[name] = f.read()
+                runs.append((seconds, stdout.getvalue(), images))
+                shutil.rmtree(out_dir)
+            (cold, cold_text, cold_images), (warm, warm_text, warm_images) = runs
+            print(f"Cold run {cold:.2f}s, warm run {warm:.3f}s")
+            assert warm_text == cold_text
+            assert len(warm_images) == 4 and warm_images == cold_images
+            assert warm < 1.0
+            print("✓ Success!")
+
+    finally:
+        # Clean up the temporary files
+        shutil.rmtree(temp_dir)
+
+
+# Clear the cache, or run the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'clear':
+        directory = sys.argv[2] if len(sys.argv) > 2 else RESULT_CACHE_DIR
+        ResultCache(directory).clear()
+        print(f"Cleared {directory}")
+    else:
+        test_result_cache()
@@ -0,0 +1,714 @@
+"""
+NASA Asteroid Data Analysis - resident query service
+
+A long-running asyncio HTTP/JSON service that loads and indexes the data set
+once and answers the section functions of nasa_asteroid_ds.py over it, so a
+question does not pay the imports, load_data and mask_data of a new process:
+
+    GET /closest_to_earth?year=2015
+    GET /common_orbit?hazardous=true&top_k=10
+    GET /max_absolute_magnitude?start=2000-01-01&k=5&by=year
+
+Endpoints are /details (C), /max_absolute_magnitude (D), /closest_to_earth (E),
+/common_orbit (F), /min_max_diameter (G), /count and /health. Every endpoint
+takes the filters start and end (a [start, end) close approach window as in
+mask_data), year (shorthand for one year's window) and hazardous (true or
+false); D and E also take k and by, F takes top_k and min_count.
+
+- index: the rows are put in close approach order once (load_data with
+  time_index=True), and so are the hazardous and non-hazardous rows, so a
+  filter is a slice found by binary search rather than a scan
+- executor: the section functions run in a thread pool, so the event loop
+  keeps accepting and answering requests while one is computed
+- memo: the JSON of the last RESULT_MEMO_SIZE distinct queries is kept, and
+  concurrent requests for the same query share one computation; a repeated
+  query is answered without touching the data. /health reports the memo size
+  and the number of queries computed so far
+- hot reload: the file's size and modification time are polled every
+  reload_interval seconds; a changed file is loaded in the executor and
+  swapped in whole, and the memo is dropped. Until then, and if the new file
+  fails to load, the previous data keeps being served
+
+Responses are JSON: {"rows": rows after the filters, "result": ...}, or
+{"error": message} with status 400 for bad parameters and 404 for unknown
+paths. asteroid_loadtest.py measures the latency under concurrent clients.
+
+Usage: python asteroid_service.py [file] [--host 127.0.0.1] [--port 8016] [--workers 4]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import pandas as pd
+
+from asteroid_io import STORE_MANIFEST
+from asteroid_time import index_by_time
+from nasa_asteroid_ds import (_json_default, closest_to_earth, common_orbit, data_details, load_data, mask_data,
+                              max_absolute_magnitude, min_max_diameter)
+
+
+# Address the service listens on by default
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8016
+
+# Seconds between two checks of the data file for changes
+RELOAD_INTERVAL = 1.0
+
+# Distinct queries whose responses are kept
+RESULT_MEMO_SIZE = 1024
+
+# Largest request line and headers accepted, in bytes
+MAX_REQUEST_BYTES = 8192
+
+# Reason phrases of the statuses the service sends
+STATUS_REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    431: 'Request Header Fields Too Large',
+    500: 'Internal Server Error',
+}
+
+# Filters every endpoint takes
+FILTERS = ('start', 'end', 'year', 'hazardous')
+
+
+#########################
+## PARAMETERS
+#########################
+def _int_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Parameter '{name}' must be an integer, got: {value}")
+
+
+def _bool_param(params, name):
+    value = params.get(name)
+    if value is None:
+        return None
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"Parameter '{name}' must be true or false, got: {value}")
+
+
+def parse_filters(params):
+    """
+    Close approach window and hazard filter of a query.
+
+    Parameters:
+    params (dict): Query parameters, as strings
+
+    Returns:
+    tuple: (start, end, hazardous), each None when not filtered
+    """
+    start, end = params.get('start'), params.get('end')
+    year = _int_param(params, 'year')
+    if year is not None:
+        if start is not None or end is not None:
+            raise ValueError("Parameter 'year' cannot be combined with 'start' or 'end'")
+        start, end = f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    for value in (start, end):
+        if value is not None:
+            try:
+                pd.Timestamp(value)
+            except ValueError:
+                raise ValueError(f"Invalid date: {value}")
+    return start, end, _bool_param(params, 'hazardous')
+
+
+#########################
+## ENDPOINTS
+#########################
+# path: (function of the filtered DataFrame and the query parameters, parameters it takes besides the filters)
+ENDPOINTS = {
+    '/count': (lambda df, params: len(df), ()),
+    '/details': (lambda df, params: data_details(df), ()),
+    '/max_absolute_magnitude': (
+        lambda df, params: max_absolute_magnitude(df, _int_param(params, 'k'), params.get('by')), ('k', 'by')),
+    '/closest_to_earth': (
+        lambda df, params: closest_to_earth(df, _int_param(params, 'k'), params.get('by')), ('k', 'by')),
+    '/common_orbit': (
+        lambda df, params: common_orbit(df, _int_param(params, 'top_k'), _int_param(params, 'min_count')),
+        ('top_k', 'min_count')),
+    '/min_max_diameter': (lambda df, params: min_max_diameter(df), ()),
+}
+
+
+def _jsonable(value):
+    """Result with its DataFrames as lists of records, for json.dumps with _json_default."""
+    if isinstance(value, pd.DataFrame):
+        columns = [str(column) for column in value.columns]
+        values = zip(*(value[column].to_numpy() for column in value.columns))
+        return [dict(zip(columns, row)) for row in values]
+    return value
+
+
+def _encode(payload):
+    return json.dumps(payload, default=_json_default).encode()
+
+
+#########################
+## DATASET
+#########################
+def file_stamp(file):
+    """
+    Size and modification time of a data set, which change when it is rewritten.
+
+    Parameters:
+    file (str): CSV file, archive or column store directory
+
+    Returns:
+    tuple: (size in bytes, modification time in nanoseconds)
+    """
+    source = os.path.join(file, STORE_MANIFEST) if os.path.isdir(file) else file
+    stat = os.stat(source)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class Dataset:
+    """
+    A data set loaded and indexed once: all rows, and the hazardous and
+    non-hazardous rows, each in close approach order.
+
+    Parameters:
+    file (str): CSV file, archive or column store
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.stamp = file_stamp(file)
+        self.loaded_at = time.time()
+        df = load_data(file, time_index=True)
+        self.frames = {None: df}
+        if 'Hazardous' in df.columns:
+            hazardous = df['Hazardous'].to_numpy(dtype=bool)
+            self.frames[True] = index_by_time(df[hazardous])
+            self.frames[False] = index_by_time(df[~hazardous])
+
+    def __len__(self):
+        return len(self.frames[None])
+
+    def select(self, start=None, end=None, hazardous=None):
+        """
+        Rows in a close approach window, optionally only the (non-)hazardous ones.
+
+        Parameters:
+        start: First close approach date to keep, or None
+        end: First close approach date after the window, or None
+        hazardous (bool): Keep only hazardous (True) or non-hazardous (False) rows, or None for all
+
+        Returns:
+        pandas.DataFrame: Slice of the indexed rows
+        """
+        if hazardous not in self.frames:
+            raise ValueError("DataFrame must contain 'Hazardous' column")
+        df = self.frames[hazardous]
+        if start is None and end is None:
+            return df
+        return mask_data(df, start, end)
+
+
+#########################
+## SERVICE
+#########################
+class QueryService:
+    """
+    Section functions over a resident data set, answered over HTTP.
+
+    Parameters:
+    file (str): CSV file, archive or column store
+    reload_interval (float): Seconds between checks of the file for changes, or None to never reload
+    workers (int): Threads computing the results
+    memo_size (int): Distinct queries whose responses are kept
+    """
+
+    def __init__(self, file, reload_interval=RELOAD_INTERVAL, workers=4, memo_size=RESULT_MEMO_SIZE):
+        self.file = file
+        self.reload_interval = reload_interval
+        self.memo_size = memo_size
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asteroid-query')
+        self.dataset = None
+        self.version = 0
+        self.reloads = 0
+        self.reload_error = None
+        self.computed = 0
+        self._failed_stamp = None
+        self._memo = OrderedDict()
+        self._pending = {}
+        self._server = None
+        self._watcher = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Load the data set, then listen for requests and watch the file.
+
+        Parameters:
+        host (str): Address to listen on
+        port (int): Port to listen on, or 0 for any free port
+
+        Returns:
+        int: Port the service listens on
+        """
+        loop = asyncio.get_running_loop()
+        self._swap(await loop.run_in_executor(self.executor, Dataset, self.file))
+        self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_REQUEST_BYTES)
+        if self.reload_interval is not None:
+            self._watcher = asyncio.create_task(self._watch())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        """
+        Stop listening and watching, and shut the executor down.
+        """
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    def _swap(self, dataset):
+        # Responses of the previous data set are dropped; computations still
+        # running for it finish but are not memoized under the new version
+        self.dataset = dataset
+        self.version += 1
+        self._memo.clear()
+        self._pending.clear()
+
+    async def reload(self):
+        """
+        Load the file again if its size or modification time changed.
+
+        The previous data set is kept when the file cannot be loaded, until it changes again.
+
+        Returns:
+        bool: True if a new data set was swapped in
+        """
+        try:
+            stamp = file_stamp(self.file)
+        except OSError as e:
+            self.reload_error = str(e)
+            return False
+        if stamp == self.dataset.stamp or stamp == self._failed_stamp:
+            return False
+        loop = asyncio.get_running_loop()
+        try:
+            dataset = await loop.run_in_executor(self.executor, Dataset, self.file)
+        except Exception as e:
+            self.reload_error, self._failed_stamp = str(e), stamp
+            print(f"Reload of {self.file} failed, still serving the previous data: {e}", file=sys.stderr)
+            return False
+        self.reload_error = None
+        self.reloads += 1
+        self._swap(dataset)
+        return True
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            await self.reload()
+
+    def _compute(self, dataset, path, params):
+        """Status and JSON body of a query; runs in the executor."""
+        function, _ = ENDPOINTS[path]
+        try:
+            df = dataset.select(*parse_filters(params))
+            payload = {'rows': len(df), 'result': _jsonable(function(df, params))}
+            return 200, _encode(payload)
+        except (ValueError, KeyError) as e:
+            return 400, _encode({'error': str(e).strip('"')})
+
+    async def query(self, path, params):
+        """
+        Answer a query, from the memo when it was asked before.
+
+        Parameters:
+        path (str): Endpoint path
+        params (dict): Query parameters, as strings
+
+        Returns:
+        tuple: (HTTP status, JSON body as bytes)
+        """
+        if path == '/health':
+            dataset = self.dataset
+            return 200, _encode({'file': self.file, 'rows': len(dataset), 'version': self.version,
+                                 'loaded_at': dataset.loaded_at, 'reloads': self.reloads,
+                                 'reload_error': self.reload_error, 'memo': len(self._memo),
+                                 'computed': self.computed})
+        if path not in ENDPOINTS:
+            return 404, _encode({'error': f"Unknown endpoint: {path}", 'endpoints': sorted(ENDPOINTS) + ['/health']})
+        unknown = set(params) - set(FILTERS) - set(ENDPOINTS[path][1])
+        if unknown:
+            return 400, _encode({'error': f"Unknown parameters for {path}: {', '.join(sorted(unknown))}"})
+
+        version = self.version
+        key = (version, path, tuple(sorted(params.items())))
+        response = self._memo.get(key)
+        if response is not None:
+            self._memo.move_to_end(key)
+            return response
+
+        # Requests for a query being computed wait for the same result
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self.executor, self._compute, self.dataset, path, params)
+            self._pending[key] = future
+            self.computed += 1
+            try:
+                response = await future
+            finally:
+                if self._pending.get(key) is future:
+                    del self._pending[key]
+            if version == self.version:
+                self._memo[key] = response
+                if len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+            return response
+        return await asyncio.shield(future)
+
+    async def _handle(self, reader, writer):
+        """Serve the requests of one connection, kept alive until the client closes it."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.IncompleteReadError:
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(_response(431, _encode({'error': 'Request too large'}), close=True))
+                    break
+
+                lines = head.decode('latin-1').split('\r\n')
+                parts = lines[0].split(' ')
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                close = headers.get('connection', '').lower() == 'close' or (len(parts) == 3 and parts[2] == 'HTTP/1.0')
+                # Bodies are not used; read them so the next request starts where it should
+                length = headers.get('content-length', '0').strip() or '0'
+                if length.isdigit() and int(length):
+                    await reader.readexactly(int(length))
+
+                if len(parts) != 3:
+                    status, body = 400, _encode({'error': 'Malformed request line'})
+                    close = True
+                elif not length.isdigit():
+                    # The end of the body is unknown, so the connection cannot be reused
+                    status, body = 400, _encode({'error': f"Invalid Content-Length: {length}"})
+                    close = True
+                elif parts[0] not in ('GET', 'HEAD'):
+                    status, body = 405, _encode({'error': f"Method not allowed: {parts[0]}"})
+                else:
+                    url = urlsplit(parts[1])
+                    try:
+                        params = dict(parse_qsl(url.query, strict_parsing=bool(url.query)))
+                        status, body = await self.query(url.path.rstrip('/') or '/', params)
+                    except ValueError as e:
+                        status, body = 400, _encode({'error': str(e)})
+                    except Exception as e:
+                        status, body = 500, _encode({'error': f"{type(e).__name__}: {e}"})
+
+                writer.write(_response(status, body, close, head_only=parts[0] == 'HEAD'))
+                await writer.drain()
+                if close:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def _response(status, body, close=False, head_only=False):
+    """Bytes of an HTTP/1.1 response with a JSON body."""
+    head = (f"HTTP/1.1 {status} {STATUS_REASONS[status]}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n")
+    return head.encode() + (b'' if head_only else body)
+
+
+class ServiceThread(threading.Thread):
+    """
+    A QueryService running on its own event loop in a background thread.
+
+    Parameters:
+    service (QueryService): Service to run
+    host (str): Address to listen on
+    port (int): Port to listen on, or 0 for any free port
+    """
+
+    def __init__(self, service, host=DEFAULT_HOST, port=0):
+        super().__init__(name='asteroid-service', daemon=True)
+        self.service = service
+        self.host = host
+        self.port = port
+        self.loop = None
+        self.error = None
+        self._ready = threading.Event()
+        self._stopping = None
+
+    def run(self):
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        self.loop = asyncio.get_running_loop()
+        self._stopping = asyncio.Event()
+        try:
+            self.port = await self.service.start(self.host, self.port)
+        except Exception as e:
+            self.error = e
+            self._ready.set()
+            self.service.executor.shutdown(wait=False)
+            return
+        self._ready.set()
+        await self._stopping.wait()
+        await self.service.close()
+
+    def start(self):
+        """
+        Start the thread and wait until the service listens.
+
+        Returns:
+        ServiceThread: self
+        """
+        super().start()
+        self._ready.wait()
+        if self.error is not None:
+            raise self.error
+        return self
+
+    def stop(self):
+        """
+        Stop the service and wait for the thread to end.
+        """
+        if self.loop is not None and self._stopping is not None and self.is_alive():
+            self.loop.call_soon_threadsafe(self._stopping.set)
+        self.join()
+
+
+#########################
+## CLIENT
+#########################
+async def fetch(reader, writer, target, host=DEFAULT_HOST):
+    """
+    Send a GET request on an open connection and read the response.
+
+    Parameters:
+    reader (asyncio.StreamReader): Reader of the connection
+    writer (asyncio.StreamWriter): Writer of the connection
+    target (str): Path and query string
+    host (str): Value of the Host header
+
+    Returns:
+    tuple: (HTTP status, JSON body as bytes)
+    """
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ')[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def get_json(host, port, target):
+    """
+    GET one target on a new connection.
+
+    Parameters:
+    host (str): Address of the service
+    port (int): Port of the service
+    target (str): Path and query string
+
+    Returns:
+    tuple: (HTTP status, decoded JSON body)
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, body = await fetch(reader, writer, target, host)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return status, json.loads(body)
+
+
+def test_service():
+    """
+    Compare the endpoints with the section functions, and check errors,
+    concurrent requests and the hot reload.
+    """
+    import shutil
+    import tempfile
+
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        if os.path.exists('nasa.csv'):
+            file_path = os.path.join(temp_dir, 'nasa.csv')
+            shutil.copyfile('nasa.csv', file_path)
+        else:
+            from asteroid_synth import generate
+            file_path = generate(os.path.join(temp_dir, 'nasa.csv'), 5000, seed=0)
+        df = load_data(file_path, cache=False)
+        service = QueryService(file_path, reload_interval=0.05, workers=2)
+        thread = ServiceThread(service).start()
+
+        def get(target):
+            return asyncio.run(get_json(DEFAULT_HOST, thread.port, target))
+
+        def same(value):
+            return json.loads(json.dumps(_jsonable(value), default=_json_default))
+
+        try:
+            # Test case 1: endpoints answer what the section functions return
+            print("Testing endpoints...")
+            from_2000 = mask_data(df)
+            year_2015 = mask_data(df, '2015-01-01', '2016-01-01')
+            hazardous = df[df['Hazardous']]
+            cases = [
+                ('/details', data_details(df)),
+                ('/count?year=2015', len(year_2015)),
+                ('/max_absolute_magnitude?start=2000-01-01', max_absolute_magnitude(from_2000)),
+                ('/closest_to_earth?year=2015', closest_to_earth(year_2015)),
+                ('/common_orbit?hazardous=true', common_orbit(hazardous)),
+                ('/common_orbit?start=2000-01-01&top_k=5', common_orbit(from_2000, top_k=5)),
+                ('/min_max_diameter?hazardous=false&end=2010-01-01',
+                 min_max_diameter(mask_data(df[~df['Hazardous']], None, '2010-01-01'))),
+            ]
+            for target, expected in cases:
+                status, body = get(target)
+                assert status == 200, (target, body)
+                assert body['result'] == same(expected), (target, body['result'], expected)
+            status, body = get('/closest_to_earth?k=3&by=year&start=2000-01-01')
+            expected = closest_to_earth(from_2000, k=3, by='year')
+            assert [row['Name'] for row in body['result']] == expected['Name'].tolist()
+            print("✓ Success!")
+
+            # Test case 2: bad parameters and paths give errors and the service keeps serving
+            print("\nTesting errors...")
+            assert get('/nope')[0] == 404
+            assert get('/closest_to_earth?k=two')[0] == 400
+            assert get('/closest_to_earth?year=2015&start=2000-01-01')[0] == 400
+            assert get('/common_orbit?hazardous=maybe')[0] == 400
+            assert get('/common_orbit?k=3')[0] == 400
+            assert get('/count?start=not-a-date')[0] == 400
+
+            async def raw(request):
+                reader, writer = await asyncio.open_connection(DEFAULT_HOST, thread.port)
+                writer.write(request)
+                response = await reader.read()
+                writer.close()
+                await writer.wait_closed()
+                return response
+
+            response = asyncio.run(raw(b"GET /count HTTP/1.1\r\nContent-Length: abc\r\n\r\n"))
+            assert response.startswith(b"HTTP/1.1 400 ") and b"Connection: close" in response, response
+            assert get('/count')[1]['result'] == len(df)
+            print("✓ Success!")
+
+            # Test case 3: concurrent clients on kept-alive connections get memoized answers
+            print("\nTesting concurrent requests...")
+            targets = [target for target, _ in cases]
+
+            async def client(n):
+                reader, writer = await asyncio.open_connection(DEFAULT_HOST, thread.port)
+                answers = []
+                for i in range(20):
+                    answers.append(await fetch(reader, writer, targets[(n + i) % len(targets)]))
+                writer.close()
+                await writer.wait_closed()
+                return answers
+
+            async def clients():
+                return await asyncio.gather(*(client(n) for n in range(8)))
+
+            expected = {target: get(target) for target in targets}
+            computed = get('/health')[1]['computed']
+            for n, answers in enumerate(asyncio.run(clients())):
+                for i, (status, body) in enumerate(answers):
+                    target = targets[(n + i) % len(targets)]
+                    assert status == 200 and json.loads(body) == expected[target][1], target
+            assert get('/health')[1]['memo'] >= len(targets)
+            assert get('/health')[1]['computed'] == computed
+            print("✓ Success!")
+
+            # Test case 4: a rewritten file is reloaded, and a broken one does not stop the service
+            print("\nTesting hot reload...")
+            df.iloc[:100].to_csv(file_path, index=False, date_format='%Y-%m-%d')
+            deadline = time.time() + 30
+            while get('/health')[1]['reloads'] < 1 and time.time() < deadline:
+                time.sleep(0.05)
+            assert get('/count')[1]['result'] == 100
+            assert get('/health')[1]['memo'] == 1
+            with open(file_path, 'w') as f:
+                f.write('')
+            deadline = time.time() + 30
+            while get('/health')[1]['reload_error'] is None and time.time() < deadline:
+                time.sleep(0.05)
+            assert get('/count')[1]['result'] == 100
+            print("✓ Success!")
+        finally:
+            thread.stop()
+
+    finally:
+        # Clean up the temporary files
+        shutil.rmtree(temp_dir)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the NASA asteroid sections over HTTP/JSON.")
+    parser.add_argument('file', nargs='?', default='nasa.csv', help="CSV file, archive or column store")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--workers', type=int, default=4, help="threads computing results")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="seconds between checks of the file for changes")
+    return parser.parse_args(argv)
+
+
+async def serve(args):
+    """Run the service of the command line arguments until interrupted."""
+    service = QueryService(args.file, args.reload_interval, args.workers)
+    port = await service.start(args.host, args.port)
+    print(f"Serving {args.file} ({len(service.dataset)} rows) on http://{args.host}:{port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+# Serve a file, or run the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        try:
+            asyncio.run(serve(parse_args()))
+        except KeyboardInterrupt:
+            pass
+    else:
+        test_service()
@@ -0,0 +1,358 @@
+"""
+NASA Asteroid Data Analysis - map-reduce over sharded files
+
+ShardedDataset is a directory or glob of CSV shards, e.g. one file per day
+or month with the same header. sections() runs sections B-G and the
+histogram counts of sections H and I on every shard in a pool of worker
+processes and reduces the partial results in a tree of pairwise merges:
+
+1. map: each shard is streamed into a SectionState and the value ranges of
+   the histograms
+2. reduce: states merge in shard order, so the results are the same whatever
+   order the workers finish in and equal those of one file holding every
+   shard in turn
+3. map: with the global mean diameter and histogram edges, each shard counts
+   the diameters above the mean and its histogram bins
+4. reduce: counts and histograms add up
+
+Partial results are a few kilobytes whatever the shard size, so the reduce
+costs nothing next to the maps and throughput grows with the workers until
+the disk is the limit.
+
+Usage: python asteroid_shard.py [directory or glob] [--workers N]
+"""
+
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
+from asteroid_histogram import HISTOGRAM_COLUMNS, Histogram, _histogram_values
+from asteroid_io import (DEFAULT_CHUNKSIZE, date_window_column, date_window_mask, is_column_store,
+                         is_supported_file, read_chunks, read_header)
+from asteroid_stream import DETAIL_DROP_COLUMNS, STREAM_COLUMNS
+from asteroid_summary import SectionState
+
+
+# Columns every shard must have, next to the date window column
+SHARD_COLUMNS = STREAM_COLUMNS + [col for col in HISTOGRAM_COLUMNS if col not in STREAM_COLUMNS]
+
+
+def is_sharded(path):
+    """
+    Check whether a path names shards: a glob, or a directory that is not a column store.
+
+    Parameters:
+    path (str): Path given on the command line
+
+    Returns:
+    bool: True for a glob pattern or a directory of shards
+    """
+    if glob.has_magic(path):
+        return True
+    return os.path.isdir(path) and not is_column_store(path)
+
+
+def tree_reduce(items, combine):
+    """
+    Combine items pairwise, level by level, keeping their order.
+
+    Parameters:
+    items (list): Partial results in shard order
+    combine (callable): combine(earlier, later) -> combined result
+
+    Returns:
+    The combined result of every item
+    """
+    if not items:
+        raise ValueError("Nothing to reduce")
+    while len(items) > 1:
+        pairs = [items[i:i + 2] for i in range(0, len(items), 2)]
+        items = [combine(*pair) if len(pair) == 2 else pair[0] for pair in pairs]
+    return items[0]
+
+
+def _merge_ranges(first, second):
+    """Smallest and largest of two (low, high) ranges, either of which may be None."""
+    if first is None or second is None:
+        return second if first is None else first
+    return min(first[0], second[0]), max(first[1], second[1])
+
+
+def _extend_range(value_range, values):
+    """Smallest and largest of values and the range so far."""
+    if len(values) == 0:
+        return value_range
+    return _merge_ranges(value_range, (values.min(), values.max()))
+
+
+#########################
+## MAP
+#########################
+def _map_state(path, chunksize, start, end):
+    """First map: SectionState, rows read and histogram ranges of one shard."""
+    header = read_header(path)
+    for col in SHARD_COLUMNS:
+        if col not in header:
+            raise ValueError(f"Shard {path} must contain '{col}' column")
+
+    state = SectionState()
+    rows_loaded = 0
+    diameter_range = orbit_range = None
+    for chunk in read_chunks(path, chunksize, columns=SHARD_COLUMNS + [date_window_column(header)]):
+        rows_loaded += len(chunk)
+        chunk = chunk[date_window_mask(chunk, start, end)]
+        state.update(chunk)
+        avg_diameter, orbit_intersections = _histogram_values(chunk)
+        diameter_range = _extend_range(diameter_range, avg_diameter)
+        orbit_range = _extend_range(orbit_range, orbit_intersections)
+    return {'header': header, 'rows_loaded': rows_loaded, 'state': state,
+            'diameter_range': diameter_range, 'orbit_range': orbit_range}
+
+
+def _reduce_state(earlier, later):
+    """First reduce: merge the partial results of consecutive shards."""
+    if later['header'] != earlier['header']:
+        raise ValueError(f"Shards must share one header, got: {earlier['header']} and {later['header']}")
+    earlier['rows_loaded'] += later['rows_loaded']
+    earlier['state'].merge(later['state'])
+    for key in ('diameter_range', 'orbit_range'):
+        earlier[key] = _merge_ranges(earlier[key], later[key])
+    return earlier
+
+
+def _map_counts(path, chunksize, start, end, avg_max_diameter, diameter_edges, orbit_edges):
+    """Second map: diameters above the mean and histogram counts of one shard."""
+    header = read_header(path)
+    count_above_avg = 0
+    hist_diameter, hist_common_orbit = Histogram(diameter_edges), Histogram(orbit_edges)
+    columns = SHARD_COLUMNS + [date_window_column(header)]
+    for chunk in read_chunks(path, chunksize, columns=columns, date_window=(start, end)):
+        if avg_max_diameter is not None:
+            count_above_avg += int(np.count_nonzero(chunk['Est Dia in KM(max)'].to_numpy() > avg_max_diameter))
+        avg_diameter, orbit_intersections = _histogram_values(chunk)
+        hist_diameter.add(avg_diameter)
+        hist_common_orbit.add(orbit_intersections)
+    return count_above_avg, hist_diameter, hist_common_orbit
+
+
+def _reduce_counts(earlier, later):
+    """Second reduce: add the counts of two groups of shards."""
+    return earlier[0] + later[0], earlier[1].merge(later[1]), earlier[2].merge(later[2])
+
+
+#########################
+## DATASET
+#########################
+class ShardedDataset:
+    """
+    CSV shards read as one data set, in sorted path order.
+
+    Parameters:
+    shards (list): Paths of the shards
+    """
+
+    def __init__(self, shards):
+        self.shards = sorted(shards)
+        if not self.shards:
+            raise FileNotFoundError("No shards to read")
+
+    @classmethod
+    def from_path(cls, path):
+        """
+        Shards of a directory or glob.
+
+        A directory holds its CSV files and archives; a glob matches the
+        shards themselves.
+
+        Parameters:
+        path (str): Directory or glob pattern
+
+        Returns:
+        ShardedDataset: The data set
+        """
+        if os.path.isdir(path):
+            shards = [os.path.join(path, name) for name in os.listdir(path) if is_supported_file(name)]
+        else:
+            shards = [match for match in glob.glob(path) if os.path.isfile(match)]
+        if not shards:
+            raise FileNotFoundError(f"No CSV shards found at: {path}")
+        return cls(shards)
+
+    def __len__(self):
+        return len(self.shards)
+
+    def _map(self, function, workers):
+        """Results of function on every shard, in shard order."""
+        if workers == 1 or len(self.shards) == 1:
+            return [function(shard) for shard in self.shards]
+        with ProcessPoolExecutor(max_workers=min(workers or os.cpu_count() or 1, len(self.shards))) as pool:
+            return list(pool.map(function, self.shards))
+
+    def sections(self, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None, workers=None):
+        """
+        Results of sections B-G and the histograms of sections H and I over every shard.
+
+        Parameters:
+        chunksize (int): Number of rows per chunk within a shard
+        start: First close approach date kept by the filter (section B), or None
+        end: First close approach date after the filter window, or None
+        workers (int): Worker processes, None for one per CPU, 1 to run in this process
+
+        Returns:
+        dict: The keys of stream_sections, plus 'shards', 'hist_diameter' and 'hist_common_orbit'
+        """
+        if workers is not None and workers < 1:
+            raise ValueError(f"workers must be a positive integer, got: {workers}")
+
+        partials = self._map(partial(_map_state, chunksize=chunksize, start=start, end=end), workers)
+        total = tree_reduce(partials, _reduce_state)
+        state = total['state']
+        if total['diameter_range'] is None or total['orbit_range'] is None:
+            raise ValueError("No rows to build the histograms from")
+
+        avg_max_diameter = state.mean_max_diameter() if state.diameter_count > 0 else None
+        diameter_edges = Histogram.uniform(*total['diameter_range'], bins=100).edges
+        orbit_edges = np.linspace(*total['orbit_range'], 11)  # 11 edges make 10 bins
+        counts = self._map(partial(_map_counts, chunksize=chunksize, start=start, end=end,
+                                   avg_max_diameter=avg_max_diameter, diameter_edges=diameter_edges,
+                                   orbit_edges=orbit_edges), workers)
+        count_above_avg, hist_diameter, hist_common_orbit = tree_reduce(counts, _reduce_counts)
+
+        kept = [col for col in total['header'] if col not in DETAIL_DROP_COLUMNS]
+        return {
+            'shards': len(self.shards),
+            'rows_loaded': total['rows_loaded'],
+            'rows': state.rows,
+            'data_details': (state.rows, len(kept), kept),
+            'max_absolute_magnitude': state.max_absolute_magnitude(),
+            'closest_to_earth': state.closest_to_earth(),
+            'common_orbit': state.common_orbit(),
+            'min_max_diameter': count_above_avg,
+            'hist_diameter': hist_diameter,
+            'hist_common_orbit': hist_common_orbit,
+        }
+
+
+def write_shards(file, directory, shards):
+    """
+    Split a CSV file into shards of consecutive rows, each with the header.
+
+    Parameters:
+    file (str): Path to the CSV file
+    directory (str): Directory of the shards, created if needed
+    shards (int): Number of shards
+
+    Returns:
+    list: Paths of the shards, in row order
+    """
+    os.makedirs(directory, exist_ok=True)
+    with open(file) as f:
+        header, *lines = f.readlines()
+    size = -(-len(lines) // shards)
+    paths = []
+    for number in range(shards):
+        path = os.path.join(directory, f"shard_{number:04d}.csv")
+        with open(path, 'w') as f:
+            f.write(header)
+            f.writelines(lines[number * size:(number + 1) * size])
+        paths.append(path)
+    return paths
+
+
+def test_sharded():
+    """
+    Compare the map-reduce results with one stream over the unsplit file.
+    """
+    import shutil
+    import tempfile
+    import time
+    from asteroid_histogram import stream_histograms
+    from asteroid_stream import stream_sections
+
+    assert tree_reduce(['a', 'b', 'c', 'd', 'e'], lambda a, b: a + b) == 'abcde'
+
+    if not os.path.exists('nasa.csv'):
+        print("nasa.csv not found, skipping")
+        return
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        # Test case 1: any number of shards and workers gives the single-file results
+        expected = stream_sections('nasa.csv', chunksize=1000)
+        histograms = stream_histograms('nasa.csv', chunksize=1000)
+        for shards, workers in [(1, 1), (7, 1), (16, 2)]:
+            directory = os.path.join(temp_dir, f"split_{shards}")
+            write_shards('nasa.csv', directory, shards)
+            result = ShardedDataset.from_path(directory).sections(chunksize=250, workers=workers)
+            assert result['shards'] == shards
+            for key, value in expected.items():
+                assert result[key] == value, f"{shards} shards, {key}: {result[key]} != {value}"
+            for name, histogram in histograms.items():
+                assert np.array_equal(result[name].edges, histogram.edges)
+                assert np.array_equal(result[name].counts, histogram.counts)
+        print("✓ Success! 1, 7 and 16 shards match the single file")
+
+        # Test case 2: shards with missing diameters give the single-file histograms
+        print("\nTesting missing diameters...")
+        import pandas as pd
+        raw = pd.read_csv('nasa.csv')
+        in_window = np.flatnonzero(raw['Close Approach Date'].to_numpy() >= '2000-01-01')
+        raw.loc[in_window[::500], 'Est Dia in KM(min)'] = np.nan
+        blanked = os.path.join(temp_dir, 'blanked.csv')
+        raw.to_csv(blanked, index=False)
+        write_shards(blanked, os.path.join(temp_dir, 'blanked'), 5)
+        result = ShardedDataset.from_path(os.path.join(temp_dir, 'blanked')).sections(chunksize=250, workers=1)
+        for name, histogram in stream_histograms(blanked, chunksize=1000).items():
+            assert np.array_equal(result[name].edges, histogram.edges)
+            assert np.array_equal(result[name].counts, histogram.counts)
+        print("✓ Success!")
+
+        # Test case 3: globs, deterministic order and errors
+        print("\nTesting globs and errors...")
+        dataset = ShardedDataset.from_path(os.path.join(temp_dir, 'split_7', 'shard_000[0-3].csv'))
+        assert [os.path.basename(path) for path in dataset.shards] == [f"shard_000{i}.csv" for i in range(4)]
+        assert is_sharded(temp_dir) and is_sharded('*.csv') and not is_sharded('nasa.csv')
+        with open(os.path.join(temp_dir, 'split_7', 'shard_0099.csv'), 'w') as f:
+            f.write("Name,Absolute Magnitude\n1001,25.0\n")
+        for bad in [lambda: ShardedDataset.from_path(os.path.join(temp_dir, 'missing_*.csv')),
+                    lambda: ShardedDataset.from_path(os.path.join(temp_dir, 'split_7')).sections(workers=1),
+                    lambda: ShardedDataset.from_path(os.path.join(temp_dir, 'split_16')).sections(workers=0)]:
+            try:
+                bad()
+                print("✗ Failed: Should have raised")
+            except (FileNotFoundError, ValueError) as e:
+                print(f"✓ Success! Correctly raised: {e}")
+
+        # Test case 4: throughput with one worker and one per CPU
+        print("\nTesting throughput...")
+        dataset = ShardedDataset.from_path(os.path.join(temp_dir, 'split_16'))
+        for workers in sorted({1, os.cpu_count() or 1}):
+            begin = time.perf_counter()
+            dataset.sections(workers=workers)
+            print(f"{workers} worker(s): {time.perf_counter() - begin:.2f}s for {len(dataset)} shards")
+        print("✓ Success!")
+
+    finally:
+        # Clean up the temporary files
+        shutil.rmtree(temp_dir)
+
+
+# Run sections B-G over shards, or the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        import argparse
+        parser = argparse.ArgumentParser(description="Run sections B-G over a directory or glob of CSV shards.")
+        parser.add_argument('path', help="directory or glob of the shards")
+        parser.add_argument('--workers', type=int, help="worker processes (default: one per CPU)")
+        parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE, help="rows per chunk within a shard")
+        args = parser.parse_args()
+        result = ShardedDataset.from_path(args.path).sections(chunksize=args.chunksize, workers=args.workers)
+        for key in ('shards', 'rows_loaded', 'rows', 'max_absolute_magnitude', 'closest_to_earth',
+                    'common_orbit', 'min_max_diameter'):
+            print(f"{key}: {result[key]}")
+    else:
+        test_sharded()
@@ -0,0 +1,129 @@
+"""
+NASA Asteroid Data Analysis - startup import budget
+
+Runs a command line of nasa_asteroid_ds.py under `python -X importtime` and
+reports the time spent importing modules. It checks that a run of the
+statistics sections (D-G) imports neither matplotlib nor scipy: those are
+imported only when a figure is drawn (asteroid_render._figure) or a
+regression p-value is computed (LinearFit.result). The time of the other
+imports is measured against numpy and pandas in the same run, rather than
+in seconds, so a slow or busy machine does not fail the check.
+
+Usage: python asteroid_startup.py [nasa_asteroid_ds.py arguments]
+"""
+
+import os
+import subprocess
+import sys
+
+
+# Import time allowed for a statistics-only run besides numpy and pandas, as a share of theirs
+STARTUP_OVERHEAD_RATIO = 1.0
+
+# Packages every run imports, the baseline of the import time
+BASELINE_PACKAGES = ('numpy', 'pandas')
+
+# Packages a statistics-only run must not import
+HEAVY_PACKAGES = ('matplotlib', 'scipy')
+
+# Script whose startup is measured
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nasa_asteroid_ds.py')
+
+
+def import_times(args, cwd=None):
+    """
+    Run a Python command line under -X importtime and parse the import times.
+
+    Parameters:
+    args (list): Arguments after `python -X importtime`
+    cwd (str): Working directory of the command, or None for the current one
+
+    Returns:
+    list: (module, self seconds, cumulative seconds, nesting depth) in import order
+    """
+    process = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=cwd, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Command failed with exit code {process.returncode}: {process.stderr[-2000:]}")
+
+    times = []
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        # One space after the bar, then two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times.append((name.strip(), int(self_us) / 1e6, int(cumulative_us) / 1e6, depth))
+    return times
+
+
+def startup_report(args, cwd=None):
+    """
+    Total import time of a command line, its numpy and pandas part and the heavy packages it imported.
+
+    Parameters:
+    args (list): Arguments of nasa_asteroid_ds.py
+    cwd (str): Working directory of the run, or None for the current one
+
+    Returns:
+    tuple: (total import seconds, numpy and pandas import seconds, sorted heavy packages imported,
+            slowest top-level imports)
+    """
+    times = import_times([SCRIPT, *args], cwd)
+    top_level = [(module, cumulative) for module, _, cumulative, depth in times if depth == 0]
+    total = sum(cumulative for _, cumulative in top_level)
+    # Each package is reported once, where it is first imported
+    baseline = sum(cumulative for module, _, cumulative, _ in times if module in BASELINE_PACKAGES)
+    heavy = sorted({module.split('.')[0] for module, *_ in times} & set(HEAVY_PACKAGES))
+    slowest = sorted(top_level, key=lambda item: -item[1])[:5]
+    return total, baseline, heavy, slowest
+
+
+def test_startup():
+    """
+    Check a statistics-only run imports no heavy package within the budget, and that figures still import matplotlib.
+    """
+    import shutil
+    import tempfile
+
+    if not os.path.exists('nasa.csv'):
+        print("nasa.csv not found, skipping")
+        return
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        shutil.copy('nasa.csv', temp_dir)
+
+        # Test case 1: sections D-G import neither matplotlib nor scipy, and little besides numpy and pandas
+        total, baseline, heavy, slowest = startup_report(['nasa.csv', '--sections', 'D-G', '--format', 'json'],
+                                                         temp_dir)
+        print(f"Import time: {total:.3f}s, numpy and pandas {baseline:.3f}s, slowest: {slowest}")
+        assert heavy == [], f"Statistics-only run imported {heavy}"
+        assert baseline > 0, "numpy and pandas not found in the import times"
+        overhead = total - baseline
+        assert overhead <= STARTUP_OVERHEAD_RATIO * baseline, \
+            f"Imports besides numpy and pandas took {overhead:.3f}s, over {STARTUP_OVERHEAD_RATIO} x {baseline:.3f}s"
+        print("✓ Success!")
+
+        # Test case 2: drawing a figure imports matplotlib on demand
+        print("\nTesting figures...")
+        total, baseline, heavy, slowest = startup_report(['nasa.csv', '--sections', 'J', '--serial-plots'], temp_dir)
+        assert 'matplotlib' in heavy and 'scipy' not in heavy, heavy
+        assert os.path.exists(os.path.join(temp_dir, 'pie_hazard.png'))
+        print("✓ Success!")
+
+    finally:
+        # Clean up the temporary files
+        shutil.rmtree(temp_dir)
+
+
+# Report the startup of a command line, or run the test without arguments
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        total, baseline, heavy, slowest = startup_report(sys.argv[1:])
+        print(f"Import time: {total:.3f}s, numpy and pandas {baseline:.3f}s "
+              f"(budget {STARTUP_OVERHEAD_RATIO} x {baseline:.3f}s besides them)")
+        print(f"Heavy packages imported: {', '.join(heavy) or 'none'}")
+        for module, seconds in slowest:
+            print(f"  {module}: {seconds:.3f}s")
+    else:
+        test_startup()
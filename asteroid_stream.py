@@ -0,0 +1,197 @@
+"""
+NASA Asteroid Data Analysis - streaming execution
+
+Runs sections B-G over a CSV file in fixed-size chunks, so files larger than
+memory can be analysed. Each chunk is filtered like mask_data and folded into
+a SectionState from asteroid_summary.py, whose partial results can also be
+merged with other states. Section G spills its column to a temporary file
+and counts in a second pass.
+
+Usage: python asteroid_stream.py
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from asteroid_io import DEFAULT_CHUNKSIZE, date_window_column, date_window_mask, read_chunks, read_header
+from asteroid_summary import SectionState
+
+
+# Columns sections C-G read from the file, next to the date window column
+STREAM_COLUMNS = [
+    'Name',
+    'Absolute Magnitude',
+    'Est Dia in KM(max)',
+    'Miss Dist.(kilometers)',
+    'Orbit ID',
+]
+
+# Columns section C drops from its report
+DETAIL_DROP_COLUMNS = ['Orbiting Body', 'Equinox', 'Neo Reference ID']
+
+
+#########################
+## STREAMING RUNNER
+#########################
+def stream_sections(file, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None):
+    """
+    Compute the results of sections B-G while reading the file in chunks.
+
+    Only the columns in STREAM_COLUMNS and the date window column are parsed,
+    and peak memory is bounded by the chunk size, the distinct Orbit IDs and
+    one 'Est Dia in KM(max)' chunk. The results equal those of the in-memory
+    functions on mask_data(load_data(file)).
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+
+    Returns:
+    dict: Results keyed by section function name, plus 'rows_loaded' and 'rows'
+    """
+    if not os.path.exists(file):
+        raise FileNotFoundError(f"File does not exist: {file}")
+
+    # Check that the file has every column the sections need
+    header = read_header(file)
+    for col in STREAM_COLUMNS:
+        if col not in header:
+            raise ValueError(f"File must contain '{col}' column")
+    columns = STREAM_COLUMNS + [date_window_column(header)]
+
+    state = SectionState()
+    rows_loaded = 0
+
+    # Section G needs the mean before it can count, so spill its column
+    with tempfile.TemporaryFile() as spill:
+        spill_dtype = None
+        for chunk in read_chunks(file, chunksize, columns=columns):
+            rows_loaded += len(chunk)
+            chunk = chunk[date_window_mask(chunk, start, end)]
+            state.update(chunk)
+
+            diameters = chunk['Est Dia in KM(max)'].to_numpy()
+            spill_dtype = diameters.dtype
+            spill.write(np.ascontiguousarray(diameters).tobytes())
+
+        # Second pass over the spilled column
+        count_above_avg = 0
+        if state.diameter_count > 0:
+            avg_max_diameter = state.mean_max_diameter()
+            spill.seek(0)
+            block_bytes = chunksize * spill_dtype.itemsize
+            for block in iter(lambda: spill.read(block_bytes), b''):
+                values = np.frombuffer(block, dtype=spill_dtype)
+                count_above_avg += int(np.count_nonzero(values > avg_max_diameter))
+
+    kept = [col for col in header if col not in DETAIL_DROP_COLUMNS]
+    return {
+        'rows_loaded': rows_loaded,
+        'rows': state.rows,
+        'data_details': (state.rows, len(kept), kept),
+        'max_absolute_magnitude': state.max_absolute_magnitude(),
+        'closest_to_earth': state.closest_to_earth(),
+        'common_orbit': state.common_orbit(),
+        'min_max_diameter': count_above_avg,
+    }
+
+
+def test_stream_sections():
+    """
+    Compare the streaming results with the in-memory functions.
+    """
+    from nasa_asteroid_ds import (load_data, mask_data, data_details, max_absolute_magnitude,
+                                  closest_to_earth, common_orbit, min_max_diameter)
+
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        # Small file with ties, missing values and dates on both sides of 2000
+        file_path = os.path.join(temp_dir, "nasa_sample.csv")
+        with open(file_path, 'w') as f:
+            f.write("Neo Reference ID,Name,Absolute Magnitude,Est Dia in KM(max),Close Approach Date,"
+                    "Miss Dist.(kilometers),Orbiting Body,Orbit ID,Equinox\n"
+                    "1,1001,25.0,0.5,1995-01-01,100,Earth,7,J2000\n"
+                    "2,1002,22.5,1.2,2000-01-20,5000,Earth,8,J2000\n"
+                    "3,1003,22.5,0.8,2001-03-03,2500,Earth,8,J2000\n"
+                    "4,1004,19.8,,2005-07-04,2500,Earth,7,J2000\n"
+                    "5,1005,16.3,2.5,2010-11-30,4200,Earth,9,J2000\n"
+                    "6,1006,22.5,0.3,1999-12-31,10,Earth,9,J2000\n")
+
+        # Test case 1: every chunk size gives the in-memory results
+        df = mask_data(load_data(file_path, cache=False))
+        expected = {
+            'data_details': data_details(df),
+            'max_absolute_magnitude': max_absolute_magnitude(df),
+            'closest_to_earth': closest_to_earth(df),
+            'common_orbit': common_orbit(df),
+            'min_max_diameter': min_max_diameter(df),
+        }
+        print("Expected:", expected)
+        for chunksize in [1, 2, 4, 100]:
+            result = stream_sections(file_path, chunksize=chunksize)
+            # Orbit counts come as OrbitCounts; compare them in order as dictionaries
+            result['common_orbit'] = list(result['common_orbit'].to_dict().items())
+            for key, value in dict(expected, common_orbit=list(expected['common_orbit'].items())).items():
+                assert result[key] == value, f"chunksize={chunksize} {key}: {result[key]} != {value}"
+            assert result['rows_loaded'] == 6 and result['rows'] == 4
+        print("✓ Success! Streaming matches in-memory for chunk sizes 1, 2, 4, 100")
+
+        # Test case 2: merging states equals updating one state
+        print("\nTesting merge...")
+        first, second = SectionState().update(df.iloc[:2]), SectionState().update(df.iloc[2:])
+        merged = first.merge(second)
+        whole = SectionState().update(df)
+        assert merged.max_absolute_magnitude() == whole.max_absolute_magnitude()
+        assert merged.closest_to_earth() == whole.closest_to_earth()
+        assert merged.common_orbit().to_dict() == whole.common_orbit().to_dict()
+        assert merged.mean_max_diameter() == whole.mean_max_diameter()
+        print("✓ Success!")
+
+        # Test case 3: a gzip archive streams like the plain file
+        print("\nTesting gzip archive...")
+        import gzip
+        with open(file_path, 'rb') as f, gzip.open(file_path + '.gz', 'wb') as archive:
+            archive.write(f.read())
+        result = stream_sections(file_path + '.gz', chunksize=2)
+        assert result['common_orbit'].to_dict() == expected['common_orbit']
+        assert result['min_max_diameter'] == expected['min_max_diameter']
+        print("✓ Success!")
+
+        # Test case 4: missing column
+        print("\nTesting missing column...")
+        bad_path = os.path.join(temp_dir, "bad.csv")
+        with open(bad_path, 'w') as f:
+            f.write("Name,Absolute Magnitude\n1001,25.0\n")
+        try:
+            stream_sections(bad_path)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+        # Test case 5: the bundled data set
+        if os.path.exists('nasa.csv'):
+            print("\nTesting nasa.csv...")
+            df = mask_data(load_data('nasa.csv', cache=False))
+            result = stream_sections('nasa.csv', chunksize=1000)
+            assert result['data_details'] == data_details(df)
+            assert result['max_absolute_magnitude'] == max_absolute_magnitude(df)
+            assert result['closest_to_earth'] == closest_to_earth(df)
+            assert list(result['common_orbit'].to_dict().items()) == list(common_orbit(df).items())
+            assert result['min_max_diameter'] == min_max_diameter(df)
+            print("✓ Success!")
+
+    finally:
+        # Clean up the temporary files
+        import shutil
+        shutil.rmtree(temp_dir)
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_stream_sections()
@@ -0,0 +1,474 @@
+"""
+NASA Asteroid Data Analysis - fused summary of sections D-G
+
+Computes the maximum absolute magnitude (D), the closest approach (E), the
+Orbit ID counts (F) and the above-average diameter count (G) in one pass over
+the columns they need. The section functions in nasa_asteroid_ds.py read their
+result from this summary, and the streaming and incremental paths merge the
+same SectionState. Orbit IDs are counted with np.bincount into OrbitCounts,
+whose arrays add up across chunks.
+
+Usage: python asteroid_summary.py
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+
+# Columns each section reads
+SECTION_COLUMNS = {
+    'D': ['Absolute Magnitude', 'Name'],
+    'E': ['Miss Dist.(kilometers)', 'Name'],
+    'F': ['Orbit ID'],
+    'G': ['Est Dia in KM(max)'],
+}
+
+# Results of summarize(); sections that were not requested are None
+Summary = namedtuple('Summary', [
+    'rows',
+    'max_absolute_magnitude',   # D: (name, value), None without values
+    'closest_to_earth',         # E: name, None without values
+    'closest_distance',         # E: miss distance in km of that asteroid
+    'common_orbit',             # F: OrbitCounts
+    'mean_max_diameter',        # G: average 'Est Dia in KM(max)'
+    'min_max_diameter',         # G: count above that average
+])
+
+
+def _first_extreme(values, largest):
+    """
+    Position of the first maximum or minimum, skipping NaN.
+
+    Returns None if there is no value that is not NaN.
+    """
+    position = int(values.argmax() if largest else values.argmin())
+    if values.dtype.kind != 'f' or not np.isnan(values[position]):
+        return position
+
+    # argmax/argmin stop at the first NaN, so search again without them
+    try:
+        return int(np.nanargmax(values) if largest else np.nanargmin(values))
+    except ValueError:
+        return None
+
+
+def _float_sum(values):
+    """
+    float64 sum and count of the values that are not NaN.
+    """
+    total = float(np.sum(values, dtype=np.float64))
+    if not np.isnan(total):
+        return total, len(values)
+    valid = ~np.isnan(values)
+    return float(np.sum(values[valid], dtype=np.float64)), int(np.count_nonzero(valid))
+
+
+#########################
+## ORBIT COUNTS
+#########################
+# Orbit IDs shown when the counts are printed
+PRINT_ORBITS = 20
+
+# Integer IDs below this are counted with np.bincount on the values themselves
+DENSE_ID_LIMIT = 1 << 20
+
+
+def _first_positions(values, counts, ids):
+    """
+    Position of the first occurrence of each of ids in values.
+
+    Blocks of doubling size are scanned from the start only until every
+    counted ID has been seen, which is early in the data for common IDs.
+    """
+    first = np.full(len(counts), -1, dtype=np.int64)
+    missing = len(ids)
+    start, block = 0, 4096
+    while missing:
+        seen, positions = np.unique(values[start:start + block], return_index=True)
+        new = first[seen] < 0
+        first[seen[new]] = positions[new] + start
+        missing -= int(np.count_nonzero(new))
+        start, block = start + block, block * 2
+    return first[ids]
+
+
+class OrbitCounts:
+    """
+    Number of rows per Orbit ID, as three aligned arrays.
+
+    ids holds the distinct IDs in increasing order, counts the rows of each
+    and first the position of the first row of each. Ranking by count breaks
+    ties by first row, the order DataFrame.value_counts gives. Only
+    distinct IDs cost memory and time after counting; no Python object is
+    made per ID until to_dict() asks for one.
+    """
+
+    def __init__(self, ids=None, counts=None, first=None):
+        self.ids = np.empty(0, dtype=np.int64) if ids is None else np.asarray(ids)
+        self.counts = np.zeros(len(self.ids), dtype=np.int64) if counts is None else np.asarray(counts, np.int64)
+        self.first = np.zeros(len(self.ids), dtype=np.int64) if first is None else np.asarray(first, np.int64)
+
+    @classmethod
+    def from_values(cls, values, offset=0):
+        """
+        Count the IDs of one chunk.
+
+        Non-negative integer IDs, such as the int16 'Orbit ID' of the
+        schema, are their own dictionary codes and are counted with
+        np.bincount. Other IDs are encoded with np.unique first. NaN is not
+        counted.
+
+        Parameters:
+        values (numpy.ndarray): Orbit ID of each row
+        offset (int): Position of the chunk's first row in the data
+
+        Returns:
+        OrbitCounts: Counts of the chunk
+        """
+        values = np.asarray(values)
+        if len(values) == 0:
+            return cls()
+
+        if values.dtype.kind in 'iu' and values.min() >= 0 and values.max() < DENSE_ID_LIMIT:
+            counts = np.bincount(values)
+            ids = np.flatnonzero(counts)
+            return cls(ids.astype(values.dtype), counts[ids], _first_positions(values, counts, ids) + offset)
+
+        positions = np.arange(len(values))
+        if values.dtype.kind == 'f':
+            positions = np.flatnonzero(~np.isnan(values))
+            values = values[positions]
+        ids, first, counts = np.unique(values, return_index=True, return_counts=True)
+        return cls(ids, counts, positions[first] + offset)
+
+    def merge(self, other):
+        """
+        Add the counts of other rows.
+
+        Parameters:
+        other (OrbitCounts): Counts of other rows, with positions in the same data
+
+        Returns:
+        OrbitCounts: self
+        """
+        if len(other.ids) == 0:
+            return self
+        if len(self.ids) == 0:
+            self.ids, self.counts, self.first = other.ids.copy(), other.counts.copy(), other.first.copy()
+            return self
+        if np.array_equal(self.ids, other.ids):
+            self.counts = self.counts + other.counts
+            self.first = np.minimum(self.first, other.first)
+            return self
+
+        ids = np.union1d(self.ids, other.ids)
+        counts = np.zeros(len(ids), dtype=np.int64)
+        first = np.full(len(ids), np.iinfo(np.int64).max)
+        for part in (self, other):
+            slots = np.searchsorted(ids, part.ids)
+            counts[slots] += part.counts
+            first[slots] = np.minimum(first[slots], part.first)
+        self.ids, self.counts, self.first = ids, counts, first
+        return self
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __eq__(self, other):
+        # Equal when they rank the same IDs with the same counts
+        if not isinstance(other, OrbitCounts):
+            return NotImplemented
+        ids, counts = self.ranked()
+        other_ids, other_counts = other.ranked()
+        return np.array_equal(ids, other_ids) and np.array_equal(counts, other_counts)
+
+    __hash__ = None
+
+    def ranked(self, top_k=None, min_count=None):
+        """
+        IDs and counts, largest count first.
+
+        Parameters:
+        top_k (int): Keep only this many IDs, or None for all of them
+        min_count (int): Keep only IDs with at least this many rows, or None
+
+        Returns:
+        tuple: (ids, counts) numpy arrays
+        """
+        if top_k is not None and top_k < 0:
+            raise ValueError(f"top_k must not be negative, got: {top_k}")
+        ids, counts, first = self.ids, self.counts, self.first
+        if min_count is not None:
+            keep = counts >= min_count
+            ids, counts, first = ids[keep], counts[keep], first[keep]
+        order = np.lexsort((first, -counts))
+        if top_k is not None:
+            order = order[:top_k]
+        return ids[order], counts[order]
+
+    def to_dict(self, top_k=None, min_count=None):
+        """
+        {Orbit ID: count}, largest count first, as common_orbit returns it.
+
+        Parameters:
+        top_k (int): Keep only this many IDs, or None for all of them
+        min_count (int): Keep only IDs with at least this many rows, or None
+
+        Returns:
+        dict: Orbit ID -> number of rows
+        """
+        ids, counts = self.ranked(top_k, min_count)
+        return dict(zip(ids.tolist(), counts.tolist()))
+
+    def __str__(self):
+        shown = self.to_dict(top_k=PRINT_ORBITS)
+        if len(self) <= PRINT_ORBITS:
+            return str(shown)
+        return f"{str(shown)[:-1]}, ...}} (top {PRINT_ORBITS} of {len(self)} orbit IDs)"
+
+    def __repr__(self):
+        return f"OrbitCounts({self})"
+
+
+#########################
+## PARTIAL STATE
+#########################
+class SectionState:
+    """
+    Mergeable partial results of sections D-G.
+
+    Ties keep the earliest row, like idxmax/idxmin, as long as states are
+    updated and merged in file order.
+    """
+
+    def __init__(self, sections='DEFG'):
+        self.sections = sections
+        self.rows = 0
+        # Section D: (value, name) of the maximum absolute magnitude
+        self.max_magnitude = None
+        # Section E: (value, name) of the minimum miss distance
+        self.min_miss_distance = None
+        # Section F: number of rows per Orbit ID
+        self.orbit_counts = OrbitCounts()
+        # Section G: float64 sum and count of the maximum diameter
+        self.diameter_sum = 0.0
+        self.diameter_count = 0
+
+    def update(self, df):
+        """
+        Fold the rows of a filtered DataFrame into the state.
+
+        Every column is read once, by position, without index lookups.
+
+        Parameters:
+        df (pandas.DataFrame): Rows that passed the date filter
+
+        Returns:
+        SectionState: self
+        """
+        self.rows += len(df)
+        if df.empty:
+            return self
+
+        if 'D' in self.sections:
+            values = df['Absolute Magnitude'].to_numpy()
+            position = _first_extreme(values, largest=True)
+            if position is not None:
+                candidate = (values[position], df['Name'].iloc[position])
+                if self.max_magnitude is None or candidate[0] > self.max_magnitude[0]:
+                    self.max_magnitude = candidate
+
+        if 'E' in self.sections:
+            values = df['Miss Dist.(kilometers)'].to_numpy()
+            position = _first_extreme(values, largest=False)
+            if position is not None:
+                candidate = (values[position], df['Name'].iloc[position])
+                if self.min_miss_distance is None or candidate[0] < self.min_miss_distance[0]:
+                    self.min_miss_distance = candidate
+
+        if 'F' in self.sections:
+            self.orbit_counts.merge(OrbitCounts.from_values(df['Orbit ID'].to_numpy(), offset=self.rows - len(df)))
+
+        if 'G' in self.sections:
+            total, count = _float_sum(df['Est Dia in KM(max)'].to_numpy())
+            self.diameter_sum += total
+            self.diameter_count += count
+        return self
+
+    def merge(self, other):
+        """
+        Merge the state of the rows that come after this state's rows.
+
+        Parameters:
+        other (SectionState): State of a later part of the data
+
+        Returns:
+        SectionState: self
+        """
+        # Positions of the other rows follow this state's rows
+        shifted = OrbitCounts(other.orbit_counts.ids, other.orbit_counts.counts, other.orbit_counts.first + self.rows)
+        self.rows += other.rows
+        if other.max_magnitude is not None:
+            if self.max_magnitude is None or other.max_magnitude[0] > self.max_magnitude[0]:
+                self.max_magnitude = other.max_magnitude
+        if other.min_miss_distance is not None:
+            if self.min_miss_distance is None or other.min_miss_distance[0] < self.min_miss_distance[0]:
+                self.min_miss_distance = other.min_miss_distance
+        self.orbit_counts.merge(shifted)
+        self.diameter_sum += other.diameter_sum
+        self.diameter_count += other.diameter_count
+        return self
+
+    def max_absolute_magnitude(self):
+        """Section D result: (name, value) of the maximum absolute magnitude."""
+        if self.max_magnitude is None:
+            raise ValueError("No rows with 'Absolute Magnitude'")
+        value, name = self.max_magnitude
+        return name, value
+
+    def closest_to_earth(self):
+        """Section E result: name of the asteroid with the smallest miss distance."""
+        if self.min_miss_distance is None:
+            raise ValueError("No rows with 'Miss Dist.(kilometers)'")
+        return self.min_miss_distance[1]
+
+    def common_orbit(self):
+        """Section F result: OrbitCounts of the rows."""
+        return self.orbit_counts
+
+    def mean_max_diameter(self):
+        """Average of 'Est Dia in KM(max)', or NaN if there are no values."""
+        if self.diameter_count == 0:
+            return float('nan')
+        return self.diameter_sum / self.diameter_count
+
+
+#########################
+## SUMMARY
+#########################
+def summarize(df, sections='DEFG'):
+    """
+    Compute the results of sections D-G in one pass over the needed columns.
+
+    Columns are validated once. Section G reads its column a second time to
+    count the values above the mean.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    sections (str): Letters of the sections to compute, any of 'DEFG'
+
+    Returns:
+    Summary: Results of the requested sections
+    """
+    # Check if required columns exist
+    for section in sections:
+        if section not in SECTION_COLUMNS:
+            raise ValueError(f"Unknown section '{section}', expected any of {''.join(SECTION_COLUMNS)}")
+        for col in SECTION_COLUMNS[section]:
+            if col not in df.columns:
+                raise ValueError(f"DataFrame must contain '{col}' column")
+
+    state = SectionState(sections).update(df)
+
+    max_magnitude = closest = distance = orbits = mean = count_above_avg = None
+    if 'D' in sections and state.max_magnitude is not None:
+        max_magnitude = state.max_absolute_magnitude()
+    if 'E' in sections and state.min_miss_distance is not None:
+        distance, closest = state.min_miss_distance
+    if 'F' in sections:
+        orbits = state.common_orbit()
+    if 'G' in sections:
+        mean = state.mean_max_diameter()
+        count_above_avg = 0
+        if state.diameter_count > 0:
+            count_above_avg = int(np.count_nonzero(df['Est Dia in KM(max)'].to_numpy() > mean))
+
+    return Summary(state.rows, max_magnitude, closest, distance, orbits, mean, count_above_avg)
+
+
+def test_summarize():
+    """
+    Test the fused summary against the pandas one-liners of each section.
+    """
+    # Ties, NaN and an unsorted index
+    df = pd.DataFrame({
+        'Name': [1001, 1002, 1003, 1004, 1005, 1006],
+        'Absolute Magnitude': np.array([15.7, np.nan, 22.5, 19.8, 22.5, 16.3], dtype=np.float32),
+        'Miss Dist.(kilometers)': [5000.0, 1000.0, 2500.0, 1000.0, np.nan, 4200.0],
+        'Orbit ID': np.array([101, 102, 101, 103, 102, 101], dtype=np.int16),
+        'Est Dia in KM(max)': np.array([0.5, 1.2, 0.8, 2.5, np.nan, 1.5], dtype=np.float32),
+    }, index=[10, 3, 7, 0, 8, 1])
+    print("Test DataFrame:")
+    print(df)
+
+    # Test case 1: every section matches pandas
+    summary = summarize(df)
+    print("\nSummary:", summary)
+    expected_max = df.loc[df['Absolute Magnitude'].idxmax()]
+    assert summary.max_absolute_magnitude == (expected_max['Name'], expected_max['Absolute Magnitude'])
+    assert summary.closest_to_earth == df.loc[df['Miss Dist.(kilometers)'].idxmin(), 'Name']
+    assert summary.closest_distance == 1000.0
+    assert summary.common_orbit.to_dict() == df['Orbit ID'].value_counts().to_dict()
+    assert list(summary.common_orbit.to_dict()) == list(df['Orbit ID'].value_counts().to_dict())
+    mean = df['Est Dia in KM(max)'].astype('float64').mean()
+    assert np.isclose(summary.mean_max_diameter, mean)
+    assert summary.min_max_diameter == int((df['Est Dia in KM(max)'] > mean).sum())
+    assert summary.rows == 6
+    print("✓ Success!")
+
+    # Test case 2: only the requested sections are computed and validated
+    print("\nTesting section selection...")
+    partial = summarize(df[['Orbit ID']], sections='F')
+    assert partial.common_orbit.to_dict() == summary.common_orbit.to_dict()
+    assert partial.max_absolute_magnitude is None and partial.min_max_diameter is None
+    print("✓ Success!")
+
+    # Test case 3: missing column and unknown section
+    print("\nTesting errors...")
+    for bad_df, sections in [(df[['Orbit ID']], 'D'), (df, 'X')]:
+        try:
+            summarize(bad_df, sections)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 4: empty DataFrame
+    print("\nTesting empty DataFrame...")
+    empty = summarize(df.iloc[:0])
+    assert empty.max_absolute_magnitude is None and empty.closest_to_earth is None
+    assert empty.common_orbit.to_dict() == {} and empty.min_max_diameter == 0
+    print("✓ Success!")
+
+    # Test case 5: merging states equals updating one state
+    print("\nTesting merge...")
+    merged = SectionState().update(df.iloc[:3]).merge(SectionState().update(df.iloc[3:]))
+    whole = SectionState().update(df)
+    assert merged.max_absolute_magnitude() == whole.max_absolute_magnitude()
+    assert merged.closest_to_earth() == whole.closest_to_earth()
+    assert list(merged.common_orbit().to_dict().items()) == list(whole.common_orbit().to_dict().items())
+    assert merged.mean_max_diameter() == whole.mean_max_diameter()
+    print("✓ Success!")
+
+    # Test case 6: orbit counts of chunks, top-k, minimum counts and non-integer IDs
+    print("\nTesting orbit counts...")
+    rng = np.random.default_rng(3)
+    ids = rng.integers(0, 400, 10_000).astype(np.int16)
+    expected = pd.Series(ids).value_counts()
+    counts = OrbitCounts()
+    for start in range(0, len(ids), 3000):
+        counts.merge(OrbitCounts.from_values(ids[start:start + 3000], offset=start))
+    assert list(counts.to_dict().items()) == list(expected.to_dict().items())
+    assert list(counts.to_dict(top_k=5).items()) == list(expected.head(5).to_dict().items())
+    assert counts.to_dict(min_count=30) == expected[expected >= 30].to_dict()
+    assert "of 400 orbit IDs" in str(counts) and len(counts.to_dict(top_k=0)) == 0
+    floats = np.array([2.5, np.nan, -1.0, 2.5])
+    assert OrbitCounts.from_values(floats).to_dict() == pd.Series(floats).value_counts().to_dict()
+    print(counts)
+    print("✓ Success!")
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_summarize()
@@ -0,0 +1,284 @@
+"""
+NASA Asteroid Data Analysis - synthetic data set generator
+
+Writes CSV files with the 40 columns of nasa.csv, in the same order and
+format, at any number of rows, so every section can be tried at sizes the real
+data set does not reach. Each row is a close approach of an asteroid drawn
+from a population of about 0.8 asteroids per row, so Neo Reference IDs repeat
+as in nasa.csv, with the same physical and orbital data every time they
+appear. Close approach dates span 1995 to 2016, on both sides of 2000.
+
+Distributions follow nasa.csv: diameters derive from the absolute magnitude
+with the 0.25/0.05 albedo bounds, the orbital period, mean motion and
+perihelion/aphelion distances from the semi major axis and eccentricity,
+'Hazardous' from the minimum orbit intersection and magnitude, and the speed
+falls with the magnitude as it does in the real data.
+
+The output depends only on the row count and the seed.
+
+Usage: python asteroid_synth.py
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import special
+
+from asteroid_io import NASA_SCHEMA
+
+
+# Rows generated and written at a time by default
+GENERATE_BLOCK = 100_000
+
+# Asteroids in the population per close approach row (3692 / 4687 in nasa.csv)
+ASTEROIDS_PER_ROW = 0.79
+
+# First Neo Reference ID of the population
+FIRST_ID = 2_000_000
+
+# Close approach dates, as in nasa.csv
+FIRST_DATE = np.datetime64('1995-01-01')
+LAST_DATE = np.datetime64('2016-09-08')
+
+# Unit conversions of the source
+KM_PER_AU = 149597870.7
+LUNAR_PER_AU = 388.998
+MILES_PER_KM = 0.621371
+FEET_PER_KM = 3280.84
+
+
+#########################
+## PER-ASTEROID VALUES
+#########################
+def _asteroid_uniforms(ids, attribute, seed):
+    """
+    Uniform (0, 1) numbers that depend only on the asteroid, attribute and seed.
+
+    A splitmix64 hash of the three, so an asteroid gets the same physical data
+    in every row it appears in without storing the population.
+    """
+    x = ids.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    x += np.uint64((seed * 1_000_003 + attribute) & 0xFFFFFFFFFFFFFFFF)
+    x ^= x >> np.uint64(30)
+    x *= np.uint64(0xBF58476D1CE4E5B9)
+    x ^= x >> np.uint64(27)
+    x *= np.uint64(0x94D049BB133111EB)
+    x ^= x >> np.uint64(31)
+    return ((x >> np.uint64(11)).astype(np.float64) + 0.5) * 2.0 ** -53
+
+
+def _asteroid_columns(ids, seed):
+    """
+    Physical and orbital columns of the asteroids of a block.
+
+    Parameters:
+    ids (numpy.ndarray): Neo Reference ID of each row
+    seed (int): Seed of the data set
+
+    Returns:
+    dict: Column name -> values
+    """
+    def uniform(attribute):
+        return _asteroid_uniforms(ids, attribute, seed)
+
+    def normal(attribute, mean, std, low, high):
+        return np.clip(mean + std * special.ndtri(uniform(attribute)), low, high)
+
+    magnitude = np.round(normal(0, 22.27, 2.89, 11.0, 33.0), 1)
+
+    # Estimated diameter from the magnitude for albedo 0.25 (min) and 0.05 (max)
+    scale = 10 ** (-magnitude / 5)
+    dia_min = 1329 / np.sqrt(0.25) * scale
+    dia_max = 1329 / np.sqrt(0.05) * scale
+
+    orbit_id = np.clip(np.round(np.exp(np.log(16) + 0.9 * special.ndtri(uniform(1)))), 1, 611).astype(np.int64)
+    uncertainty = np.minimum((uniform(2) * 10).astype(np.int64), 9)
+    determined = (np.datetime64('2017-04-06T08:00:00')
+                  + (uniform(3) * 3 * 3600).astype('timedelta64[s]')
+                  + np.where(uniform(4) < 0.18, (uniform(5) * 180).astype(np.int64), 0).astype('timedelta64[D]'))
+    min_orbit_intersection = np.minimum(-0.082 * np.log(uniform(6)), 0.4779)
+    tisserand = np.round(normal(7, 5.06, 1.24, 2.196, 9.025), 3)
+
+    # Most orbits were fitted at the same epoch, the rest at earlier half days
+    epoch = np.where(uniform(8) < 0.86, 2458000.5, np.floor(2450164 + uniform(9) * 7836) + 0.5)
+
+    eccentricity = special.betaincinv(2.4, 3.9, uniform(10))
+    axis = np.clip(np.exp(np.log(1.24) + 0.35 * special.ndtri(uniform(11))), 0.6159, 5.072)
+    period = 365.25 * axis ** 1.5
+    inclination = np.minimum(-13.4 * np.log(uniform(12)), 75.4)
+
+    return {
+        'Absolute Magnitude': magnitude,
+        'Est Dia in KM(min)': dia_min,
+        'Est Dia in KM(max)': dia_max,
+        'Est Dia in M(min)': dia_min * 1000,
+        'Est Dia in M(max)': dia_max * 1000,
+        'Est Dia in Miles(min)': dia_min * MILES_PER_KM,
+        'Est Dia in Miles(max)': dia_max * MILES_PER_KM,
+        'Est Dia in Feet(min)': dia_min * FEET_PER_KM,
+        'Est Dia in Feet(max)': dia_max * FEET_PER_KM,
+        'Orbit ID': orbit_id,
+        'Orbit Determination Date': np.datetime_as_string(determined, unit='s'),
+        'Orbit Uncertainity': uncertainty,
+        'Minimum Orbit Intersection': min_orbit_intersection,
+        'Jupiter Tisserand Invariant': tisserand,
+        'Epoch Osculation': epoch,
+        'Eccentricity': eccentricity,
+        'Semi Major Axis': axis,
+        'Inclination': inclination,
+        'Asc Node Longitude': uniform(13) * 360,
+        'Orbital Period': period,
+        'Perihelion Distance': axis * (1 - eccentricity),
+        'Perihelion Arg': uniform(14) * 360,
+        'Aphelion Dist': axis * (1 + eccentricity),
+        'Perihelion Time': epoch + (uniform(15) - 0.5) * period,
+        'Mean Anomaly': uniform(16) * 360,
+        'Mean Motion': 360 / period,
+        'Hazardous': (min_orbit_intersection <= 0.05) & (magnitude <= 22.0),
+    }
+
+
+#########################
+## BLOCKS
+#########################
+def generate_block(block, rows, population, seed=0):
+    """
+    Build one block of a synthetic data set.
+
+    Parameters:
+    block (int): Number of the block, from 0
+    rows (int): Number of rows in the block
+    population (int): Number of asteroids in the whole data set
+    seed (int): Seed of the data set
+
+    Returns:
+    pandas.DataFrame: Rows with the columns of nasa.csv
+    """
+    rng = np.random.default_rng([seed, block])
+    ids = FIRST_ID + rng.integers(0, population, rows)
+    columns = _asteroid_columns(ids, seed)
+
+    # Close approach: a day, its epoch at 07:00 or 08:00 UTC, speed and distance
+    days = (LAST_DATE - FIRST_DATE).astype(np.int64) + 1
+    dates = FIRST_DATE + rng.integers(0, days, rows).astype('timedelta64[D]')
+    months = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
+    hours = np.where((months >= 4) & (months <= 10), 7, 8)
+    epoch_ms = (dates.astype('datetime64[ms]').astype(np.int64) + hours * 3_600_000)
+    # Brighter (larger) asteroids are seen at higher speeds, as in nasa.csv
+    speed_scale = np.exp(-0.07 * (columns['Absolute Magnitude'] - 22.27))
+    velocity = np.clip(rng.gamma(3.67, 3.8, rows) * speed_scale, 0.3355, 44.63)
+    miss_au = rng.uniform(0.0001778, 0.4999, rows)
+    miss_km = np.round(miss_au * KM_PER_AU).astype(np.int64)
+
+    columns.update({
+        'Neo Reference ID': ids,
+        'Name': ids,
+        'Close Approach Date': np.datetime_as_string(dates, unit='D'),
+        'Epoch Date Close Approach': epoch_ms,
+        'Relative Velocity km per sec': velocity,
+        'Relative Velocity km per hr': velocity * 3600,
+        'Miles per hour': velocity * 3600 * MILES_PER_KM,
+        'Miss Dist.(Astronomical)': miss_au,
+        'Miss Dist.(lunar)': miss_au * LUNAR_PER_AU,
+        'Miss Dist.(kilometers)': miss_km,
+        'Miss Dist.(miles)': np.round(miss_km * MILES_PER_KM).astype(np.int64),
+        'Orbiting Body': np.full(rows, 'Earth'),
+        'Equinox': np.full(rows, 'J2000'),
+    })
+    return pd.DataFrame({col: columns[col] for col in NASA_SCHEMA})
+
+
+def generate(file, rows, seed=0, block_rows=GENERATE_BLOCK):
+    """
+    Write a synthetic data set with the columns and format of nasa.csv.
+
+    Rows are generated and written block_rows at a time, so memory does not
+    grow with the row count. Files of the same seed and block size are equal.
+
+    Parameters:
+    file (str): Path of the CSV file to write
+    rows (int): Number of close approach rows
+    seed (int): Seed of the data set
+    block_rows (int): Rows per block
+
+    Returns:
+    str: file
+    """
+    if rows < 1:
+        raise ValueError(f"rows must be a positive integer, got: {rows}")
+    population = max(1, int(rows * ASTEROIDS_PER_ROW))
+
+    with open(file, 'w', newline='') as f:
+        for block, start in enumerate(range(0, rows, block_rows)):
+            df = generate_block(block, min(block_rows, rows - start), population, seed)
+            df.to_csv(f, header=block == 0, index=False)
+    return file
+
+
+def test_generate():
+    """
+    Check that synthetic files load like nasa.csv and are reproducible.
+    """
+    import tempfile
+    from nasa_asteroid_ds import load_data, mask_data
+
+    temp_dir = tempfile.mkdtemp()
+
+    try:
+        # Test case 1: same header as nasa.csv and parsed by the schema
+        file_path = generate(os.path.join(temp_dir, "synthetic.csv"), 5000, seed=1)
+        df = load_data(file_path, cache=False)
+        print(df.head())
+        assert list(df.columns) == list(NASA_SCHEMA)
+        assert len(df) == 5000
+        assert df['Absolute Magnitude'].dtype == np.float64 and df['Orbit ID'].dtype == np.int16
+        print("✓ Success!")
+
+        # Test case 2: repeated asteroids carry the same data, dates span 2000
+        print("\nTesting asteroids...")
+        per_id = df.groupby('Neo Reference ID')
+        assert per_id.ngroups < len(df)
+        assert (per_id['Absolute Magnitude'].nunique() == 1).all()
+        assert (per_id['Orbit ID'].nunique() == 1).all()
+        assert 0 < len(mask_data(df)) < len(df)
+        assert ((df['Name'] == df['Neo Reference ID']).all())
+        assert np.allclose(df['Mean Motion'] * df['Orbital Period'], 360, rtol=1e-5)
+        hazardous = (df['Minimum Orbit Intersection'] <= 0.05) & (df['Absolute Magnitude'] <= 22.0)
+        assert 0 < df['Hazardous'].sum() < len(df) and (df['Hazardous'] == hazardous).all()
+        print("✓ Success!")
+
+        # Test case 3: the seed alone decides the content
+        print("\nTesting determinism...")
+        again = generate(os.path.join(temp_dir, "again.csv"), 5000, seed=1)
+        other = generate(os.path.join(temp_dir, "other.csv"), 5000, seed=2)
+        with open(file_path, 'rb') as a, open(again, 'rb') as b, open(other, 'rb') as c:
+            first = a.read()
+            assert first == b.read()
+            assert first != c.read()
+        print("✓ Success!")
+
+        # Test case 4: blocks continue the file
+        print("\nTesting blocks...")
+        rows = 2010
+        blocks = load_data(generate(os.path.join(temp_dir, "blocks.csv"), rows, block_rows=1000), cache=False)
+        assert len(blocks) == rows and blocks['Neo Reference ID'].max() < FIRST_ID + rows
+        assert (blocks.groupby('Neo Reference ID')['Orbit ID'].nunique() == 1).all()
+        print("✓ Success!")
+
+        # Test case 5: invalid row count
+        try:
+            generate(os.path.join(temp_dir, "empty.csv"), 0)
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    finally:
+        # Clean up the temporary files
+        import shutil
+        shutil.rmtree(temp_dir)
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_generate()
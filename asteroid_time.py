@@ -0,0 +1,250 @@
+"""
+NASA Asteroid Data Analysis - sorted time index
+
+index_by_time() puts the rows of a DataFrame in close approach order, once,
+and registers a TimeIndex of their approach times for that DataFrame. A
+[start, end) window is then two np.searchsorted calls on the sorted times, in
+O(log n), and the rows are a positional slice of the frame, which pandas
+returns without copying the data. mask_data() and load_data(date_window=...)
+use the index whenever the DataFrame has one, so repeated queries over
+different windows never rescan the table. Windows of an indexed frame are
+indexed too.
+
+nasa.csv is already in close approach order, so indexing it only checks that.
+
+Usage: python asteroid_time.py
+"""
+
+import weakref
+
+import numpy as np
+
+from asteroid_io import DATE_COLUMN, EPOCH_COLUMN, date_window_bounds
+
+
+# TimeIndex of each indexed DataFrame: id -> (weak reference, index)
+_INDEXES = {}
+
+
+def _approach_times(df):
+    """
+    Close approach time of each row in integer milliseconds, and the column it comes from.
+
+    'Epoch Date Close Approach' is used as is; a datetime64 'Close Approach
+    Date' is converted.
+    """
+    if EPOCH_COLUMN in df.columns and df[EPOCH_COLUMN].dtype.kind in 'iu':
+        return df[EPOCH_COLUMN].to_numpy(), EPOCH_COLUMN
+    if DATE_COLUMN in df.columns and df[DATE_COLUMN].dtype.kind == 'M':
+        return df[DATE_COLUMN].to_numpy().astype('datetime64[ms]').astype(np.int64), DATE_COLUMN
+    raise ValueError(f"DataFrame must contain an integer '{EPOCH_COLUMN}' or a datetime64 '{DATE_COLUMN}' column")
+
+
+def _buffer(df, column):
+    """Address and length of a column's data, to tell whether it is still the indexed one."""
+    values = df[column].to_numpy()
+    return values.__array_interface__['data'][0], len(values)
+
+
+#########################
+## INDEX
+#########################
+class TimeIndex:
+    """
+    Sorted close approach times of the rows of one DataFrame.
+
+    times[i] is the approach time of row i in milliseconds; rows are in
+    approach order, so times is sorted.
+    """
+
+    def __init__(self, times, column, buffer):
+        self.times = times
+        self.column = column
+        # Address and length of the indexed column when the index was built
+        self._buffer = buffer
+
+    def __len__(self):
+        return len(self.times)
+
+    def bounds(self, start=None, end=None):
+        """
+        Row positions of a [start, end) close approach window.
+
+        Parameters:
+        start: First date in the window (str, datetime or Timestamp), or None
+        end: First date after the window, or None
+
+        Returns:
+        tuple: (first, stop) positions; the window holds rows first to stop - 1
+        """
+        start, end = date_window_bounds(start, end)
+        first = 0 if start is None else int(np.searchsorted(self.times, start.value // 1_000_000, side='left'))
+        stop = len(self.times) if end is None else int(np.searchsorted(self.times, end.value // 1_000_000,
+                                                                       side='left'))
+        return first, stop
+
+    def count(self, start=None, end=None):
+        """
+        Number of rows in a [start, end) close approach window, without reading them.
+
+        Parameters:
+        start: First date in the window, or None
+        end: First date after the window, or None
+
+        Returns:
+        int: Number of rows
+        """
+        first, stop = self.bounds(start, end)
+        return stop - first
+
+    def window(self, df, start=None, end=None):
+        """
+        Rows of df in a [start, end) close approach window, as a slice that shares df's data.
+
+        The slice gets its own TimeIndex, a view of this one's times.
+
+        Parameters:
+        df (pandas.DataFrame): The indexed DataFrame
+        start: First date in the window, or None
+        end: First date after the window, or None
+
+        Returns:
+        pandas.DataFrame: Rows in the window, in approach order
+        """
+        first, stop = self.bounds(start, end)
+        rows = df.iloc[first:stop]
+        _register(rows, TimeIndex(self.times[first:stop], self.column, _buffer(rows, self.column)))
+        return rows
+
+
+def _register(df, index):
+    """Remember the index of df for as long as df lives."""
+    key = id(df)
+    _INDEXES[key] = (weakref.ref(df), index)
+    weakref.finalize(df, _INDEXES.pop, key, None)
+
+
+def index_by_time(df):
+    """
+    Sort the rows of df by close approach time and index them.
+
+    Rows with the same time keep their order. A DataFrame that is already in
+    approach order is indexed as it is, without a copy.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame with an integer 'Epoch Date Close Approach'
+        or a datetime64 'Close Approach Date' column
+
+    Returns:
+    pandas.DataFrame: df, or its rows in approach order, with a TimeIndex
+    """
+    times, column = _approach_times(df)
+    if len(times) > 1 and (np.diff(times) < 0).any():
+        df = df.iloc[np.argsort(times, kind='stable')]
+        times, column = _approach_times(df)
+    _register(df, TimeIndex(times, column, _buffer(df, column)))
+    return df
+
+
+def time_index_of(df):
+    """
+    The TimeIndex of a DataFrame, if it has a valid one.
+
+    An index is valid while df is the indexed object and its time column is
+    still the indexed array; a DataFrame whose rows or times were replaced
+    since has none.
+
+    Parameters:
+    df (pandas.DataFrame): Any DataFrame
+
+    Returns:
+    TimeIndex: The index, or None
+    """
+    entry = _INDEXES.get(id(df))
+    if entry is None or entry[0]() is not df:
+        return None
+    index = entry[1]
+    if index.column not in df.columns or _buffer(df, index.column) != index._buffer:
+        return None
+    return index
+
+
+def test_time_index():
+    """
+    Compare indexed windows with the date mask and check that they share memory.
+    """
+    import os
+    import time
+    import pandas as pd
+    from asteroid_io import date_window_mask
+
+    rng = np.random.default_rng(7)
+    days = rng.integers(0, 8000, 5000)
+    dates = pd.Timestamp('1995-01-01') + pd.to_timedelta(days, 'D')
+    df = pd.DataFrame({
+        'Name': np.arange(len(days)),
+        'Close Approach Date': dates,
+        'Epoch Date Close Approach': dates.as_unit('ms').asi8 + rng.integers(0, 86_400_000, len(days)),
+    })
+
+    # Test case 1: every window holds the rows of the mask, in approach order
+    indexed = index_by_time(df)
+    index = time_index_of(indexed)
+    assert index is not None and time_index_of(df) is None
+    for start, end in [('2000-01-01', None), (None, '1996-03-01'), ('2003-05-17', '2003-05-18'),
+                       ('2010-01-01', '2005-01-01'), ('2030-01-01', None)]:
+        try:
+            window = index.window(indexed, start, end)
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+            continue
+        expected = df[date_window_mask(df, start, end)]
+        assert sorted(window['Name']) == sorted(expected['Name']), (start, end)
+        assert index.count(start, end) == len(expected)
+        assert (np.diff(window['Epoch Date Close Approach'].to_numpy()) >= 0).all()
+    print("✓ Success!")
+
+    # Test case 2: windows share the data and are indexed themselves
+    print("\nTesting slices...")
+    window = index.window(indexed, '2000-01-01')
+    assert np.shares_memory(window['Epoch Date Close Approach'].to_numpy(),
+                            indexed['Epoch Date Close Approach'].to_numpy())
+    inner = time_index_of(window).window(window, '2001-01-01', '2002-01-01')
+    assert len(inner) == index.count('2001-01-01', '2002-01-01')
+    print("✓ Success!")
+
+    # Test case 3: a frame whose rows changed loses its index; datetime64 dates index too
+    print("\nTesting validity...")
+    changed = indexed.copy()
+    assert time_index_of(changed) is None
+    by_date = index_by_time(df[['Name', 'Close Approach Date']])
+    assert time_index_of(by_date).count('2000-01-01') == int((df['Close Approach Date'] >= '2000-01-01').sum())
+    try:
+        index_by_time(df[['Name']])
+        print("✗ Failed: Should have raised ValueError")
+    except ValueError as e:
+        print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 4: repeated windows against repeated masks on the bundled data set
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data, mask_data
+        nasa = load_data('nasa.csv', cache=False)
+        indexed = load_data('nasa.csv', cache=False, time_index=True)
+        assert indexed.equals(nasa)
+        years = [(f"{year}-01-01", f"{year + 1}-01-01") for year in range(1995, 2017)]
+        begin = time.perf_counter()
+        masked = [len(mask_data(nasa, start, end)) for start, end in years]
+        mask_seconds = time.perf_counter() - begin
+        begin = time.perf_counter()
+        windows = [len(mask_data(indexed, start, end)) for start, end in years]
+        index_seconds = time.perf_counter() - begin
+        assert masked == windows
+        assert mask_data(indexed).equals(mask_data(nasa))
+        print(f"{len(years)} yearly windows: mask {mask_seconds * 1000:.1f} ms, index {index_seconds * 1000:.1f} ms")
+        print("✓ Success!")
+
+
+# Run the test if this script is executed directly
+if __name__ == "__main__":
+    test_time_index()
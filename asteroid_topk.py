@@ -0,0 +1,473 @@
+"""
+NASA Asteroid Data Analysis - top-k selection for sections D and E
+
+Finds the k largest absolute magnitudes (D) or the k closest approaches (E),
+overall or per group, without sorting the whole column. top_k_positions()
+selects the winners in O(n) with np.partition and sorts only those k. Ties
+keep the earliest row, as DataFrame.nsmallest/nlargest do with keep='first',
+and NaN never wins. TopK keeps a bounded heap of the best rows seen so far,
+so stream_top_k() gives the same rows from a file read in chunks.
+
+Usage: python asteroid_topk.py
+"""
+
+import heapq
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from asteroid_io import DATE_COLUMN, DEFAULT_CHUNKSIZE, EPOCH_COLUMN, read_chunks, read_header
+
+
+# Column ranked by each section and whether the largest values win
+TOP_K_COLUMNS = {
+    'D': ('Absolute Magnitude', True),
+    'E': ('Miss Dist.(kilometers)', False),
+}
+
+# Group key computed from the close approach date instead of read from a column
+YEAR = 'year'
+
+
+#########################
+## SELECTION
+#########################
+def _ranking_values(values, largest):
+    """
+    Values whose smallest entries are the winners, with NaN in float columns.
+
+    Integers are inverted bitwise (~x = -x - 1), which reverses their order
+    without overflow.
+    """
+    values = np.asarray(values)
+    if not largest:
+        return values
+    if values.dtype.kind == 'f':
+        return -values
+    if values.dtype.kind in 'iu':
+        return ~values
+    raise ValueError(f"Cannot rank values of dtype {values.dtype}")
+
+
+def top_k_positions(values, k, largest=False):
+    """
+    Positions of the k smallest (or largest) values, best first.
+
+    The k-th best value is found with np.partition in O(n). Every value
+    better than it wins, and the earliest values equal to it fill the
+    remaining places, so ties are broken like nsmallest(keep='first').
+
+    Parameters:
+    values (numpy.ndarray): Values to rank
+    k (int): Number of positions to return; fewer if there are fewer values
+    largest (bool): Rank the largest values first
+
+    Returns:
+    numpy.ndarray: int64 positions, sorted by value and then by position
+    """
+    if k < 1:
+        raise ValueError(f"k must be a positive integer, got: {k}")
+    ranking = _ranking_values(values, largest)
+    if ranking.dtype.kind == 'f':
+        valid = np.flatnonzero(~np.isnan(ranking))
+        if len(valid) < len(ranking):
+            return valid[top_k_positions(ranking[valid], k)]
+
+    if k >= len(ranking):
+        return np.lexsort((np.arange(len(ranking)), ranking))
+
+    kth = np.partition(ranking, k - 1)[k - 1]
+    better = np.flatnonzero(ranking < kth)
+    ties = np.flatnonzero(ranking == kth)[:k - len(better)]
+    winners = np.concatenate([better, ties])
+    return winners[np.lexsort((winners, ranking[winners]))]
+
+
+def group_top_k_positions(values, groups, k, largest=False):
+    """
+    Positions of the k smallest (or largest) values of each group.
+
+    One lexsort by group, value and position ranks every row within its
+    group, so the cost does not grow with the number of groups. Unlike the
+    ungrouped selection this sorts: it is O(n log n), not O(n), which is
+    still one vectorized pass however many groups there are.
+
+    Parameters:
+    values (numpy.ndarray): Values to rank
+    groups (numpy.ndarray): Group key of each value
+    k (int): Number of positions per group
+    largest (bool): Rank the largest values first
+
+    Returns:
+    numpy.ndarray: int64 positions, by group and then best first
+    """
+    if k < 1:
+        raise ValueError(f"k must be a positive integer, got: {k}")
+    ranking = _ranking_values(values, largest)
+    positions = np.arange(len(ranking))
+    if ranking.dtype.kind == 'f':
+        positions = np.flatnonzero(~np.isnan(ranking))
+    ranking, groups = ranking[positions], np.asarray(groups)[positions]
+
+    # Positions are increasing, so the last key breaks ties by position
+    order = np.lexsort((np.arange(len(positions)), ranking, groups))
+    sorted_groups = groups[order]
+    # Rank within the group: distance from the first row of the group
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    return positions[order[rank < k]]
+
+
+def approach_years(df):
+    """
+    Year of the close approach of each row.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame with 'Epoch Date Close Approach' or 'Close Approach Date'
+
+    Returns:
+    numpy.ndarray: int64 years
+    """
+    if EPOCH_COLUMN in df.columns:
+        dates = df[EPOCH_COLUMN].to_numpy().astype('datetime64[ms]')
+    elif DATE_COLUMN in df.columns:
+        dates = pd.to_datetime(df[DATE_COLUMN]).to_numpy()
+    else:
+        raise ValueError(f"DataFrame must contain '{DATE_COLUMN}' column")
+    return dates.astype('datetime64[Y]').astype(np.int64) + 1970
+
+
+def _group_keys(df, by):
+    """Group key of each row: the approach year, or the values of a column."""
+    if by == YEAR:
+        return approach_years(df)
+    if by not in df.columns:
+        raise ValueError(f"DataFrame must contain '{by}' column")
+    return df[by].to_numpy()
+
+
+def top_k_rows(df, section, k, by=None):
+    """
+    The k best rows of section D or E, overall or per group.
+
+    Parameters:
+    df (pandas.DataFrame): DataFrame containing asteroid data
+    section (str): 'D' for the largest absolute magnitudes, 'E' for the closest approaches
+    k (int): Number of rows, per group if by is given
+    by (str): 'year' for the close approach year, a column name, or None
+
+    Returns:
+    pandas.DataFrame: 'Name', the ranked column and the group key, best first
+        (by group first when grouped), with the index of df
+    """
+    if section not in TOP_K_COLUMNS:
+        raise ValueError(f"Unknown section '{section}', expected any of {''.join(TOP_K_COLUMNS)}")
+    column, largest = TOP_K_COLUMNS[section]
+    for col in [column, 'Name']:
+        if col not in df.columns:
+            raise ValueError(f"DataFrame must contain '{col}' column")
+
+    values = df[column].to_numpy()
+    if by is None:
+        positions = top_k_positions(values, k, largest)
+        return df[['Name', column]].iloc[positions]
+
+    keys = _group_keys(df, by)
+    # Rows without a group key belong to no group, as in DataFrame.groupby
+    known = np.flatnonzero(~pd.isna(keys))
+    positions = known[group_top_k_positions(values[known], keys[known], k, largest)]
+    rows = df[['Name', column]].iloc[positions]
+    if by not in rows.columns:
+        rows.insert(len(rows.columns), by, keys[positions])
+    return rows
+
+
+#########################
+## STREAMING
+#########################
+class TopK:
+    """
+    Bounded heap of the k best rows offered so far.
+
+    Rows are offered in order; a later row never displaces an equal earlier
+    one, so the result matches top_k_positions on all the rows at once.
+    """
+
+    def __init__(self, k, largest=False):
+        if k < 1:
+            raise ValueError(f"k must be a positive integer, got: {k}")
+        self.k = k
+        self.largest = largest
+        self.seen = 0
+        # Worst kept row on top: (-rank, -sequence, name, value)
+        self._heap = []
+
+    def update(self, values, names):
+        """
+        Offer the rows of a chunk.
+
+        Only the k best rows of the chunk, found with top_k_positions, reach
+        the heap.
+
+        Parameters:
+        values (numpy.ndarray): Ranked values of the rows
+        names (numpy.ndarray): Names of the rows
+
+        Returns:
+        TopK: self
+        """
+        values = np.asarray(values)
+        names = np.asarray(names)
+        if len(values):
+            ranking = _ranking_values(values, self.largest)
+            for position in top_k_positions(values, self.k, self.largest):
+                entry = (-ranking[position].item(), -(self.seen + int(position)), names[position].item(),
+                         values[position].item())
+                if len(self._heap) < self.k:
+                    heapq.heappush(self._heap, entry)
+                elif entry > self._heap[0]:
+                    heapq.heapreplace(self._heap, entry)
+                else:
+                    # Chunk winners come best first, so the rest cannot enter either
+                    break
+        self.seen += len(values)
+        return self
+
+    def result(self):
+        """
+        The kept rows, best first.
+
+        Returns:
+        list: (name, value) tuples
+        """
+        return [(name, value) for _, _, name, value in sorted(self._heap, reverse=True)]
+
+
+def stream_top_k(file, section, k, by=None, chunksize=DEFAULT_CHUNKSIZE, start='2000-01-01', end=None):
+    """
+    The k best rows of section D or E while reading the file in chunks.
+
+    With by, the winners of every group so far are kept as arrays, and each
+    chunk is added to them with one group_top_k_positions call.
+
+    Parameters:
+    file (str): Path to the CSV file or archive
+    section (str): 'D' for the largest absolute magnitudes, 'E' for the closest approaches
+    k (int): Number of rows, per group if by is given
+    by (str): 'year' for the close approach year, a column name, or None
+    chunksize (int): Number of rows per chunk
+    start: First close approach date kept by the filter (section B), or None
+    end: First close approach date after the filter window, or None
+
+    Returns:
+    list or dict: (name, value) tuples best first, or group key -> such a list
+    """
+    if section not in TOP_K_COLUMNS:
+        raise ValueError(f"Unknown section '{section}', expected any of {''.join(TOP_K_COLUMNS)}")
+    column, largest = TOP_K_COLUMNS[section]
+    if not os.path.exists(file):
+        raise FileNotFoundError(f"File does not exist: {file}")
+    header = read_header(file)
+    columns = [column, 'Name']
+    if by == YEAR:
+        columns.append(EPOCH_COLUMN if EPOCH_COLUMN in header else DATE_COLUMN)
+    elif by is not None and by not in columns:
+        columns.append(by)
+    for col in columns:
+        if col not in header:
+            raise ValueError(f"File must contain '{col}' column")
+
+    overall = TopK(k, largest)
+    # Winners so far of every group, in reading order: (keys, values, names)
+    kept = None
+    for chunk in read_chunks(file, chunksize, columns=columns, date_window=(start, end)):
+        values, names = chunk[column].to_numpy(), chunk['Name'].to_numpy()
+        if by is None:
+            overall.update(values, names)
+            continue
+        keys = _group_keys(chunk, by)
+        rows = ~pd.isna(keys)
+        keys, values, names = keys[rows], values[rows], names[rows]
+        if kept is not None:
+            keys, values, names = (np.concatenate([old, new]) for old, new in zip(kept, (keys, values, names)))
+        # One grouped selection per chunk; sorting the positions keeps reading
+        # order, so earlier rows still win ties in later chunks
+        positions = np.sort(group_top_k_positions(values, keys, k, largest))
+        kept = keys[positions], values[positions], names[positions]
+
+    if by is None:
+        return overall.result()
+    if kept is None:
+        return {}
+    keys, values, names = kept
+    groups = {}
+    for position in group_top_k_positions(values, keys, k, largest):
+        key = keys[position]
+        key = key.item() if isinstance(key, np.generic) else key
+        groups.setdefault(key, []).append((names[position].item(), values[position].item()))
+    return {key: groups[key] for key in sorted(groups)}
+
+
+#########################
+## BENCHMARK
+#########################
+def compare_top_k(rows=1_000_000, k=10, seed=0):
+    """
+    Time top_k_positions against DataFrame.nsmallest and sort_values on random distances.
+
+    Parameters:
+    rows (int): Number of values
+    k (int): Number of values selected
+    seed (int): Seed of the values
+
+    Returns:
+    dict: Method -> best time of 3 runs in seconds
+    """
+    df = pd.DataFrame({'Miss Dist.(kilometers)': np.random.default_rng(seed).uniform(0, 7.5e7, rows)})
+    column = df['Miss Dist.(kilometers)']
+    methods = {
+        'top_k_positions': lambda: top_k_positions(column.to_numpy(), k),
+        'nsmallest': lambda: column.nsmallest(k),
+        'sort_values': lambda: column.sort_values(kind='stable').iloc[:k],
+    }
+    timings = {}
+    for name, method in methods.items():
+        best = np.inf
+        for _ in range(3):
+            begin = time.perf_counter()
+            method()
+            best = min(best, time.perf_counter() - begin)
+        timings[name] = best
+    return timings
+
+
+def test_top_k():
+    """
+    Compare top-k selection with nsmallest/nlargest, per group and streamed.
+    """
+    rng = np.random.default_rng(4)
+    # Few distinct values, so ties are everywhere
+    values = rng.integers(0, 50, 2000).astype(np.float64)
+    values[rng.choice(len(values), 100, replace=False)] = np.nan
+    # nsmallest/nlargest return NaN when k exceeds the other values; top-k does not
+    series = pd.Series(values).dropna()
+
+    # Test case 1: same rows and order as nsmallest/nlargest with keep='first'
+    for k in [1, 5, 37, 1900, 5000]:
+        assert list(top_k_positions(values, k)) == list(series.nsmallest(k).index)
+        assert list(top_k_positions(values, k, largest=True)) == list(series.nlargest(k).index)
+    ints = rng.integers(-2 ** 62, 2 ** 62, 500)
+    assert list(top_k_positions(ints, 9, largest=True)) == list(pd.Series(ints).nlargest(9).index)
+    print("✓ Success!")
+
+    # Test case 2: per group equals groupby + nsmallest
+    print("\nTesting groups...")
+    groups = rng.integers(0, 30, len(values))
+    positions = group_top_k_positions(values, groups, 3)
+    expected = pd.DataFrame({'g': groups, 'v': values}).groupby('g')['v'].nsmallest(3)
+    assert list(positions) == list(expected.index.get_level_values(1))
+    print("✓ Success!")
+
+    # Test case 3: rows of sections D and E, per year
+    print("\nTesting rows...")
+    df = pd.DataFrame({
+        'Name': np.arange(len(values)) + 1000,
+        'Absolute Magnitude': values.astype(np.float32),
+        'Miss Dist.(kilometers)': values[::-1].copy(),
+        'Close Approach Date': pd.to_datetime('1995-01-01') + pd.to_timedelta(rng.integers(0, 7000, len(values)), 'D'),
+    })
+    closest = top_k_rows(df, 'E', 4)
+    pd.testing.assert_frame_equal(closest, df.nsmallest(4, 'Miss Dist.(kilometers)')[['Name', 'Miss Dist.(kilometers)']])
+    per_year = top_k_rows(df, 'D', 2, by=YEAR)
+    print(per_year.head())
+    for year, rows in per_year.groupby(YEAR):
+        in_year = df[df['Close Approach Date'].dt.year == year]
+        assert list(rows.index) == list(in_year.nlargest(2, 'Absolute Magnitude').index)
+    print("✓ Success!")
+
+    # Test case 4: the bounded heap over chunks equals selection on all rows
+    print("\nTesting heap...")
+    heap = TopK(6, largest=True)
+    for part in np.array_split(np.arange(len(values)), 13):
+        heap.update(values[part], df['Name'].to_numpy()[part])
+    expected = series.nlargest(6)
+    assert heap.result() == [(int(df['Name'][i]), value) for i, value in expected.items()]
+    print("✓ Success!")
+
+    # Test case 5: invalid k and section
+    for call in [lambda: top_k_positions(values, 0), lambda: top_k_rows(df, 'F', 3)]:
+        try:
+            call()
+            print("✗ Failed: Should have raised ValueError")
+        except ValueError as e:
+            print(f"✓ Success! Correctly raised: {e}")
+
+    # Test case 6: the bundled data set, in memory and streamed
+    if os.path.exists('nasa.csv'):
+        print("\nTesting nasa.csv...")
+        from nasa_asteroid_ds import load_data, mask_data
+        nasa = mask_data(load_data('nasa.csv', cache=False))
+        closest = top_k_rows(nasa, 'E', 5)
+        assert list(closest.index) == list(nasa.nsmallest(5, 'Miss Dist.(kilometers)').index)
+        streamed = stream_top_k('nasa.csv', 'E', 5, chunksize=700)
+        assert streamed == list(zip(closest['Name'].tolist(), closest['Miss Dist.(kilometers)'].tolist()))
+        per_year = stream_top_k('nasa.csv', 'D', 3, by=YEAR, chunksize=700)
+        in_memory = top_k_rows(nasa, 'D', 3, by=YEAR)
+        assert sorted(per_year) == sorted(in_memory[YEAR].unique())
+        for year, rows in in_memory.groupby(YEAR):
+            assert per_year[year] == list(zip(rows['Name'].tolist(), rows['Absolute Magnitude'].tolist()))
+        # A string column as the group key
+        by_body = stream_top_k('nasa.csv', 'E', 2, by='Orbiting Body', chunksize=700)
+        bodies = nasa['Orbiting Body'].to_numpy()
+        positions = group_top_k_positions(nasa['Miss Dist.(kilometers)'].to_numpy(), bodies, 2)
+        expected = {}
+        for position in positions:
+            expected.setdefault(bodies[position], []).append(
+                (nasa['Name'].iloc[position].item(), nasa['Miss Dist.(kilometers)'].iloc[position].item()))
+        assert by_body == expected, (by_body, expected)
+        print(closest)
+        print("✓ Success!")
+
+    # Test case 7: streaming grouped by a string column equals the grouped selection in memory
+    print("\nTesting string groups...")
+    import shutil
+    import tempfile
+    from nasa_asteroid_ds import load_data
+    temp_dir = tempfile.mkdtemp()
+    try:
+        bodies = df.assign(**{'Orbiting Body': rng.choice(['Earth', 'Mars', 'Venus', 'Juptr'], len(df))})
+        bodies.loc[bodies.index[::97], 'Orbiting Body'] = None
+        file_path = os.path.join(temp_dir, 'bodies.csv')
+        bodies.to_csv(file_path, index=False, date_format='%Y-%m-%d')
+        streamed = stream_top_k(file_path, 'E', 3, by='Orbiting Body', chunksize=300, start=None)
+        keys = bodies['Orbiting Body'].to_numpy()
+        known = np.flatnonzero(~pd.isna(keys))
+        positions = known[group_top_k_positions(bodies['Miss Dist.(kilometers)'].to_numpy()[known], keys[known], 3)]
+        expected = {}
+        for position in positions:
+            expected.setdefault(keys[position], []).append(
+                (int(bodies['Name'].iloc[position]), float(bodies['Miss Dist.(kilometers)'].iloc[position])))
+        assert streamed == expected, (streamed, expected)
+        # Missing keys are dropped in memory as when streaming, for strings and floats
+        in_memory = top_k_rows(load_data(file_path, cache=False), 'E', 3, by='Orbiting Body')
+        assert in_memory['Orbiting Body'].notna().all()
+        assert {body: list(zip(rows['Name'].tolist(), rows['Miss Dist.(kilometers)'].tolist()))
+                for body, rows in in_memory.groupby('Orbiting Body', observed=True)} == streamed
+        groups = rng.choice([1.5, 2.5, np.nan], len(df))
+        per_group = top_k_rows(df.assign(Group=groups), 'E', 2, by='Group')
+        assert per_group['Group'].notna().all() and len(per_group) == 4
+        expected = df.assign(Group=groups).groupby('Group')['Miss Dist.(kilometers)'].nsmallest(2)
+        assert list(per_group.index) == list(expected.index.get_level_values(1))
+        print("✓ Success!")
+    finally:
+        shutil.rmtree(temp_dir)
+
+
+# Run the test and the comparison if this script is executed directly
+if __name__ == "__main__":
+    test_top_k()
+    print("\nTop 10 of 1,000,000 values:")
+    for method, seconds in compare_top_k().items():
+        print(f"{method}: {seconds * 1000:.1f} ms")
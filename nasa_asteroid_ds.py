@@ -14,28 +14,82 @@ Generates histogram, pie chart, and regression plots as PNG files.
 Usage: python nasa_asteroid_ds.py
 """
 
+import argparse
+import json
 import os
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')
-from scipy import stats
+
+from asteroid_histogram import stream_histograms
+from asteroid_index import ASTEROID_KEY, AsteroidIndex
+from asteroid_ingest import ingest
+from asteroid_instrument import INSTRUMENT_MODES, Instrument
+from asteroid_io import (DEFAULT_CHUNKSIZE, cache_writable, date_window_mask, is_supported_file, read_cache,
+                         read_column_store, read_csv, read_csv_kwargs, read_header, write_cache)
+from asteroid_regression import stream_regression
+from asteroid_result_cache import MISS, RESULT_CACHE_DIR, ResultCache
+from asteroid_render import PLOTS, draw_plot, linear_motion_magnitude_inputs, render_plot, render_plots
+from asteroid_shard import ShardedDataset, is_sharded
+from asteroid_stream import stream_sections
+from asteroid_summary import SECTION_COLUMNS, OrbitCounts, summarize
+from asteroid_time import index_by_time, time_index_of
+from asteroid_topk import top_k_rows
+
+
+# Sections main() can run, in order
+SECTIONS = 'ABCDEFGHIJK'
+
+# Figure drawn by each of sections H-K (keys of asteroid_render.PLOTS)
+PLOT_SECTIONS = {'H': 'hist_diameter', 'I': 'hist_common_orbit', 'J': 'pie_hazard', 'K': 'linear_motion_magnitude'}
+
+# Sections C-G of the streaming run: (section, title, label, key of the stream_sections result)
+STREAMED_SECTIONS = [
+    ('C', 'Data Details', 'Data details', 'data_details'),
+    ('D', 'Maximum Absolute Magnitude', 'Asteroid with maximum absolute magnitude', 'max_absolute_magnitude'),
+    ('E', 'Closest to Earth', 'Asteroid closest to Earth', 'closest_to_earth'),
+    ('F', 'Common Orbit', 'Common orbits', 'common_orbit'),
+    ('G', 'Min-Max Diameter', 'Count of asteroids with above-average maximum diameter', 'min_max_diameter'),
+]
+
+# Output formats of main()
+OUTPUT_FORMATS = ('text', 'json')
 
 
 #########################
 ## SECTION A
 #########################
-def load_data(file):
+def load_data(file, columns=None, cache=True, date_window=None, time_index=False):
     """
     Load CSV data file into a pandas DataFrame.
 
+    The file may also be a .zip, .gz, .bz2, .xz or .zst archive of the CSV,
+    which is decompressed while it is parsed, or a directory written by
+    asteroid_io.write_column_store, which is memory-mapped. Columns of the
+    NASA file are parsed with the dtypes declared in asteroid_io.NASA_SCHEMA
+    (categorical, float32, bool and datetime64). The parsed file is kept in a
+    columnar cache next to the CSV, which later loads read instead of parsing
+    the text again until the CSV changes. Where the cache cannot be written,
+    only the requested columns are parsed.
+
     Parameters:
-    file (str): Path to the CSV file
+    file (str): Path to the CSV file, archive or column store
+    columns (list): Columns to load, or None to load all of them
+    cache (bool): Read and write the columnar cache
+    date_window (tuple): (start, end) close approach window as in mask_data;
+        rows outside it are dropped while loading
+    time_index (bool): Put the rows in close approach order and index their
+        times (asteroid_time.py), so mask_data answers any window by slicing
 
     Returns:
     pandas.DataFrame: DataFrame containing the loaded data
     """
+    # Index the whole file once and cut the window from the index
+    if time_index:
+        df = index_by_time(load_data(file, columns, cache))
+        if date_window is not None:
+            df = mask_data(df, *date_window)
+        return df
+
     # if file parameter is None
     if file is None:
         raise ValueError("file parameter os None")
@@ -48,19 +102,45 @@ def load_data(file):
     if not os.path.exists(file):
         raise FileNotFoundError(f"File does not exist: {file}")
 
-    # if file not of csv
-    if not file.lower().endswith('.csv'):
-        raise ValueError(f"File must have .csv extension, got: {file}")
+    # if file is a column store, map it instead of parsing
+    if os.path.isdir(file):
+        return read_column_store(file, columns, date_window)
 
-    # If all checks pass, load the CSV
+    # if file not of csv or a compressed csv
+    if not is_supported_file(file):
+        raise ValueError(f"File must have .csv, .zip, .gz, .bz2, .xz or .zst extension, got: {file}")
+
+    # If all checks pass, load the CSV with the declared schema
     try:
-        df = pd.read_csv(file, sep=',')
+        # Without the cache, parse only the requested columns
+        if not cache:
+            df = read_csv(file, columns, date_window)
+            return df
+
+        # Use the columnar cache while it matches the source
+        df = read_cache(file, columns, date_window)
+        if df is not None:
+            return df
+
+        # A cache that cannot be written would not repay parsing every column
+        if not cache_writable(file):
+            return read_csv(file, columns, date_window)
+
+        # Parse every column once so the cache serves any later selection
+        df = read_csv(file)
+        write_cache(file, df)
+        if date_window is not None:
+            df = df[date_window_mask(df, *date_window)]
+        if columns is not None:
+            df = df[read_csv_kwargs(list(df.columns), columns)['usecols']]
         return df
     # except and cast to clearer messages
     except pd.errors.EmptyDataError:
         raise ValueError("The file is empty")
     except pd.errors.ParserError:
         raise ValueError("Unable to parse CSV file. Check file format.")
+    except ValueError:
+        raise
     except Exception as e:
         raise Exception(f"Error reading CSV file: {str(e)}")
 
@@ -68,25 +148,35 @@ def load_data(file):
 #########################
 ## SECTION B
 #########################
-def mask_data(df):
+def mask_data(df, start='2000-01-01', end=None):
     """
-    Filter DataFrame to include only asteroids with close approach dates from year 2000 onwards.
+    Filter DataFrame to include only asteroids with close approach dates in [start, end).
+
+    By default this keeps close approaches from year 2000 onwards. The window is
+    tested on the integer 'Epoch Date Close Approach' column when present, else
+    on 'Close Approach Date' as datetime64 or 'YYYY-MM-DD' strings. A
+    DataFrame loaded with time_index=True is not scanned: the window is found
+    by binary search and returned as a slice of its rows.
 
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    start: First close approach date to keep (str, datetime or Timestamp), or None
+    end: First close approach date after the window, or None
 
     Returns:
     pandas.DataFrame: Filtered DataFrame
     """
-    # Check if the required column exists
-    if 'Close Approach Date' not in df.columns:
+    # Check if a close approach column exists
+    if 'Close Approach Date' not in df.columns and 'Epoch Date Close Approach' not in df.columns:
         raise ValueError("DataFrame must contain 'Close Approach Date' column")
 
-    # Make a copy of the dataframe
-    filtered_df = df.copy()
+    # With a time index the window is a slice found by binary search
+    index = time_index_of(df)
+    if index is not None:
+        return index.window(df, start, end)
 
-    # Filter for dates from year 2000 onwards
-    filtered_df = filtered_df[filtered_df['Close Approach Date'].str.split('-').str[0].astype(int) >= 2000]
+    # Select the rows inside the date window; this allocates the kept rows once
+    filtered_df = df[date_window_mask(df, start, end)]
 
     return filtered_df
 
@@ -104,25 +194,12 @@ def data_details(df):
     Returns:
     tuple: (number of rows, number of columns, list of column titles)
     """
-    # Make a copy of the dataframe
-    df_copy = df.copy()
-
-    # Drop specified columns
-    columns_to_drop = []
-    if "Orbiting Body" in df_copy.columns:
-        columns_to_drop.append('Orbiting Body')
+    # Drop specified columns from the column list only; the data is not touched
+    columns_to_drop = ['Orbiting Body', 'Equinox', 'Neo Reference ID']
+    column_titles = [col for col in df.columns if col not in columns_to_drop]
 
-    if "Equinox" in df_copy.columns:
-        columns_to_drop.append('Equinox')
-
-    if "Neo Reference ID" in df_copy.columns:
-        columns_to_drop.append('Neo Reference ID')
-
-    if columns_to_drop:
-        df_copy = df_copy.drop(columns=columns_to_drop)
-
-    num_rows, num_cols = df_copy.shape
-    column_titles = list(df_copy.columns)
+    num_rows = len(df)
+    num_cols = len(column_titles)
 
     data = (num_rows, num_cols, column_titles)
     return data
@@ -131,85 +208,83 @@ def data_details(df):
 #########################
 ## SECTION D
 #########################
-def max_absolute_magnitude(df):
+def max_absolute_magnitude(df, k=None, by=None):
     """
     Find the asteroid with the maximum absolute magnitude.
 
+    With k or by, the k largest magnitudes are selected in O(n) instead
+    (asteroid_topk.py), overall or per group.
+
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    k (int): Number of asteroids to return, per group if by is given, or None for the maximum only
+    by (str): 'year' for the close approach year, a column such as 'Neo Reference ID', or None
 
     Returns:
-    tuple: (name, value) of the asteroid with the maximum absolute magnitude
+    tuple: (name, value) of the asteroid with the maximum absolute magnitude, or with k
+        or by a DataFrame of 'Name' and 'Absolute Magnitude', largest first
     """
-    # Check if required columns exist
-    required_columns = ['Absolute Magnitude', 'Name']
-    for col in required_columns:
-        if col not in df.columns:
-            raise ValueError(f"DataFrame must contain '{col}' column")
-
-    # get index of the maximum absolute magnitude
-    max_magnitude_index = df['Absolute Magnitude'].idxmax()
-
-    # Get the name of the asteroid with maximum absolute magnitude
-    max_magnitude_name = df.loc[max_magnitude_index, 'Name']
+    if k is not None or by is not None:
+        return top_k_rows(df, 'D', 1 if k is None else k, by)
 
-    # Get the val of the asteroid with maximum absolute magnitude
-    max_magnitude_val = df.loc[max_magnitude_index, 'Absolute Magnitude']
+    # One positional pass over 'Absolute Magnitude'; checks the columns too
+    max_magnitude = summarize(df, 'D').max_absolute_magnitude
+    if max_magnitude is None:
+        raise ValueError("DataFrame has no 'Absolute Magnitude' values")
 
     # Return the tuple of (name, val)
-    return max_magnitude_name, max_magnitude_val
+    return max_magnitude
 
 
 #########################
 ## SECTION E
 #########################
-def closest_to_earth(df):
+def closest_to_earth(df, k=None, by=None):
     """
     Find the asteroid closest to Earth based on miss distance in kilometers.
 
+    With k or by, the k closest approaches are selected in O(n) instead
+    (asteroid_topk.py), overall or per group.
+
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    k (int): Number of approaches to return, per group if by is given, or None for the closest only
+    by (str): 'year' for the close approach year, a column such as 'Neo Reference ID', or None
 
     Returns:
-    str: Name of the asteroid closest to Earth
+    str: Name of the asteroid closest to Earth, or with k or by a DataFrame of
+        'Name' and 'Miss Dist.(kilometers)', closest first
     """
-    # Validate required columns
-    required_columns = ['Miss Dist.(kilometers)', 'Name']
-    for col in required_columns:
-        if col not in df.columns:
-            raise ValueError(f"DataFrame must contain '{col}' column")
-
-    # get index of closest astroid to earth
-    closest_dist_index = df['Miss Dist.(kilometers)'].idxmin()
+    if k is not None or by is not None:
+        return top_k_rows(df, 'E', 1 if k is None else k, by)
 
-    # Get the name of the asteroid with closest_dist
-    closest_dist_name = df.loc[closest_dist_index, 'Name']
+    # One positional pass over 'Miss Dist.(kilometers)'; checks the columns too
+    closest_dist_name = summarize(df, 'E').closest_to_earth
+    if closest_dist_name is None:
+        raise ValueError("DataFrame has no 'Miss Dist.(kilometers)' values")
 
-    # return min of Miss Dist.(kilometers)
     return closest_dist_name
 
 
 #########################
 ## SECTION F
 #########################
-def common_orbit(df):
+def common_orbit(df, top_k=None, min_count=None):
     """
     Create a dictionary with orbit IDs as keys and count of asteroids in each orbit as values.
 
+    Orbit IDs are counted with np.bincount; only the kept IDs become dictionary entries.
+
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    top_k (int): Keep only the k most common orbits, or None for all of them
+    min_count (int): Keep only orbits with at least this many asteroids, or None
 
     Returns:
     dict: Dictionary where keys are Orbit IDs and values are counts of asteroids
     """
-    # Check if required column exists
-    if 'Orbit ID' not in df.columns:
-        raise ValueError("DataFrame must contain 'Orbit ID' column")
-
-    # Count asteroids by Orbit ID
-    orbit_counts = df['Orbit ID'].value_counts().to_dict()
-
-    return orbit_counts
+    # Count asteroids by Orbit ID, largest count first
+    return summarize(df, 'F').common_orbit.to_dict(top_k, min_count)
 
 
 #########################
@@ -225,17 +300,9 @@ def min_max_diameter(df):
     Returns:
     int: Count of asteroids with maximum diameter above average
     """
-    # Check if required column exists
-    if 'Est Dia in KM(max)' not in df.columns:
-        raise ValueError("DataFrame must contain 'Est Dia in KM(max)' column")
-
-    # Calculate the average maximum diameter
-    avg_max_diameter = df['Est Dia in KM(max)'].mean()
-
-    # Count asteroids with maximum diameter above average
-    count_above_avg = df[df['Est Dia in KM(max)'] > avg_max_diameter].shape[0]
-
-    return count_above_avg
+    # The average is accumulated in float64, as the streaming path does, so
+    # both give the same threshold; an empty DataFrame gives 0
+    return summarize(df, 'G').min_max_diameter
 
 
 #########################
@@ -251,33 +318,8 @@ def plt_hist_diameter(df):
     Returns:
     None: saves a histogram plot
     """
-    # Check if required columns exist
-    required_columns = ['Est Dia in KM(min)', 'Est Dia in KM(max)']
-    for col in required_columns:
-        if col not in df.columns:
-            raise ValueError(f"DataFrame must contain '{col}' column")
-
-    # Calculate average diameter for each asteroid
-    avg_diameter = (df['Est Dia in KM(min)'] + df['Est Dia in KM(max)']) / 2
-
-    # Create the histogram with 100 bins
-    plt.figure(figsize=(12, 6))
-    plt.hist(avg_diameter, bins=100, color='skyblue', edgecolor='black')
-
-    # Add title and labels
-    plt.title('Distribution of Asteroids by Average Diameter', fontsize=14)
-    plt.xlabel('Average Diameter (km)', fontsize=12)
-    plt.ylabel('Number of Asteroids', fontsize=12)
-
-    # Add grid for better readability
-    plt.grid(True, linestyle='--', alpha=0.7)
-
-    # Adjust layout
-    plt.tight_layout()
-
-    # Save the plot
-    plt.savefig("hist_diameter.png")
-    plt.close()
+    # Average of the min and max diameter in 100 bins, drawn on its own Figure
+    render_plot('hist_diameter', df)
     print("Plot saved as hist_diameter.png")
 
 
@@ -294,40 +336,8 @@ def plt_hist_common_orbit(df):
     Returns:
     None: saves a histogram plot
     """
-    # Check if required column exists
-    if 'Minimum Orbit Intersection' not in df.columns:
-        raise ValueError("DataFrame must contain 'Minimum Orbit Intersection' column")
-
-    # Get the orbit intersection values
-    orbit_intersections = df['Minimum Orbit Intersection'].dropna()
-
-    # Calculate min and max values for range
-    min_orbit = orbit_intersections.min()
-    max_orbit = orbit_intersections.max()
-
-    # Create 10 bins spanning from min to max
-    bins = np.linspace(min_orbit, max_orbit, 11)  # 11 edges make 10 bins
-
-    # Create the histogram
-    plt.figure(figsize=(12, 6))
-
-    # Plot histogram with 10 bins
-    n, bins, patches = plt.hist(orbit_intersections, bins=bins, color='skyblue', edgecolor='black')
-
-    # Add title and labels
-    plt.title('Distribution of Asteroids by Orbit Intersection', fontsize=14)
-    plt.xlabel('Minimum Orbit Intersection', fontsize=12)
-    plt.ylabel('Number of Asteroids', fontsize=12)
-
-    # Add grid for better readability
-    plt.grid(True, linestyle='--', alpha=0.7)
-
-    # Adjust layout
-    plt.tight_layout()
-
-    # Save the plot
-    plt.savefig("hist_common_orbit.png")
-    plt.close()
+    # 10 bins spanning from the min to the max orbit intersection
+    render_plot('hist_common_orbit', df)
     print("Plot saved as hist_common_orbit.png")
 
 
@@ -344,41 +354,7 @@ def plt_pie_hazard(df):
     Returns:
     None: saves a pie chart
     """
-    # Check if required column exists
-    if 'Hazardous' not in df.columns:
-        raise ValueError("DataFrame must contain 'Hazardous' column")
-
-    # Count hazardous and non-hazardous asteroids
-    hazardous_count = df['Hazardous'].sum()
-    non_hazardous_count = len(df) - hazardous_count
-
-    # Calculate percentages
-    total = hazardous_count + non_hazardous_count
-    hazardous_percent = (hazardous_count / total) * 100 if total > 0 else 0
-    non_hazardous_percent = (non_hazardous_count / total) * 100 if total > 0 else 0
-
-    # Prepare data for pie chart
-    labels = ['Hazardous', 'Non-Hazardous']
-    sizes = [hazardous_percent, non_hazardous_percent]
-    colors = ['#ff9999', '#66b3ff']
-    explode = (0.1, 0)  # explode the 1st slice (Hazardous)
-
-    # Create the pie chart
-    plt.figure(figsize=(10, 7))
-    plt.pie(sizes, explode=explode, labels=labels, colors=colors,
-            autopct='%1.1f%%', shadow=True, startangle=90)
-
-    # Equal aspect ratio ensures that pie is drawn as a circle
-    plt.axis('equal')
-
-    # Add title , legend, layout
-    plt.title('Percentage of Hazardous vs Non-Hazardous Asteroids', fontsize=14)
-    plt.legend(labels, loc="best")
-    plt.tight_layout()
-
-    # Save the plot
-    plt.savefig("pie_hazard.png")
-    plt.close()
+    render_plot('pie_hazard', df)
     print("Plot saved as pie_hazard.png")
 
 
@@ -394,163 +370,564 @@ def plt_linear_motion_magnitude(df, save_path=None):
     as velocity depends primarily on orbital characteristics rather than instantaneous
     proximity to Earth.
 
+    The fit runs over every row (asteroid_regression.py) and gives the
+    scipy.stats.linregress result; the scatter shows a bounded random sample
+    of the rows.
+
     Parameters:
     df (pandas.DataFrame): DataFrame containing asteroid data
+    save_path (str): PNG file to write, or None for linear_motion_magnitude.png
 
     Returns:
     float: R-squared value of the linear regression
     """
+    r_squared = render_plot('linear_motion_magnitude', df, save_path)
+    print(f"Plot saved as {save_path or 'linear_motion_magnitude.png'}")
+    return r_squared
 
-    # Create sample data
-    np.random.seed(42)  # For reproducibility
-    x_values = np.linspace(0, 7e7, 3000)
-    base_y = 25000 + 0.0002 * x_values  # Positive slope line
-    y_values = base_y + np.random.normal(0, 15000, size=len(x_values))  # Add noise
-
-    # Create the scatter plot
-    plt.figure(figsize=(12, 8))
-    plt.scatter(x_values, y_values, alpha=0.5, color='#1f77b4', s=15, label='Data points')
-
-    # Calculate the linear regression
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x_values, y_values)
-
-    # Create the regression line
-    line_x = np.linspace(min(x_values), max(x_values), 100)
-    line_y = slope * line_x + intercept
 
-    # Add the regression line to the plot
-    plt.plot(line_x, line_y, color='red', linewidth=2, label='Regression line')
+#########################
+## MAIN FUNCTION
+#########################
+def parse_sections(selector):
+    """
+    Letters of the sections a selector names, like 'D,E,F', 'DEF' or 'A-C,K'.
 
-    # Add labels and title
-    plt.title('Linear Regression: Absolute Magnitude vs Miles per hour', fontsize=14)
-    plt.xlabel('Absolute Magnitude', fontsize=12)
-    plt.ylabel('Miles per hour', fontsize=12)
+    Parameters:
+    selector (str): Letters and ranges of sections, separated by commas
 
-    # Add legend and grid
-    plt.legend(loc='upper right')
-    plt.grid(True, linestyle='--', alpha=0.3)
+    Returns:
+    str: Selected letters in the order of SECTIONS
+    """
+    selected = set()
+    for part in selector.upper().replace(' ', '').split(','):
+        if len(part) == 3 and part[1] == '-' and part[0] in SECTIONS and part[2] in SECTIONS:
+            selected.update(SECTIONS[SECTIONS.index(part[0]):SECTIONS.index(part[2]) + 1])
+        elif part and set(part) <= set(SECTIONS):
+            selected.update(part)
+        else:
+            raise ValueError(f"Sections must be letters A-K or ranges like A-C, got: {part!r}")
+    if not selected:
+        raise ValueError("No sections selected")
+    return ''.join(section for section in SECTIONS if section in selected)
+
+
+def _section_range(sections):
+    """Label of selected sections: 'D-G' when they follow each other, else 'D,F'."""
+    if len(sections) > 1 and sections in SECTIONS:
+        return f"{sections[0]}-{sections[-1]}"
+    return ','.join(sections)
+
+
+def _load_columns(file_path, sections, per_asteroid=False):
+    """
+    Columns section A has to load for the selected sections, or None for all of them.
 
-    # Format x-axis to show scientific notation
-    plt.ticklabel_format(style='sci', axis='x', scilimits=(0, 0))
+    Sections A-C report on every column and H-K draw from several, so only
+    selections within D-G load a subset: their columns and the close approach
+    date that section B filters on, and the asteroid key when D and G run
+    per asteroid.
+    """
+    if not set(sections) <= set('DEFG') or not os.path.isfile(file_path) or not is_supported_file(file_path):
+        return None
+    needed = {'Close Approach Date', 'Epoch Date Close Approach'}
+    if per_asteroid:
+        needed.add(ASTEROID_KEY)
+    for section in sections:
+        needed.update(SECTION_COLUMNS[section])
+    return [col for col in read_header(file_path) if col in needed]
+
+
+def _quiet(*args, **kwargs):
+    """print() replacement of the JSON output format."""
+
+
+def _json_default(value):
+    """JSON form of the numpy and pandas values in the results."""
+    if isinstance(value, np.floating):
+        # The shortest decimal of the value's own precision, 32.1 rather than 32.099998474121094
+        return float(str(value))
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, OrbitCounts):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finish(results, output_format):
+    """Print the results as one JSON document in the JSON output format, and return them."""
+    if output_format == 'json':
+        print(json.dumps(results, indent=2, default=_json_default))
+    return results
+
+
+def main(file_path='nasa.csv', chunksize=None, incremental=False, parallel_plots=True, instrument=None,
+         sections=SECTIONS, output_dir=None, output_format='text', per_asteroid=False, workers=None,
+         result_cache=RESULT_CACHE_DIR):
+    """
+    Main function to run the NASA asteroid data analysis and display results
+    for comparison with the solution file.
 
-    # Set y-axis limits
-    plt.ylim(0, 100000)
+    Parameters:
+    file_path (str): Path to the CSV file, or a directory or glob of CSV shards, which run in
+        streaming mode over worker processes (see asteroid_shard.py)
+    chunksize (int): If given, run sections B-G in streaming mode with chunks of this many rows
+    incremental (bool): If True, read only the rows appended since the last run (see asteroid_ingest.py)
+    parallel_plots (bool): If True, render the figures of sections H-K in worker processes
+    instrument (str): 'json' or 'table' to record the cost of each section on stderr
+        (see asteroid_instrument.py); None reads the ASTEROID_INSTRUMENT environment variable
+    sections (str): Sections to run, as accepted by parse_sections
+    output_dir (str): Directory of the PNG files, or None for the current directory
+    output_format (str): 'text' to print each section, 'json' to print one JSON document at the end
+    per_asteroid (bool): If True, sections D and G count each asteroid once instead of each close
+        approach (see asteroid_index.py); not available in streaming mode
+    workers (int): Worker processes for shards, None for one per CPU
+    result_cache (str): Directory of the section results of earlier runs on the same data and code
+        (see asteroid_result_cache.py), or None to compute every section; not used in streaming mode
 
-    # Adjust layout
-    plt.tight_layout()
+    Returns:
+    dict: Section letter -> result of the section, or {'error': message}
+    """
+    sections = parse_sections(sections)
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Output format must be one of {OUTPUT_FORMATS}, got: {output_format}")
+    sharded = is_sharded(file_path)
+    if per_asteroid and (chunksize is not None or incremental or sharded):
+        raise ValueError("per_asteroid is not available in streaming mode")
+    if incremental and sharded:
+        raise ValueError("incremental is not available for shards")
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    profile = Instrument.from_env(instrument)
+    try:
+        if chunksize is not None or incremental or sharded:
+            return main_streaming(file_path, chunksize or DEFAULT_CHUNKSIZE, incremental, profile, sections,
+                                  output_dir, output_format, workers)
+        cache = ResultCache(result_cache) if result_cache else None
+        return analyze(file_path, parallel_plots, profile, sections, output_dir, output_format, per_asteroid, cache)
+    finally:
+        profile.close()
 
-    # Save the plot
-    plt.savefig("linear_motion_magnitude.png")
-    plt.close()
-    print("Plot saved as linear_motion_magnitude.png")
 
-    # Return a similar r-squared value
-    r_squared = 0.128
-    return r_squared
+def _cached_sections(cache, file_path, sections, output_dir, per_asteroid):
+    """
+    Keys of the selected sections in the result cache and the results found under them.
 
+    Images of the cached plots are restored to their paths.
+    """
+    if cache is None:
+        return {}, {}
+    try:
+        fingerprint = cache.fingerprint(file_path)
+    except OSError:
+        return {}, {}
+    keys, hits = {}, {}
+    for section in sections:
+        params, image_path = {}, None
+        if section == 'A':
+            params = {'file': file_path}
+        elif section in 'DG':
+            params = {'per_asteroid': per_asteroid}
+        elif section in PLOT_SECTIONS:
+            image_path = os.path.join(output_dir or '', PLOTS[PLOT_SECTIONS[section]][2])
+            params = {'path': image_path}
+        keys[section] = (cache.key(fingerprint, section, params), image_path)
+        value = cache.get(*keys[section])
+        if value is not MISS:
+            hits[section] = value
+    return keys, hits
+
+
+def analyze(file_path, parallel_plots=True, profile=None, sections=SECTIONS, output_dir=None, output_format='text',
+            per_asteroid=False, cache=None):
+    """
+    Run sections A-K on the whole file in memory and display the results.
 
+    Section A always runs and section B runs for any later section; their
+    output is shown only when they are selected. When only sections D-G are
+    selected, only their columns are loaded. Sections found in the result
+    cache are not computed, and the data is not loaded when all of them are.
 
-#########################
-## MAIN FUNCTION
-#########################
-def main():
-    """
-    Main function to run the NASA asteroid data analysis and display results
-    for comparison with the solution file.
+    Parameters:
+    file_path (str): Path to the CSV file
+    parallel_plots (bool): If True, render the figures of sections H-K in worker processes
+    profile (Instrument): Records the cost of each section, or None
+    sections (str): Letters of the sections to run
+    output_dir (str): Directory of the PNG files, or None for the current directory
+    output_format (str): 'text' to print each section, 'json' to print one JSON document at the end
+    per_asteroid (bool): If True, sections D and G count each asteroid once instead of each close approach
+    cache (ResultCache): Results of earlier runs, or None
     """
-    print("Starting NASA Asteroid Data Analysis")
-    print("=" * 50)
+    profile = profile or Instrument()
+    say = print if output_format == 'text' else _quiet
+    results = {}
+    keys, hits = _cached_sections(cache, file_path, sections, output_dir, per_asteroid)
+    # Sections to compute; the data is loaded only if there are any
+    computed = ''.join(section for section in sections if section not in hits)
+    df = None
+
+    say("Starting NASA Asteroid Data Analysis")
+    say("=" * 50)
 
     # Section A: Load data
-    print("\nSection A: Loading Data")
-    print("-" * 50)
+    if 'A' in sections:
+        say("\nSection A: Loading Data")
+        say("-" * 50)
     try:
-        file_path = 'nasa.csv'
-        df = load_data(file_path)
-        print(f"Successfully loaded data from {file_path}")
-        print(f"Original dataframe shape: {df.shape}")
+        if computed:
+            with profile.section('A', 'load_data') as record:
+                df = load_data(file_path, columns=_load_columns(file_path, computed, per_asteroid))
+                record.rows_out = len(df)
+        if 'A' in sections:
+            results['A'] = hits['A'] if 'A' in hits else {'file': file_path, 'shape': df.shape}
+            say(f"Successfully loaded data from {file_path}")
+            say(f"Original dataframe shape: {results['A']['shape']}")
     except Exception as e:
-        print(f"Error loading data: {e}")
-        return
+        say(f"Error loading data: {e}")
+        results['A'] = {'error': str(e)}
+        return _finish(results, output_format)
 
     # Section B: Filter data for dates from 2000 onwards
-    print("\nSection B: Filtering Data")
-    print("-" * 50)
-    try:
-        df = mask_data(df)
-        print(f"Filtered dataframe shape: {df.shape}")
-    except Exception as e:
-        print(f"Error filtering data: {e}")
-        return
+    if sections.strip('A'):
+        if 'B' in sections:
+            say("\nSection B: Filtering Data")
+            say("-" * 50)
+        try:
+            if computed.strip('A'):
+                with profile.section('B', 'mask_data') as record:
+                    record.rows_in = len(df)
+                    df = mask_data(df)
+                    record.rows_out = len(df)
+            if 'B' in sections:
+                results['B'] = hits['B'] if 'B' in hits else {'shape': df.shape}
+                say(f"Filtered dataframe shape: {results['B']['shape']}")
+        except Exception as e:
+            say(f"Error filtering data: {e}")
+            results['B'] = {'error': str(e)}
+            return _finish(results, output_format)
 
     # Section C: Get data details
-    print("\nSection C: Data Details")
-    print("-" * 50)
-    try:
-        details = data_details(df)
-        print(f"Data details: {details}")
-    except Exception as e:
-        print(f"Error getting data details: {e}")
+    if 'C' in sections:
+        say("\nSection C: Data Details")
+        say("-" * 50)
+        try:
+            if 'C' in hits:
+                details = hits['C']
+            else:
+                with profile.section('C', 'data_details') as record:
+                    record.rows_in = len(df)
+                    details = data_details(df)
+            say(f"Data details: {details}")
+            results['C'] = details
+        except Exception as e:
+            say(f"Error getting data details: {e}")
+            results['C'] = {'error': str(e)}
+
+    # With per_asteroid, sections D and G run on one row per asteroid
+    # (asteroid_index.py) instead of one row per close approach
+    sources = {section: df for section in 'DEFG'}
+    if per_asteroid and ('D' in computed or 'G' in computed):
+        try:
+            with profile.section('index', 'AsteroidIndex.from_frame') as record:
+                record.rows_in = len(df)
+                asteroids = AsteroidIndex.from_frame(df).asteroids
+                record.rows_out = len(asteroids)
+            sources['D'] = sources['G'] = asteroids
+        except ValueError as e:
+            say(f"Error indexing asteroids: {e}")
+            results['D'] = results['G'] = {'error': str(e)}
+            sections = sections.replace('D', '').replace('G', '')
+            computed = computed.replace('D', '').replace('G', '')
+
+    # Sections D-G share one pass over their columns per source; if a column
+    # is missing, each section below reports its own error
+    summaries = {}
+    for source in {id(frame): frame for frame in sources.values()}.values():
+        summary_sections = ''.join(section for section in 'DEFG'
+                                   if section in computed and sources[section] is source)
+        if not summary_sections:
+            continue
+        try:
+            with profile.section(_section_range(summary_sections), 'summarize') as record:
+                record.rows_in = len(source)
+                summary = summarize(source, summary_sections)
+        except ValueError:
+            summary = None
+        summaries.update(dict.fromkeys(summary_sections, summary))
 
     # Section D: Find asteroid with maximum absolute magnitude
-    print("\nSection D: Maximum Absolute Magnitude")
-    print("-" * 50)
-    try:
-        max_mag = max_absolute_magnitude(df)
-        print(f"Asteroid with maximum absolute magnitude: {max_mag}")
-    except Exception as e:
-        print(f"Error finding maximum absolute magnitude: {e}")
+    if 'D' in sections:
+        say("\nSection D: Maximum Absolute Magnitude")
+        say("-" * 50)
+        try:
+            if 'D' in hits:
+                max_mag = hits['D']
+            else:
+                summary = summaries['D']
+                max_mag = summary.max_absolute_magnitude if summary else None
+                if max_mag is None:
+                    max_mag = max_absolute_magnitude(sources['D'])
+            say(f"Asteroid with maximum absolute magnitude: {max_mag}")
+            results['D'] = max_mag
+        except Exception as e:
+            say(f"Error finding maximum absolute magnitude: {e}")
+            results['D'] = {'error': str(e)}
 
     # Section E: Find asteroid closest to Earth
-    print("\nSection E: Closest to Earth")
-    print("-" * 50)
-    try:
-        closest = closest_to_earth(df)
-        print(f"Asteroid closest to Earth: {closest}")
-    except Exception as e:
-        print(f"Error finding closest asteroid: {e}")
+    if 'E' in sections:
+        say("\nSection E: Closest to Earth")
+        say("-" * 50)
+        try:
+            if 'E' in hits:
+                closest = hits['E']
+            else:
+                summary = summaries['E']
+                closest = summary.closest_to_earth if summary else None
+                if closest is None:
+                    closest = closest_to_earth(df)
+            say(f"Asteroid closest to Earth: {closest}")
+            results['E'] = closest
+        except Exception as e:
+            say(f"Error finding closest asteroid: {e}")
+            results['E'] = {'error': str(e)}
 
     # Section F: Count asteroids by orbit ID
-    print("\nSection F: Common Orbit")
-    print("-" * 50)
-    try:
-        orbits = common_orbit(df)
-        print(f"Common orbits: {orbits}")
-    except Exception as e:
-        print(f"Error counting orbits: {e}")
+    if 'F' in sections:
+        say("\nSection F: Common Orbit")
+        say("-" * 50)
+        try:
+            # OrbitCounts prints only the most common orbits
+            orbits = hits['F'] if 'F' in hits else (summaries['F'] or summarize(df, 'F')).common_orbit
+            say(f"Common orbits: {orbits}")
+            results['F'] = orbits
+        except Exception as e:
+            say(f"Error counting orbits: {e}")
+            results['F'] = {'error': str(e)}
 
     # Section G: Count asteroids with above-average maximum diameter
-    print("\nSection G: Min-Max Diameter")
-    print("-" * 50)
-    try:
-        count = min_max_diameter(df)
-        print(f"Count of asteroids with above-average maximum diameter: {count}")
-    except Exception as e:
-        print(f"Error counting asteroids with above-average diameter: {e}")
+    if 'G' in sections:
+        say("\nSection G: Min-Max Diameter")
+        say("-" * 50)
+        try:
+            if 'G' in hits:
+                count = hits['G']
+            else:
+                summary = summaries['G']
+                count = summary.min_max_diameter if summary else min_max_diameter(sources['G'])
+            say(f"Count of asteroids with above-average maximum diameter: {count}")
+            results['G'] = count
+        except Exception as e:
+            say(f"Error counting asteroids with above-average diameter: {e}")
+            results['G'] = {'error': str(e)}
 
     # Sections H-K: Visualizations
-    print("\nSections H-K: Visualizations")
-    print("-" * 50)
+    plot_sections = ''.join(section for section in PLOT_SECTIONS if section in sections)
+    if plot_sections:
+        say(f"\nSections {_section_range(plot_sections)}: Visualizations")
+        say("-" * 50)
+        try:
+            # Save visualizations to files, each figure in its own worker process; cached
+            # figures were restored to their files already
+            rendered = ''.join(section for section in plot_sections if section in computed)
+            if rendered:
+                with profile.section(_section_range(rendered), 'render_plots') as record:
+                    record.rows_in = len(df)
+                    rendered = render_plots(df, [PLOT_SECTIONS[section] for section in rendered],
+                                            parallel=parallel_plots, out_dir=output_dir)
+            plots = {}
+            for section in plot_sections:
+                name = PLOT_SECTIONS[section]
+                if section in hits:
+                    plots[name] = (hits[section]['path'], hits[section].get('r_squared'))
+                else:
+                    plots[name] = rendered[name]
+            for path, value in plots.values():
+                say(f"Plot saved as {path}")
+
+            say("Visualizations created and saved as:")
+            for path, value in plots.values():
+                say(f"- {path}")
+            for section in plot_sections:
+                results[section] = {'path': plots[PLOT_SECTIONS[section]][0]}
+            if 'K' in plot_sections:
+                r_squared = plots['linear_motion_magnitude'][1]
+                say(f"R-squared value for linear regression: {r_squared:.4f}")
+                results['K']['r_squared'] = r_squared
+        except Exception as e:
+            say(f"Error creating visualizations: {e}")
+            for section in plot_sections:
+                results[section] = {'error': str(e)}
+
+    # Keep the new results for the next run
+    if cache is not None:
+        for section in computed:
+            failed = isinstance(results.get(section), dict) and 'error' in results[section]
+            if section in keys and section in results and not failed:
+                cache.put(keys[section][0], results[section], image_path=keys[section][1])
+
+    say("\nNASA Asteroid Data Analysis Completed")
+    say("=" * 50)
+    return _finish(results, output_format)
+
+
+def main_streaming(file_path, chunksize, incremental=False, profile=None, sections=SECTIONS, output_dir=None,
+                   output_format='text', workers=None):
+    """
+    Run sections B-G over the file in chunks and display the results like main().
+
+    The histograms of sections H and I and the regression of section K are
+    computed chunk by chunk as well; the pie chart of section J is skipped, and
+    so are all of them in incremental mode. A directory or glob of shards is
+    mapped over worker processes and reduced (see asteroid_shard.py); section
+    K is skipped for shards.
+
+    Parameters:
+    file_path (str): Path to the CSV file
+    chunksize (int): Number of rows per chunk
+    incremental (bool): If True, merge only the rows appended since the last run into the saved state
+    profile (Instrument): Records the cost of each section, or None
+    sections (str): Letters of the sections to show
+    output_dir (str): Directory of the PNG files, or None for the current directory
+    output_format (str): 'text' to print each section, 'json' to print one JSON document at the end
+    workers (int): Worker processes for shards, None for one per CPU
+    """
+    profile = profile or Instrument()
+    say = print if output_format == 'text' else _quiet
+    sharded = is_sharded(file_path)
+    results = {}
+
+    say("Starting NASA Asteroid Data Analysis (streaming)")
+    say("=" * 50)
+
+    # Sections A-B: Stream and filter data
+    say(f"\nSections A-B: Streaming Data in chunks of {chunksize} rows")
+    say("-" * 50)
     try:
-        # Save visualizations to files
-        plt_hist_diameter(df)
-        plt_hist_common_orbit(df)
-        plt_pie_hazard(df)
-        r_squared = plt_linear_motion_magnitude(df)
-
-        print("Visualizations created and saved as:")
-        print("- hist_diameter.png")
-        print("- hist_common_orbit.png")
-        print("- pie_hazard.png")
-        print("- linear_motion_magnitude.png")
-        print(f"R-squared value for linear regression: {r_squared:.4f}")
+        function = 'ingest' if incremental else 'ShardedDataset.sections' if sharded else 'stream_sections'
+        with profile.section('A-G', function) as record:
+            if incremental:
+                results = ingest(file_path, chunksize=chunksize)
+            elif sharded:
+                results = ShardedDataset.from_path(file_path).sections(chunksize=chunksize, workers=workers)
+            else:
+                results = stream_sections(file_path, chunksize=chunksize)
+            record.rows_in, record.rows_out = results['rows_loaded'], results['rows']
+        if incremental:
+            say(f"Rows appended to {file_path} since the last run: {results['rows_appended']}")
+        if sharded:
+            say(f"Shards in {file_path}: {results['shards']}")
+        say(f"Rows read from {file_path}: {results['rows_loaded']}")
+        say(f"Rows from 2000 onwards: {results['rows']}")
     except Exception as e:
-        print(f"Error creating visualizations: {e}")
+        say(f"Error streaming data: {e}")
+        return _finish({'A': {'error': str(e)}}, output_format)
+
+    streamed = results
+    results = {}
+    if 'A' in sections:
+        results['A'] = {'file': file_path, 'rows': streamed['rows_loaded']}
+    if 'B' in sections:
+        results['B'] = {'rows': streamed['rows']}
+
+    for section, title, label, key in STREAMED_SECTIONS:
+        if section in sections:
+            say(f"\nSection {section}: {title}")
+            say("-" * 50)
+            say(f"{label}: {streamed[key]}")
+            results[section] = streamed[key]
+
+    # Sections H-I: Histograms drawn from counts binned while streaming
+    histogram_sections = ''.join(section for section in 'HI' if section in sections)
+    if not incremental and histogram_sections:
+        say(f"\nSections {_section_range(histogram_sections)}: Histograms")
+        say("-" * 50)
+        try:
+            if sharded:
+                histograms = streamed
+            else:
+                with profile.section(_section_range(histogram_sections), 'stream_histograms'):
+                    histograms = stream_histograms(file_path, chunksize=chunksize)
+            for section in histogram_sections:
+                name = PLOT_SECTIONS[section]
+                path = os.path.join(output_dir or '', f"{name}.png")
+                draw_plot(name, {'edges': histograms[name].edges, 'counts': histograms[name].counts}, path)
+                say(f"Plot saved as {path}")
+                results[section] = {'path': path}
+        except Exception as e:
+            say(f"Error creating histograms: {e}")
+            for section in histogram_sections:
+                results[section] = {'error': str(e)}
+
+    # Section K: Regression fitted chunk by chunk over a bounded sample
+    if not incremental and not sharded and 'K' in sections:
+        say("\nSection K: Linear Regression")
+        say("-" * 50)
+        try:
+            with profile.section('K', 'stream_regression') as record:
+                fit, sample = stream_regression(file_path, chunksize=chunksize)
+                record.rows_in = fit.n
+            path = os.path.join(output_dir or '', 'linear_motion_magnitude.png')
+            r_squared = draw_plot('linear_motion_magnitude', linear_motion_magnitude_inputs(fit, sample), path)
+            say(f"Plot saved as {path}")
+            say(f"R-squared value for linear regression: {r_squared:.4f}")
+            results['K'] = {'path': path, 'r_squared': r_squared}
+        except Exception as e:
+            say(f"Error creating regression plot: {e}")
+            results['K'] = {'error': str(e)}
+
+    say("\nNASA Asteroid Data Analysis Completed")
+    say("=" * 50)
+    return _finish(results, output_format)
+
+
+#########################
+## COMMAND LINE
+#########################
+def parse_args(argv=None):
+    """
+    Parse the command line of nasa_asteroid_ds.py.
+
+    Parameters:
+    argv (list): Arguments, or None for sys.argv
 
-    print("\nNASA Asteroid Data Analysis Completed")
-    print("=" * 50)
+    Returns:
+    argparse.Namespace: Parsed arguments
+    """
+    def sections_type(value):
+        try:
+            return parse_sections(value)
+        except ValueError as e:
+            raise argparse.ArgumentTypeError(str(e))
+
+    parser = argparse.ArgumentParser(description="Analyze the NASA asteroid data set (sections A-K).")
+    parser.add_argument('file', nargs='?', default='nasa.csv',
+                        help="CSV file, archive, column store, or directory or glob of CSV shards (default: nasa.csv)")
+    parser.add_argument('--sections', default=SECTIONS, type=sections_type,
+                        help="sections to run, e.g. D,E,F or A-C,K (default: all)")
+    parser.add_argument('--output-dir', help="directory of the PNG files (default: current directory)")
+    parser.add_argument('--format', dest='output_format', choices=OUTPUT_FORMATS, default='text',
+                        help="print each section as text, or all results as one JSON document")
+    parser.add_argument('--chunksize', type=int, help="stream the file in chunks of this many rows")
+    parser.add_argument('--incremental', action='store_true', help="read only the rows appended since the last run")
+    parser.add_argument('--per-asteroid', action='store_true',
+                        help="run sections D and G on unique asteroids instead of close approaches")
+    parser.add_argument('--workers', type=int, help="worker processes for shards (default: one per CPU)")
+    parser.add_argument('--serial-plots', action='store_true', help="render the figures in this process")
+    parser.add_argument('--instrument', choices=INSTRUMENT_MODES, help="record the cost of each section on stderr")
+    parser.add_argument('--no-result-cache', action='store_true', help="compute every section instead of reusing "
+                        f"the results of earlier runs in {RESULT_CACHE_DIR}")
+    parser.add_argument('--clear-result-cache', action='store_true', help="drop the cached results before running")
+    return parser.parse_args(argv)
 
 
 # Run the main function if this script is executed directly
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    if args.clear_result_cache:
+        ResultCache().clear()
+    main(args.file, args.chunksize, args.incremental, not args.serial_plots, args.instrument, args.sections,
+         args.output_dir, args.output_format, args.per_asteroid, args.workers,
+         None if args.no_result_cache else RESULT_CACHE_DIR)